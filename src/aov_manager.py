@@ -0,0 +1,85 @@
+# render_layer_tool/aov_manager.py
+# -*- coding: utf-8 -*-
+"""
+Arnold AOV (aiAOV ノード) の差分適用。
+要求されたAOVの集合と既存の aiAOV ノードを比較し、足りないものの作成と不要なものの削除だけを行います。
+mtoa の読み込みと AOVInterface の取得は最初の1回だけ行います。
+"""
+import maya.cmds as cmds
+
+import arnold_utils
+
+# View のプリセットボタン名 -> AOV名
+AOV_PRESETS = {
+    "Basic": ["diffuse", "specular", "emission"],
+    "Full Beauty": ["diffuse", "specular", "coat", "transmission", "sss", "volume", "emission", "background"],
+    "Utility": ["id", "shadow_matte", "N", "P", "AO"],
+    "Clear": [],
+}
+
+ARNOLD_OPTIONS_NODE = "defaultArnoldRenderOptions"
+
+
+class AOVManager:
+    """シーンの aiAOV ノードを要求されたAOV集合に合わせるクラス。"""
+    def __init__(self):
+        self._interface = None
+
+    def _get_interface(self):
+        """mtoa の AOVInterface を返します。プラグインの読み込みとレンダラー設定は初回のみ行います。"""
+        if self._interface is None:
+            arnold_utils.ensure_arnold_renderer()
+            if not cmds.pluginInfo("mtoa", q=True, loaded=True):
+                raise RuntimeError("Arnold (mtoa) プラグインを読み込めませんでした。")
+            # mtoa はプラグインのロード後にのみインポートできる
+            from mtoa import aovs
+            self._interface = aovs.AOVInterface()
+        # 新規シーンではレンダーオプション (ドライバー/フィルターを含む) がまだ存在しない
+        if not cmds.objExists(ARNOLD_OPTIONS_NODE):
+            from mtoa.core import createOptions
+            createOptions()
+        return self._interface
+
+    def existing_aovs(self) -> dict:
+        """{AOV名: aiAOVノード名} を返します。"""
+        if self._interface is None and not cmds.pluginInfo("mtoa", q=True, loaded=True):
+            return {} # mtoa が未ロードなら aiAOV タイプ自体が存在しない
+        return {cmds.getAttr(f"{node}.name"): node for node in cmds.ls(type='aiAOV') or []}
+
+    @staticmethod
+    def _plan(existing: dict, aov_names: list[str], remove_others: bool) -> dict:
+        requested = list(dict.fromkeys(aov_names))
+        return {
+            'create': [name for name in requested if name not in existing],
+            'delete': [name for name in existing if name not in requested] if remove_others else [],
+            'keep': [name for name in requested if name in existing],
+        }
+
+    def diff(self, aov_names: list[str], remove_others: bool = True) -> dict:
+        """
+        要求されたAOVと既存のAOVの差分を返します (シーンは変更しません)。
+        戻り値: {'create': [AOV名], 'delete': [AOV名], 'keep': [AOV名]}
+        """
+        return self._plan(self.existing_aovs(), aov_names, remove_others)
+
+    def apply(self, aov_names: list[str], remove_others: bool = True) -> dict:
+        """
+        シーンのAOVを aov_names に合わせます。remove_others=False の場合は作成のみ行います。
+        戻り値: {'created': [AOV名], 'deleted': [AOV名], 'kept': [AOV名], 'nodes': {AOV名: aiAOVノード名}}
+        """
+        existing = self.existing_aovs()
+        plan = self._plan(existing, aov_names, remove_others)
+
+        if plan['create']:
+            interface = self._get_interface()
+            for name in plan['create']:
+                interface.addAOV(name)
+        if plan['delete']:
+            # 削除はノードをまとめて1回で行う
+            cmds.delete([existing[name] for name in plan['delete']])
+
+        if plan['create']:
+            nodes = self.existing_aovs()
+        else:
+            nodes = {name: node for name, node in existing.items() if name not in plan['delete']}
+        return {'created': plan['create'], 'deleted': plan['delete'], 'kept': plan['keep'], 'nodes': nodes}
@@ -0,0 +1,32 @@
+# render_layer_tool/arnold_utils.py
+# -*- coding: utf-8 -*-
+"""
+Arnold (mtoa) の読み込みとレンダラー設定のヘルパー。
+ツール本体 (aov_manager / recipe) と rs_utils の両方から使うため、src 直下に置きます。
+"""
+import logging
+
+import maya.cmds as cmds
+
+logger = logging.getLogger("RenderLayerTool")
+
+
+def ensure_mtoa_loaded() -> bool:
+    """mtoa プラグインを読み込みます。読み込み済み/読み込めた場合に True を返します。"""
+    if not cmds.pluginInfo("mtoa", q=True, loaded=True):
+        try:
+            cmds.loadPlugin("mtoa", quiet=True)
+            return True
+        except Exception:
+            return False
+    return True
+
+
+def ensure_arnold_renderer():
+    """mtoa を読み込み、現在のレンダラーを Arnold にします。"""
+    ensure_mtoa_loaded()
+    if cmds.getAttr("defaultRenderGlobals.currentRenderer") != "arnold":
+        try:
+            cmds.setAttr("defaultRenderGlobals.currentRenderer", "arnold", type="string")
+        except Exception as e:
+            logger.error(f"Failed to set Arnold as renderer: {e}")
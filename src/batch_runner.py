@@ -0,0 +1,275 @@
+# render_layer_tool/batch_runner.py
+# -*- coding: utf-8 -*-
+"""
+ショットリストの各シーンにレシピを適用するマルチプロセスのバッチドライバー。
+mayapy の常駐ワーカー (headless.py --worker) を複数起動し、タイムアウト・リトライ付きでジョブを割り振ります。
+
+使い方:
+    python batch_runner.py --recipe layers.json --shots shots.txt --workers 4 --report report.json --save
+    python batch_runner.py --recipe layers.json --shots shots.txt --fake --fake-duration 0.2
+
+--fake を指定すると Maya の代わりに benchmarks.fake_maya のメモリ上のシーンを使うワーカーで動作します。
+シーンを開く→レシピ適用 (RenderLayerModel)→保存 は本物のワーカーと同じ headless の経路で実行されます。
+"""
+import argparse
+import collections
+import json
+import os
+import queue
+import random
+import subprocess
+import sys
+import threading
+import time
+import zlib
+
+from headless import WORKER_MARKER
+
+_HEADLESS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "headless.py")
+# 失敗したジョブのレポートに含めるワーカーの標準エラー出力の行数
+STDERR_TAIL_LINES = 200
+# 模擬ワーカーが開く合成シーンのトランスフォーム数
+FAKE_SCENE_NODES = 500
+
+
+def default_mayapy() -> str:
+    maya_location = os.environ.get("MAYA_LOCATION")
+    if maya_location:
+        executable = "mayapy.exe" if sys.platform == "win32" else "mayapy"
+        return os.path.join(maya_location, "bin", executable)
+    return "mayapy"
+
+
+def load_shot_list(path: str) -> list[str]:
+    """ショットリストを読み込みます。JSONのリスト、または1行1シーンのテキスト (# はコメント)。"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        return [str(scene) for scene in json.loads(text)]
+    return [line.strip() for line in text.splitlines() if line.strip() and not line.lstrip().startswith('#')]
+
+
+class WorkerTimeout(Exception):
+    pass
+
+
+class WorkerProcess:
+    """1つの常駐ワーカープロセス。標準入出力の1行JSONでジョブをやり取りします。"""
+    def __init__(self, command: list[str], env: dict = None):
+        self.command = command
+        self.env = env
+        self._proc = None
+        self._results = None
+        self._stderr = None
+        self._stderr_thread = None
+        self.start()
+
+    def start(self):
+        self._results = queue.Queue()
+        self._stderr = collections.deque(maxlen=STDERR_TAIL_LINES)
+        self._proc = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding='utf-8', errors='replace', bufsize=1, env=self.env)
+        threading.Thread(target=self._read_stdout, args=(self._proc, self._results), daemon=True).start()
+        self._stderr_thread = threading.Thread(target=self._read_stderr, args=(self._proc, self._stderr), daemon=True)
+        self._stderr_thread.start()
+
+    @staticmethod
+    def _read_stderr(proc, lines):
+        # 読み続けないとパイプが詰まってワーカーが止まる。直近の行だけを保持する
+        for line in proc.stderr:
+            lines.append(line.rstrip('\n'))
+
+    def take_stderr(self) -> str:
+        """前回の呼び出し以降にワーカーが標準エラーへ出力した内容 (直近 STDERR_TAIL_LINES 行) を返します。"""
+        if self._proc.poll() is not None:
+            # 終了したプロセスの出力 (トレースバックなど) を読み切る
+            self._stderr_thread.join(timeout=5)
+        lines = list(self._stderr)
+        self._stderr.clear()
+        return "\n".join(lines)
+
+    @staticmethod
+    def _read_stdout(proc, results):
+        for line in proc.stdout:
+            if line.startswith(WORKER_MARKER):
+                results.put(json.loads(line[len(WORKER_MARKER):]))
+        results.put(None) # プロセス終了
+
+    def run_job(self, job: dict, timeout: float) -> dict:
+        if self._proc.poll() is not None:
+            self.start()
+        self._stderr.clear()
+        self._proc.stdin.write(json.dumps(job, ensure_ascii=False) + "\n")
+        self._proc.stdin.flush()
+        try:
+            result = self._results.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            raise WorkerTimeout(f"{timeout} 秒以内に完了しませんでした。")
+        if result is None:
+            try:
+                self._proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.kill()
+            raise RuntimeError(f"ワーカーが異常終了しました (exit code {self._proc.poll()})。")
+        return result
+
+    def kill(self):
+        if self._proc and self._proc.poll() is None:
+            self._proc.kill()
+            self._proc.wait()
+
+    def close(self):
+        if self._proc and self._proc.poll() is None:
+            self._proc.stdin.close()
+            try:
+                self._proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.kill()
+
+
+class BatchRunner:
+    """
+    ジョブキューを共有するワーカースレッドごとに WorkerProcess を1つ持ち、シーンを並列処理します。
+    失敗・タイムアウトしたジョブは retries 回まで再投入します。タイムアウトしたワーカーは再起動されます。
+    """
+    def __init__(self, worker_command: list[str], workers: int = 2, timeout: float = 1800.0,
+                 retries: int = 1, env: dict = None):
+        self.worker_command = worker_command
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.retries = retries
+        self.env = env
+
+    def run(self, scenes: list[str], recipe_path: str, save: bool = False, output_dir: str = None) -> dict:
+        jobs = queue.Queue()
+        for i, scene in enumerate(scenes):
+            output_path = os.path.join(output_dir, os.path.basename(scene)) if output_dir else None
+            jobs.put({'id': i, 'scene': scene, 'recipe': os.path.abspath(recipe_path),
+                      'save': save, 'output_path': output_path, 'attempt': 1})
+
+        results = {}
+        lock = threading.Lock()
+        start = time.perf_counter()
+
+        def work(worker_index):
+            worker = WorkerProcess(self.worker_command, env=self.env)
+            try:
+                while True:
+                    try:
+                        job = jobs.get_nowait()
+                    except queue.Empty:
+                        return
+                    job_start = time.perf_counter()
+                    try:
+                        report = worker.run_job(job, self.timeout)
+                    except Exception as e:
+                        report = {'scene': job['scene'], 'ok': False, 'error': str(e),
+                                  'timed_out': isinstance(e, WorkerTimeout)}
+                    stderr = worker.take_stderr()
+                    if stderr and not report.get('ok'):
+                        report['stderr'] = stderr
+                    report.update(id=job['id'], attempts=job['attempt'], worker=worker_index,
+                                  wall_time=time.perf_counter() - job_start)
+
+                    if not report.get('ok') and job['attempt'] <= self.retries:
+                        jobs.put(dict(job, attempt=job['attempt'] + 1))
+                    with lock:
+                        results[job['id']] = report
+            finally:
+                worker.close()
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(min(self.workers, len(scenes)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        reports = [results[i] for i in sorted(results)]
+        failed = [r for r in reports if not r.get('ok')]
+        return {
+            'total': len(reports),
+            'succeeded': len(reports) - len(failed),
+            'failed': len(failed),
+            'retried': sum(1 for r in reports if r['attempts'] > 1),
+            'workers': self.workers,
+            'elapsed': time.perf_counter() - start,
+            'failures': [{key: r[key] for key in ('id', 'scene', 'error', 'traceback', 'stderr') if key in r}
+                         for r in failed],
+            'jobs': reports,
+        }
+
+
+def serve_fake_worker(duration: float, failure_rate: float, seed: int = None, scene_nodes: int = FAKE_SCENE_NODES):
+    """
+    Mayaを使わない模擬ワーカー。maya パッケージを benchmarks.fake_maya に置き換えて headless.serve_worker を実行します。
+    シーンファイルはパスから決まる合成シーンとして開き、duration (平均秒数) と failure_rate で
+    Mayaでのシーン読み込みの時間と失敗を模擬します。
+    """
+    from benchmarks import fake_maya
+    from benchmarks.synthetic import generate_scene
+    fake_maya.install()
+    import headless
+
+    rng = random.Random(seed)
+
+    def open_scene(path):
+        time.sleep(duration * rng.uniform(0.5, 1.5))
+        if rng.random() < failure_rate:
+            raise RuntimeError(f"simulated failure while opening {path}")
+        # 同じパスは常に同じシーンになるよう、パスから乱数の種を決める
+        return generate_scene(scene_nodes, seed=zlib.crc32(path.encode('utf-8')))
+
+    fake_maya.set_scene_factory(open_scene)
+    headless.serve_worker()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render Layer Tool: 複数シーンへのレシピ一括適用")
+    parser.add_argument('--recipe', help="レシピJSONのパス")
+    parser.add_argument('--shots', help="ショットリスト (JSONのリスト、または1行1シーンのテキスト)")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2), help="ワーカープロセス数")
+    parser.add_argument('--timeout', type=float, default=1800.0, help="1シーンあたりのタイムアウト (秒)")
+    parser.add_argument('--retries', type=int, default=1, help="失敗したシーンの再試行回数")
+    parser.add_argument('--report', help="結果レポートJSONの出力先 (省略時は標準出力)")
+    parser.add_argument('--save', action='store_true', help="適用後にシーンを上書き保存する")
+    parser.add_argument('--output-dir', help="適用後のシーンを保存するディレクトリ")
+    parser.add_argument('--mayapy', default=default_mayapy(), help="ワーカーに使う mayapy のパス")
+    parser.add_argument('--fake', action='store_true', help="Mayaを使わない模擬ワーカーで実行する")
+    parser.add_argument('--fake-duration', type=float, default=0.1, help="模擬ワーカーの1シーンあたりの平均秒数")
+    parser.add_argument('--fake-failure-rate', type=float, default=0.0, help="模擬ワーカーの失敗率")
+    parser.add_argument('--fake-scene-nodes', type=int, default=FAKE_SCENE_NODES, help="模擬ワーカーが開く合成シーンのノード数")
+    parser.add_argument('--serve-fake-worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--seed', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve_fake_worker:
+        serve_fake_worker(args.fake_duration, args.fake_failure_rate, args.seed, args.fake_scene_nodes)
+        return 0
+    if not args.recipe or not args.shots:
+        parser.error("--recipe と --shots を指定してください。")
+
+    if args.fake:
+        command = [sys.executable, os.path.abspath(__file__), '--serve-fake-worker',
+                   '--fake-duration', str(args.fake_duration), '--fake-failure-rate', str(args.fake_failure_rate),
+                   '--fake-scene-nodes', str(args.fake_scene_nodes)]
+    else:
+        command = [args.mayapy, _HEADLESS_SCRIPT, '--worker']
+
+    scenes = load_shot_list(args.shots)
+    runner = BatchRunner(command, workers=args.workers, timeout=args.timeout, retries=args.retries)
+    report = runner.run(scenes, args.recipe, save=args.save, output_dir=args.output_dir)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"{report['succeeded']}/{report['total']} scenes succeeded in {report['elapsed']:.1f}s -> {args.report}")
+    else:
+        print(text)
+    return 0 if not report['failed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
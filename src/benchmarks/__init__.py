@@ -0,0 +1,13 @@
+# render_layer_tool/benchmarks/__init__.py
+# -*- coding: utf-8 -*-
+"""
+Mayaを使わずにツールの処理時間を計測するベンチマーク。
+fake_maya がメモリ上の合成シーンで maya.cmds / OpenMaya / Render Setup を置き換え、
+synthetic が深さ・幅・ネームスペース・ノードタイプの比率を指定してシーンを生成します。
+
+使い方 (src ディレクトリで):
+    python -m benchmarks --sizes 1000 10000 100000 --json result.json
+    python -m benchmarks --baseline result.json --tolerance 0.25
+
+計測値はツール側の Python の処理量を表します。Maya 本体のコマンドのコストは含まれません。
+"""
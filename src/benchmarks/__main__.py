@@ -0,0 +1,7 @@
+# render_layer_tool/benchmarks/__main__.py
+# -*- coding: utf-8 -*-
+import sys
+
+from benchmarks.run_benchmarks import main
+
+sys.exit(main())
@@ -0,0 +1,745 @@
+# render_layer_tool/benchmarks/fake_maya.py
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク用に maya.cmds / maya.api.OpenMaya / maya.OpenMaya / maya.app.renderSetup を
+メモリ上のシーン (FakeScene) で置き換えるモジュール。
+ツールが使う範囲のAPIだけを実装しています。install() は本物の maya がインポートされる前に呼んでください。
+"""
+import sys
+import types
+
+# シェイプのノードタイプ -> 継承しているタイプ (cmds.nodeType(inherited=True) の結果)
+SHAPE_TYPES = {
+    'mesh': ['shape', 'geometryShape', 'deformableShape', 'controlPoint', 'surfaceShape', 'mesh'],
+    'pointLight': ['shape', 'light', 'renderLight', 'nonAmbientLightShapeNode', 'pointLight'],
+    'directionalLight': ['shape', 'light', 'renderLight', 'nonAmbientLightShapeNode', 'directionalLight'],
+    'camera': ['shape', 'camera'],
+    'nurbsCurve': ['shape', 'geometryShape', 'curveShape', 'nurbsCurve'],
+}
+
+
+class FakeNode:
+    __slots__ = ('name', 'path', 'parent', 'children', 'node_type', 'intermediate', 'attrs')
+
+    def __init__(self, name, parent, node_type, intermediate=False, attrs=None):
+        self.name = name
+        self.parent = parent
+        self.path = (parent.path if parent else "") + '|' + name
+        self.children = []
+        self.node_type = node_type
+        self.intermediate = intermediate
+        self.attrs = attrs or {}
+
+
+class FakeScene:
+    """DAGノード、選択、レンダーレイヤーを保持するメモリ上のシーン。"""
+    def __init__(self, scene_name: str = ""):
+        self.scene_name = scene_name
+        # cmds.file(q=True, modified=True) が返す未保存の変更の有無
+        self.modified = False
+        # cmds.file(q=True, reference=True) が返す参照ファイルと、そのロード状態
+        self.references = {}
+        self.roots = []
+        self.nodes = {}
+        self.selection = []
+        self.render_setup = FakeRenderSetup()
+        self.command_calls = 0
+
+    def add(self, parent_path, name, node_type='transform', intermediate=False, **attrs) -> FakeNode:
+        parent = self.nodes[parent_path] if parent_path else None
+        node = FakeNode(name, parent, node_type, intermediate, attrs)
+        if parent is None:
+            self.roots.append(node)
+        else:
+            parent.children.append(node)
+        self.nodes[node.path] = node
+        return node
+
+    def _subtree(self, node):
+        stack, result = [node], []
+        while stack:
+            current = stack.pop()
+            result.append(current)
+            stack.extend(current.children)
+        return result
+
+    def remove(self, path):
+        """ノードとその子孫を削除します。"""
+        node = self.nodes[path]
+        siblings = node.parent.children if node.parent else self.roots
+        siblings.remove(node)
+        for current in self._subtree(node):
+            del self.nodes[current.path]
+
+    def rename(self, path, name) -> FakeNode:
+        """ノードの名前を変更し、子孫のパスを更新します。"""
+        node = self.nodes[path]
+        subtree = self._subtree(node)
+        for current in subtree:
+            del self.nodes[current.path]
+        node.name = name
+        for current in subtree:
+            current.path = (current.parent.path if current.parent else "") + '|' + current.name
+            self.nodes[current.path] = current
+        return node
+
+    def transforms(self):
+        return [node for node in self.nodes.values() if node.node_type == 'transform']
+
+
+# 偽のAPIが参照する現在のシーン。install() で作成される
+_scene = None
+# cmds.file で開く/保存するシーンファイル (パス -> FakeScene)
+_scene_files = {}
+# 未登録のパスを開いた時にシーンを作る関数 (path -> FakeScene)。None なら開けない
+_scene_factory = None
+
+
+def current_scene() -> FakeScene:
+    return _scene
+
+
+def set_scene(scene: FakeScene):
+    global _scene
+    _scene = scene
+
+
+def register_scene_file(path: str, scene: FakeScene):
+    """cmds.file(path, open=True) で開けるシーンファイルを登録します。"""
+    scene.scene_name = path
+    _scene_files[path] = scene
+
+
+def set_scene_factory(factory):
+    """未登録のシーンファイルを開いた時に factory(path) でシーンを作るようにします (None で解除)。"""
+    global _scene_factory
+    _scene_factory = factory
+
+
+def scene_file(path: str) -> FakeScene:
+    """登録済み、または cmds.file(save=True) で保存されたシーンを返します。"""
+    return _scene_files.get(path)
+
+
+# --- maya.cmds ---
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+def _resolve(name):
+    """フルパス、または一意な短縮名からノードを返します。"""
+    node = _scene.nodes.get(name)
+    if node is not None or name.startswith('|'):
+        return node
+    for candidate in _scene.nodes.values():
+        if candidate.name == name:
+            return candidate
+    return None
+
+
+def _make_cmds():
+    cmds = types.ModuleType('maya.cmds')
+
+    def ls(*args, **kwargs):
+        _scene.command_calls += 1
+        if kwargs.get('sl') or kwargs.get('selection'):
+            return list(_scene.selection)
+        if kwargs.get('assemblies'):
+            return [node.path for node in _scene.roots]
+        node_type = kwargs.get('type')
+        names = [name for arg in args for name in _as_list(arg)]
+        if names:
+            nodes = [_resolve(name) for name in names]
+            return [node.path for node in nodes if node is not None and (not node_type or node.node_type == node_type)]
+        if node_type:
+            return [node.path for node in _scene.nodes.values() if node.node_type == node_type]
+        return [node.path for node in _scene.nodes.values()]
+
+    def select(*args, **kwargs):
+        _scene.command_calls += 1
+        names = [node.path for name in args for node in map(_resolve, _as_list(name)) if node is not None]
+        if kwargs.get('clear'):
+            _scene.selection = []
+        elif kwargs.get('deselect') or kwargs.get('d'):
+            removed = set(names)
+            _scene.selection = [p for p in _scene.selection if p not in removed]
+        elif kwargs.get('add'):
+            _scene.selection.extend(p for p in names if p not in _scene.selection)
+        else:
+            _scene.selection = names
+
+    def objExists(name):
+        _scene.command_calls += 1
+        return _resolve(name) is not None
+
+    def nodeType(name, isTypeName=False, inherited=False, **kwargs):
+        _scene.command_calls += 1
+        if isTypeName:
+            node_type = name
+        else:
+            node = _resolve(name)
+            node_type = node.node_type if node else None
+        if inherited:
+            return SHAPE_TYPES.get(node_type, [node_type])
+        return node_type
+
+    def camera(name, q=False, startupCamera=False, **kwargs):
+        _scene.command_calls += 1
+        node = _resolve(name)
+        if node is None:
+            raise RuntimeError(f"No object matches name: {name}")
+        if node.node_type == 'camera':
+            node = node.parent
+        return bool(node.attrs.get('startupCamera'))
+
+    def listRelatives(name=None, shapes=False, children=False, allDescendents=False, parent=False,
+                      fullPath=False, type=None, **kwargs):
+        _scene.command_calls += 1
+        node = _resolve(name) if name else None
+        if node is None:
+            return None
+        if parent:
+            return [node.parent.path] if node.parent else None
+        if allDescendents:
+            result, stack = [], list(node.children)
+            while stack:
+                child = stack.pop()
+                result.append(child)
+                stack.extend(child.children)
+        else:
+            result = node.children
+        if shapes:
+            result = [c for c in result if c.node_type != 'transform']
+        if type:
+            result = [c for c in result if c.node_type == type]
+        return [c.path if fullPath else c.name for c in result] or None
+
+    def getAttr(plug, **kwargs):
+        _scene.command_calls += 1
+        name, _, attr = plug.partition('.')
+        node = _resolve(name)
+        if node is None:
+            raise ValueError(f"No object matches name: {plug}")
+        return node.attrs.get(attr)
+
+    def setAttr(plug, value, **kwargs):
+        _scene.command_calls += 1
+        name, _, attr = plug.partition('.')
+        _resolve(name).attrs[attr] = value
+
+    def file(*args, q=False, sceneName=False, modified=False, open=False, rename=None, save=False, reference=False,
+             **kwargs):
+        _scene.command_calls += 1
+        if q and modified:
+            return _scene.modified
+        if q and reference:
+            # 入れ子の参照は扱わない (最上位の参照のみ)
+            return [] if args else list(_scene.references)
+        if open:
+            scene = _scene_files.get(args[0])
+            if scene is None and _scene_factory is not None:
+                scene = _scene_factory(args[0])
+                register_scene_file(args[0], scene)
+            if scene is None:
+                raise RuntimeError(f"File not found: {args[0]}")
+            set_scene(scene)
+        elif rename:
+            _scene.scene_name = rename
+        elif save:
+            # 保存したシーンは同じパスで開き直せる (テストでは内容をそのまま共有する)
+            _scene_files[_scene.scene_name] = _scene
+            _scene.modified = False
+        return _scene.scene_name
+
+    def referenceQuery(reference, isLoaded=False, **kwargs):
+        _scene.command_calls += 1
+        return _scene.references[reference]
+
+    def about(batch=False, **kwargs):
+        return True # UIのない mayapy -batch と同じ扱いにする
+
+    def evaluationManager(q=False, mode=None, **kwargs):
+        if q:
+            return ['off']
+
+    def noop(*args, **kwargs):
+        _scene.command_calls += 1
+        return None
+
+    for func in (ls, select, objExists, nodeType, camera, listRelatives, getAttr, setAttr, file, referenceQuery,
+                 about, evaluationManager):
+        setattr(cmds, func.__name__, func)
+    for name in ('undoInfo', 'refresh', 'warning', 'workspaceControl', 'scriptJob', 'delete', 'loadPlugin'):
+        setattr(cmds, name, noop)
+    cmds.pluginInfo = lambda *args, **kwargs: False
+    return cmds
+
+
+# --- maya.api.OpenMaya ---
+
+def _make_openmaya2():
+    om2 = types.ModuleType('maya.api.OpenMaya')
+
+    class MFn:
+        kInvalid = 0
+        kTransform = 1
+        kShape = 2
+        kMesh = 3
+        kCamera = 4
+
+    class MObject:
+        __slots__ = ('node',)
+
+        def __init__(self, node=None):
+            self.node = node
+
+        def hasFn(self, fn):
+            if self.node is None:
+                return False
+            if fn == MFn.kTransform:
+                return self.node.node_type == 'transform'
+            if fn == MFn.kShape:
+                return self.node.node_type != 'transform'
+            if fn == MFn.kMesh:
+                return self.node.node_type == 'mesh'
+            if fn == MFn.kCamera:
+                return self.node.node_type == 'camera'
+            return fn == MFn.kInvalid
+
+    class MDagPath:
+        __slots__ = ('node',)
+
+        def __init__(self, node=None):
+            # MDagPath(other) はコピーを作る
+            self.node = node.node if isinstance(node, MDagPath) else node
+
+        def fullPathName(self):
+            return self.node.path
+
+        def hasFn(self, fn):
+            return MObject(self.node).hasFn(fn)
+
+        def _shapes(self):
+            return [child for child in self.node.children if child.node_type != 'transform']
+
+        def numberOfShapesDirectlyBelow(self):
+            return len(self._shapes())
+
+        def extendToShapeDirectlyBelow(self, index):
+            self.node = self._shapes()[index]
+
+        def inclusiveMatrix(self):
+            return None # 変換はすべて単位行列とみなす
+
+        @staticmethod
+        def getAPathTo(obj):
+            return MDagPath(obj.node)
+
+    class MPlug:
+        __slots__ = ('value',)
+
+        def __init__(self, value):
+            self.value = value
+
+        def asBool(self):
+            return bool(self.value)
+
+        def asInt(self):
+            return int(self.value)
+
+    class MPoint:
+        __slots__ = ('x', 'y', 'z')
+
+        def __init__(self, x=0.0, y=0.0, z=0.0):
+            self.x, self.y, self.z = x, y, z
+
+    class MBoundingBox:
+        def __init__(self, min_point, max_point):
+            self.min = min_point
+            self.max = max_point
+
+        def transformUsing(self, matrix):
+            return self
+
+    class MFnDagNode:
+        def __init__(self, target):
+            self.node = target.node
+
+        @property
+        def isIntermediateObject(self):
+            return self.node.intermediate
+
+        @property
+        def typeName(self):
+            return self.node.node_type
+
+        @property
+        def isDefaultNode(self):
+            # 新規シーンで作成されるノードのうち、DAGにあるのはスタートアップカメラだけ
+            return bool(self.node.attrs.get('startupCamera'))
+
+        def name(self):
+            return self.node.name
+
+        def fullPathName(self):
+            return self.node.path
+
+        def findPlug(self, attr, want_networked_plug):
+            if attr not in self.node.attrs:
+                raise RuntimeError(f"(kInvalidParameter): No element at given index: {attr}")
+            return MPlug(self.node.attrs[attr])
+
+        def hasAttribute(self, attr):
+            return attr in self.node.attrs
+
+        @property
+        def boundingBox(self):
+            # size: 中心からの半径, center: ワールド空間の中心 (トランスフォームは模擬しない)
+            size = self.node.attrs.get('size', 1.0)
+            x, y, z = self.node.attrs.get('center', (0.0, 0.0, 0.0))
+            return MBoundingBox(MPoint(x - size, y - size, z - size), MPoint(x + size, y + size, z + size))
+
+    class MFnMesh(MFnDagNode):
+        """faces 属性 (既定 400) の四角形ポリゴンからなるメッシュとして振る舞う。"""
+        @property
+        def numPolygons(self):
+            return self.node.attrs.get('faces', 400)
+
+        @property
+        def numFaceVertices(self):
+            return 4 * self.numPolygons
+
+    class MSelectionList:
+        def __init__(self):
+            self._nodes = []
+
+        def add(self, name):
+            node = _resolve(name)
+            if node is None:
+                raise RuntimeError("(kInvalidParameter): Object does not exist")
+            self._nodes.append(node)
+
+        def getDagPath(self, index):
+            return MDagPath(self._nodes[index])
+
+    class MItDag:
+        """深さ優先でノードをたどる。prune() した場合は現在のノードの子をたどらない。"""
+        kDepthFirst = 0
+        kBreadthFirst = 1
+
+        def __init__(self, traversal=0, filter_type=0):
+            self._stack = list(reversed(_scene.roots))
+            self._current = self._stack.pop() if self._stack else None
+            self._pruned = False
+
+        def reset(self, root, traversal=0, filter_type=0):
+            self._stack = []
+            self._current = root.node
+            self._pruned = False
+
+        def isDone(self):
+            return self._current is None
+
+        def currentItem(self):
+            return MObject(self._current)
+
+        def fullPathName(self):
+            return self._current.path
+
+        def getPath(self):
+            return MDagPath(self._current)
+
+        def prune(self):
+            self._pruned = True
+
+        def next(self):
+            if not self._pruned:
+                self._stack.extend(reversed(self._current.children))
+            self._pruned = False
+            self._current = self._stack.pop() if self._stack else None
+
+    class _Messages:
+        """コールバック登録は受け付けるだけで、通知は行わない。"""
+        _next_id = 0
+
+        @classmethod
+        def _register(cls, *args, **kwargs):
+            cls._next_id += 1
+            return cls._next_id
+
+        addChildAddedCallback = addChildRemovedCallback = addNameChangedCallback = addCallback = _register
+        addEventCallback = _register
+
+        @staticmethod
+        def removeCallbacks(ids):
+            pass
+
+        @staticmethod
+        def removeCallback(callback_id):
+            pass
+
+    class MSceneMessage(_Messages):
+        kBeforeOpen, kAfterOpen, kBeforeNew, kAfterNew = range(4)
+
+    for cls in (MFn, MObject, MDagPath, MPlug, MPoint, MBoundingBox, MFnDagNode, MFnMesh, MSelectionList, MItDag,
+                MSceneMessage):
+        setattr(om2, cls.__name__, cls)
+    om2.MDagMessage = om2.MNodeMessage = om2.MMessage = om2.MEventMessage = _Messages
+    return om2
+
+
+# --- maya.app.renderSetup ---
+
+class FakeSelector:
+    def __init__(self):
+        self.static_selection = []
+        self.pattern = ""
+        self.filter_type = 0
+        self.custom_filter_value = ""
+
+    def setStaticSelection(self, selection):
+        self.static_selection = selection.split() if isinstance(selection, str) else list(selection)
+
+    def setPattern(self, pattern):
+        self.pattern = pattern
+
+    def setFilterType(self, filter_type):
+        self.filter_type = filter_type
+
+    def setCustomFilterValue(self, value):
+        self.custom_filter_value = value
+
+    def getStaticSelection(self):
+        return '\n'.join(self.static_selection)
+
+    def getPattern(self):
+        return self.pattern
+
+    def getFilterType(self):
+        return self.filter_type
+
+    def getCustomFilterValue(self):
+        return self.custom_filter_value
+
+
+class FakeOverride:
+    def __init__(self, name, node, attribute, parent=None):
+        self._name = name
+        self.parent = parent
+        self.node = node
+        self.attribute = attribute
+        self.value = None
+
+    def name(self):
+        return self._name
+
+    def attributeName(self):
+        return self.attribute
+
+    def setAttrValue(self, value):
+        self.value = value
+
+    def getAttrValue(self):
+        return self.value
+
+
+class FakeCollection:
+    def __init__(self, name, parent=None):
+        self._name = name
+        self.parent = parent
+        self._selector = FakeSelector()
+        self._overrides = []
+
+    def name(self):
+        return self._name
+
+    def getSelector(self):
+        return self._selector
+
+    def createAbsoluteOverride(self, node, attribute):
+        override = FakeOverride(f"{node.rpartition('|')[2]}_{attribute}", node, attribute, self)
+        self._overrides.append(override)
+        return override
+
+    def getOverrides(self):
+        return list(self._overrides)
+
+    def getChildren(self):
+        return list(self._overrides)
+
+
+class _FakeObservableList:
+    """Render Setup のリストオブザーバー (listItemAdded / listItemRemoved) の最小限の実装。"""
+    def addListObserver(self, observer):
+        self.__dict__.setdefault('_list_observers', []).append(observer)
+
+    def removeListObserver(self, observer):
+        self._list_observers.remove(observer)
+
+    def _item_added(self, item):
+        for observer in list(getattr(self, '_list_observers', ())):
+            observer.listItemAdded(item)
+
+    def _item_removed(self, item):
+        for observer in list(getattr(self, '_list_observers', ())):
+            observer.listItemRemoved(item)
+
+
+class FakeRenderLayer(_FakeObservableList):
+    def __init__(self, name):
+        self._name = name
+        self._collections = []
+
+    def name(self):
+        return self._name
+
+    def createCollection(self, name):
+        # Maya と同様、同名のコレクションがある場合は末尾に番号を付ける
+        names = {collection.name() for collection in self._collections}
+        unique, suffix = name, 1
+        while unique in names:
+            unique = f"{name}{suffix}"
+            suffix += 1
+        collection = FakeCollection(unique, self)
+        self._collections.append(collection)
+        self._item_added(collection)
+        return collection
+
+    def _delete_collection(self, collection):
+        self._collections.remove(collection)
+        self._item_removed(collection)
+
+    def getCollections(self):
+        return list(self._collections)
+
+    def getChildren(self):
+        return list(self._collections)
+
+
+class FakeRenderSetup(_FakeObservableList):
+    def __init__(self):
+        self._default = FakeRenderLayer('defaultRenderLayer')
+        self._layers = []
+        self._visible = self._default
+        self.switch_count = 0
+        self._active_layer_observers = []
+
+    def getRenderLayers(self):
+        return list(self._layers)
+
+    def getRenderLayer(self, name):
+        if name in ('masterLayer', 'defaultRenderLayer'):
+            return self._default
+        for layer in self._layers:
+            if layer.name() == name:
+                return layer
+        return None
+
+    def createRenderLayer(self, name):
+        layer = FakeRenderLayer(name)
+        self._layers.append(layer)
+        self._item_added(layer)
+        return layer
+
+    def getDefaultRenderLayer(self):
+        return self._default
+
+    def getVisibleRenderLayer(self):
+        return self._visible
+
+    def switchToLayer(self, layer):
+        self.switch_count += 1
+        self._visible = layer
+        for observer in list(self._active_layer_observers):
+            observer()
+
+    def addActiveLayerObserver(self, observer):
+        self._active_layer_observers.append(observer)
+
+    def removeActiveLayerObserver(self, observer):
+        self._active_layer_observers.remove(observer)
+
+    def _delete(self, layer):
+        self._layers.remove(layer)
+        if self._visible is layer:
+            self._visible = self._default
+        self._item_removed(layer)
+
+
+def _make_render_setup_modules():
+    render_setup = types.ModuleType('maya.app.renderSetup.model.renderSetup')
+    render_setup.instance = lambda: _scene.render_setup
+    render_setup.RenderSetup = FakeRenderSetup
+
+    render_layer = types.ModuleType('maya.app.renderSetup.model.renderLayer')
+    render_layer.RenderLayer = FakeRenderLayer
+    render_layer.delete = lambda layer: _scene.render_setup._delete(layer)
+
+    collection = types.ModuleType('maya.app.renderSetup.model.collection')
+    collection.Collection = FakeCollection
+    collection.delete = lambda col: col.parent._delete_collection(col)
+
+    selector = types.ModuleType('maya.app.renderSetup.model.selector')
+    selector.Selector = FakeSelector
+
+    class Filters:
+        kAll, kTransforms, kShapes, kShaders, kLights, kSets, kTransformsShapesShaders, kCameras, kCustom = range(9)
+    selector.Filters = Filters
+
+    override = types.ModuleType('maya.app.renderSetup.model.override')
+    override.AbsOverride = FakeOverride
+    override.delete = lambda ov: ov.parent._overrides.remove(ov)
+    return render_setup, render_layer, collection, selector, override
+
+
+def install(scene: FakeScene = None):
+    """偽の maya モジュール群を sys.modules に登録します。scene を指定した場合は現在のシーンにします。"""
+    if scene is not None:
+        set_scene(scene)
+    elif _scene is None:
+        set_scene(FakeScene())
+    if getattr(sys.modules.get('maya'), '_render_layer_tool_fake', False):
+        return
+
+    maya = types.ModuleType('maya')
+    maya._render_layer_tool_fake = True
+    maya.__path__ = []
+    api = types.ModuleType('maya.api')
+    api.__path__ = []
+    utils = types.ModuleType('maya.utils')
+    utils.executeDeferred = lambda func, *args, **kwargs: func(*args, **kwargs)
+    utils.executeInMainThreadWithResult = utils.executeDeferred
+    standalone = types.ModuleType('maya.standalone')
+    standalone.initialize = lambda *args, **kwargs: None
+    standalone.uninitialize = lambda *args, **kwargs: None
+    app = types.ModuleType('maya.app')
+    app.__path__ = []
+    rs_package = types.ModuleType('maya.app.renderSetup')
+    rs_package.__path__ = []
+    rs_model = types.ModuleType('maya.app.renderSetup.model')
+    rs_model.__path__ = []
+
+    cmds = _make_cmds()
+    om2 = _make_openmaya2()
+    render_setup, render_layer, collection, selector, override = _make_render_setup_modules()
+
+    modules = {
+        'maya': maya, 'maya.cmds': cmds, 'maya.utils': utils, 'maya.standalone': standalone,
+        'maya.api': api, 'maya.api.OpenMaya': om2, 'maya.OpenMaya': om2,
+        'maya.app': app, 'maya.app.renderSetup': rs_package, 'maya.app.renderSetup.model': rs_model,
+        'maya.app.renderSetup.model.renderSetup': render_setup,
+        'maya.app.renderSetup.model.renderLayer': render_layer,
+        'maya.app.renderSetup.model.collection': collection,
+        'maya.app.renderSetup.model.selector': selector,
+        'maya.app.renderSetup.model.override': override,
+    }
+    for name, module in modules.items():
+        sys.modules[name] = module
+        parent, _, child = name.rpartition('.')
+        if parent:
+            setattr(modules[parent], child, module)
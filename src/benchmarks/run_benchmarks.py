@@ -0,0 +1,258 @@
+# render_layer_tool/benchmarks/run_benchmarks.py
+# -*- coding: utf-8 -*-
+"""
+合成シーンでツールの主要な処理を計測し、結果をJSONで出力します。
+thresholds.json の上限 (ノードあたりの時間 + 固定時間) や、--baseline で指定した前回の結果より
+遅くなった場合は回帰として報告し、終了コード 1 を返します。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from benchmarks import fake_maya
+from benchmarks.synthetic import generate_scene, geometry_paths
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+# ベースライン比較で、この時間未満の差は計測誤差として無視する
+NOISE_FLOOR_SECONDS = 0.002
+
+
+class BenchmarkContext:
+    """1つのシーンサイズの計測で共有する状態。"""
+    def __init__(self, node_count: int, scene_options: dict):
+        self.node_count = node_count
+        self.scene = generate_scene(node_count, **scene_options)
+        fake_maya.set_scene(self.scene)
+
+        import model
+        self.model = model.RenderLayerModel()
+        self.geometry = geometry_paths(self.scene)
+        self.hierarchy = self.model.get_scene_hierarchy()
+        self.view = None
+        self._layer_serial = 0
+
+    def next_layer_name(self, prefix: str) -> str:
+        self._layer_serial += 1
+        return f"{prefix}{self._layer_serial}"
+
+    def sample(self, count: int, offset: int = 0) -> list[str]:
+        step = max(1, len(self.geometry) // max(1, count))
+        return self.geometry[offset::step][:count]
+
+
+# --- 計測ケース ---
+# 各ケースは (setup, run) を返す。setup は計測に含めない
+
+def case_scan_hierarchy(ctx):
+    return None, ctx.model.get_scene_hierarchy
+
+
+def case_search(ctx):
+    def run():
+        ctx.model._search_index = None # インデックスの構築を含めて計測する
+        ctx.model.search_scene("mesh1")
+    return None, run
+
+
+def case_create_layer(ctx):
+    count = min(1000, max(1, len(ctx.geometry) // 10))
+    targets = ctx.sample(count)
+    pv_off = ctx.sample(count, offset=1)
+
+    def run():
+        ctx.model.create_layer(ctx.next_layer_name("RL_bench"), targets, pv_off, auto_matte=True)
+    return None, run
+
+
+def case_delete_layers(ctx):
+    names = []
+
+    def setup():
+        names[:] = [ctx.next_layer_name("RL_delete") for _ in range(20)]
+        for name in names:
+            ctx.model.create_layer(name, ctx.sample(10), [])
+        # 表示中のレイヤーを削除対象にしてレイヤー切り替えも計測に含める
+        ctx.model.rs.switchToLayer(ctx.model.rs.getRenderLayer(names[0]))
+
+    return setup, lambda: ctx.model.delete_layers(names)
+
+
+def case_render_cost(ctx):
+    # シーンのメッシュを300レイヤーに分け、PV OFF は共通、一部は自動マットにする
+    layer_count = 300
+    chunk = max(1, len(ctx.geometry) // layer_count)
+    mattes = ctx.sample(min(100, len(ctx.geometry)), offset=1)
+    specs = [{'name': f"RL_cost{i}", 'targets': ctx.geometry[i * chunk:(i + 1) * chunk], 'mattes': mattes,
+              'auto_matte': i % 10 == 0}
+             for i in range(layer_count)]
+    return None, lambda: ctx.model.estimate_render_cost(specs)
+
+
+def case_tree_population(ctx):
+    categorized = ctx.model.categorize_hierarchy(ctx.hierarchy)
+    return None, lambda: ctx.view.populate_scene_tree_hierarchy(categorized)
+
+
+def case_selection_sync(ctx):
+    paths = ctx.sample(min(2000, max(1, len(ctx.geometry) // 100)))
+
+    def setup():
+        ctx.view.populate_scene_tree_hierarchy(ctx.model.categorize_hierarchy(ctx.hierarchy))
+    return setup, lambda: ctx.view.sync_tree_selection(paths)
+
+
+MODEL_CASES = {
+    'scan_hierarchy': case_scan_hierarchy,
+    'search': case_search,
+    'create_layer': case_create_layer,
+    'delete_layers': case_delete_layers,
+    'render_cost': case_render_cost,
+}
+QT_CASES = {
+    'tree_population': case_tree_population,
+    'selection_sync': case_selection_sync,
+}
+
+
+def _create_view():
+    """オフスクリーンのQtでViewを作成します。PySide6 がない場合は None を返します。"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PySide6 import QtWidgets
+    except ImportError:
+        return None
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    import view
+    widget = view.RenderLayerToolView()
+    widget._qt_app = app # アプリケーションがViewより先に破棄されないよう保持する
+    return widget
+
+
+def _time_case(ctx, factory, repeat: int) -> dict:
+    setup, run = factory(ctx)
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+    return {'min': min(samples), 'median': statistics.median(samples), 'samples': samples}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, cases=None, repeat: int = 3, scene_options: dict = None,
+                   log=print) -> list[dict]:
+    fake_maya.install()
+    view_widget = _create_view()
+    if view_widget is None:
+        log("PySide6 が見つからないため、Qt のケースはスキップします。")
+
+    results = []
+    for size in sizes:
+        ctx = BenchmarkContext(size, scene_options or {})
+        ctx.view = view_widget
+        for name, factory in {**MODEL_CASES, **QT_CASES}.items():
+            if cases and name not in cases:
+                continue
+            entry = {'case': name, 'nodes': size}
+            if name in QT_CASES and view_widget is None:
+                entry['skipped'] = "PySide6 not available"
+            else:
+                entry.update(_time_case(ctx, factory, repeat))
+                log(f"{name:>16} {size:>9,} nodes: median {entry['median'] * 1000:9.2f} ms"
+                    f" (min {entry['min'] * 1000:.2f} ms)")
+            results.append(entry)
+    return results
+
+
+# --- 回帰判定 ---
+
+def load_thresholds(path: str = THRESHOLDS_PATH) -> dict:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check_regressions(results: list[dict], thresholds: dict, baseline: list[dict] = None,
+                      tolerance: float = 0.25) -> list[dict]:
+    """
+    しきい値 ({ケース: {'per_node_us', 'fixed_ms'}}) を超えた結果と、
+    ベースラインより tolerance の割合以上遅くなった結果を返します。
+    """
+    previous = {(r['case'], r['nodes']): r for r in baseline or () if 'median' in r}
+    regressions = []
+    for result in results:
+        if 'median' not in result:
+            continue
+        key = (result['case'], result['nodes'])
+        limit = thresholds.get(result['case'])
+        if limit:
+            allowed = (limit.get('per_node_us', 0.0) * result['nodes'] / 1e6 + limit.get('fixed_ms', 0.0) / 1000.0)
+            if result['median'] > allowed:
+                regressions.append({'case': key[0], 'nodes': key[1], 'reason': 'threshold',
+                                    'median': result['median'], 'limit': allowed})
+        before = previous.get(key)
+        if before and result['median'] - before['median'] > NOISE_FLOOR_SECONDS \
+                and result['median'] > before['median'] * (1.0 + tolerance):
+            regressions.append({'case': key[0], 'nodes': key[1], 'reason': 'baseline',
+                                'median': result['median'], 'limit': before['median'] * (1.0 + tolerance)})
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render Layer Tool: 合成シーンのベンチマーク")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="トランスフォーム数")
+    parser.add_argument('--cases', nargs='+', choices=sorted({**MODEL_CASES, **QT_CASES}), help="実行するケース")
+    parser.add_argument('--repeat', type=int, default=3, help="各ケースの繰り返し回数")
+    parser.add_argument('--depth', type=int, default=3, help="アセットの階層の深さ")
+    parser.add_argument('--breadth', type=int, default=10, help="各グループの子の数")
+    parser.add_argument('--namespaces', type=int, default=4, help="ネームスペースの数")
+    parser.add_argument('--mix', default="mesh=0.85,light=0.1,camera=0.05", help="末端ノードの比率")
+    parser.add_argument('--json', help="結果JSONの出力先")
+    parser.add_argument('--thresholds', default=THRESHOLDS_PATH, help="しきい値JSON (空文字で無効)")
+    parser.add_argument('--baseline', help="比較する前回の結果JSON")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="ベースラインに対して許容する遅延の割合")
+    args = parser.parse_args(argv)
+
+    mix = {}
+    for item in args.mix.split(','):
+        kind, _, ratio = item.partition('=')
+        mix[kind.strip()] = float(ratio)
+    scene_options = {'depth': args.depth, 'breadth': args.breadth, 'namespaces': args.namespaces, 'mix': mix}
+
+    results = run_benchmarks(args.sizes, args.cases, args.repeat, scene_options)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', [])
+    regressions = check_regressions(results, load_thresholds(args.thresholds), baseline, args.tolerance)
+
+    report = {
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'scene_options': scene_options,
+        'results': results,
+        'regressions': regressions,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    for regression in regressions:
+        print(f"REGRESSION {regression['case']} {regression['nodes']:,} nodes ({regression['reason']}): "
+              f"{regression['median'] * 1000:.2f} ms > {regression['limit'] * 1000:.2f} ms")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
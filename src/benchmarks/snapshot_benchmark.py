@@ -0,0 +1,101 @@
+# render_layer_tool/benchmarks/snapshot_benchmark.py
+# -*- coding: utf-8 -*-
+"""
+階層辞書と SceneSnapshot のメモリ使用量の比較ベンチマーク。Mayaは不要です。
+
+使い方 (src ディレクトリで):
+    python -m benchmarks.snapshot_benchmark                       # 10k / 100k / 1M ノード
+    python -m benchmarks.snapshot_benchmark --sizes 10000 50000 --json result.json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from scene_snapshot import SceneSnapshot, NO_NODE
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def generate_snapshot(node_count: int, branching: int = 8, namespaces: int = 4) -> SceneSnapshot:
+    """
+    各グループが branching 個の子を持つ合成シーンを作成します。
+    アセットの参照を模して、ネームスペースを除く短縮名はグループ間で重複させます。
+    """
+    snapshot = SceneSnapshot()
+    queue = []
+    for i in range(min(node_count, branching)):
+        queue.append(snapshot.add_node(NO_NODE, f"asset{i}:root_grp"))
+    head = 0
+    while len(snapshot) < node_count:
+        parent = queue[head]
+        head += 1
+        for i in range(branching):
+            if len(snapshot) >= node_count:
+                break
+            is_leaf = i % 2 == 1
+            name = f"ns{i % namespaces}:{'geo' if is_leaf else 'grp'}{i}"
+            index = snapshot.add_node(parent, name, 'geometry' if is_leaf else 'group',
+                                      (i % 3 != 0) if is_leaf else None)
+            if not is_leaf:
+                queue.append(index)
+    return snapshot
+
+
+def _measure(factory):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = factory()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def run(sizes=DEFAULT_SIZES) -> list[dict]:
+    results = []
+    for size in sizes:
+        source = generate_snapshot(size)
+        hierarchy, dict_bytes, dict_time = _measure(source.to_hierarchy)
+        del hierarchy
+        _, snapshot_bytes, snapshot_time = _measure(lambda: generate_snapshot(size))
+        results.append({
+            'nodes': size,
+            'dict_bytes': dict_bytes,
+            'snapshot_bytes': snapshot_bytes,
+            'dict_bytes_per_node': dict_bytes / size,
+            'snapshot_bytes_per_node': snapshot_bytes / size,
+            'ratio': dict_bytes / snapshot_bytes if snapshot_bytes else 0.0,
+            'dict_build_seconds': dict_time,
+            'snapshot_build_seconds': snapshot_time,
+        })
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="階層辞書と SceneSnapshot のメモリ比較")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="ノード数")
+    parser.add_argument('--json', help="結果JSONの出力先")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes)
+    for r in results:
+        print(f"{r['nodes']:>9,} nodes: dict {r['dict_bytes'] / 2**20:8.1f} MiB ({r['dict_bytes_per_node']:6.1f} B/node)"
+              f" | snapshot {r['snapshot_bytes'] / 2**20:7.1f} MiB ({r['snapshot_bytes_per_node']:5.1f} B/node)"
+              f" | x{r['ratio']:.1f}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# render_layer_tool/benchmarks/synthetic.py
+# -*- coding: utf-8 -*-
+"""
+ベンチマーク用の合成シーンの生成。
+アセット (ネームスペース付きのグループ階層) をノード数に達するまで並べ、末端のトランスフォームに
+メッシュ/ライト/カメラのシェイプを比率に従って付けます。
+"""
+import random
+
+from benchmarks.fake_maya import FakeScene
+
+DEFAULT_MIX = {'mesh': 0.85, 'light': 0.1, 'camera': 0.05}
+
+_SHAPE_TYPE_BY_KIND = {'mesh': 'mesh', 'light': 'pointLight', 'camera': 'camera'}
+_STARTUP_CAMERAS = ('persp', 'top', 'front', 'side')
+
+
+def generate_scene(node_count: int, depth: int = 3, breadth: int = 10, namespaces: int = 4,
+                   mix: dict = None, seed: int = 0, scene_name: str = "") -> FakeScene:
+    """
+    トランスフォームが node_count 個になるシーンを作成します (シェイプとスタートアップカメラは数えません)。
+    depth: アセットのルートから末端までの階層数, breadth: 各グループの子の数,
+    namespaces: アセットに割り振るネームスペースの数 (0 ならネームスペースなし),
+    mix: 末端ノードの種類 ('mesh' / 'light' / 'camera') の比率
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+
+    scene = FakeScene(scene_name)
+    for name in _STARTUP_CAMERAS:
+        camera = scene.add(None, name, startupCamera=True)
+        scene.add(camera.path, f"{name}Shape", 'camera')
+
+    created = 0
+    asset_index = 0
+    while created < node_count:
+        prefix = f"ns{asset_index % namespaces}:" if namespaces else ""
+        root = scene.add(None, f"{prefix}asset{asset_index}_grp")
+        created += 1
+        # (親のパス, 親の深さ) を深さ優先で展開する
+        stack = [(root.path, 1)]
+        while stack and created < node_count:
+            parent_path, level = stack.pop()
+            for i in range(breadth):
+                if created >= node_count:
+                    break
+                if level < depth:
+                    node = scene.add(parent_path, f"{prefix}grp{level}_{i}")
+                    stack.append((node.path, level + 1))
+                else:
+                    kind = rng.choices(kinds, weights)[0]
+                    node = scene.add(parent_path, f"{prefix}{kind}{i}")
+                    shape_type = _SHAPE_TYPE_BY_KIND.get(kind, kind)
+                    if shape_type == 'mesh':
+                        # 変形の履歴を模して中間オブジェクトを先に置く
+                        if i % 4 == 0:
+                            scene.add(node.path, f"{node.name.rpartition(':')[2]}ShapeOrig", 'mesh', intermediate=True,
+                                      primaryVisibility=True)
+                        # 一部のメッシュには Arnold のサブディビジョンを設定する
+                        subdiv = {'aiSubdivType': 1, 'aiSubdivIterations': rng.randint(1, 3)} if i % 10 == 0 else {}
+                        scene.add(node.path, f"{node.name.rpartition(':')[2]}Shape", 'mesh',
+                                  primaryVisibility=rng.random() > 0.1, faces=rng.randint(50, 5000), **subdiv)
+                    else:
+                        scene.add(node.path, f"{node.name.rpartition(':')[2]}Shape", shape_type)
+                created += 1
+        asset_index += 1
+    return scene
+
+
+def geometry_paths(scene: FakeScene) -> list[str]:
+    """メッシュを持つトランスフォームのフルパス (生成順)。"""
+    return [node.path for node in scene.nodes.values()
+            if node.node_type == 'transform' and any(
+                child.node_type == 'mesh' and not child.intermediate for child in node.children)]
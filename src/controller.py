@@ -3,11 +3,28 @@
 """
 Viewからのユーザー入力を受け取り、Modelと連携してUIを更新するController層。
 """
+import time
+
 import maya.cmds as cmds
 import maya.OpenMaya as om
+import maya.api.OpenMaya as om2
 
 from PySide6 import QtWidgets, QtCore
 
+import profiler
+import scene_scan
+from aov_manager import AOV_PRESETS
+from refresh_scheduler import RefreshScheduler
+from scene_pipeline import ScenePipeline
+from snapshot_cache import SnapshotCache
+
+# 1回の更新でこれ以上のDAG変更が溜まった場合は差分ではなく全体を再構築する
+FULL_REFRESH_CHANGE_THRESHOLD = 5000
+# キャッシュから表示した階層を照合する再走査に、1回のタイマー呼び出しで使う時間 (秒)
+VALIDATION_TIME_BUDGET = 0.008
+# ツリーの選択変更をまとめてからMayaへ送るまでの待ち時間 (ラバーバンド選択中の連続した変更を1回にする)
+SELECTION_PUSH_DELAY_MS = 50
+
 class RenderLayerController:
     """
     ModelとViewを仲介するコントローラークラス。
@@ -16,8 +33,49 @@ class RenderLayerController:
         self.model = model
         self.view = view
         
-        self._is_syncing = False
+        # ツリー -> Maya の選択送信。Mayaの選択をツリーに反映するたびに世代を進め、
+        # それより前に予約された送信 (反映中にツリーから発行された変更を含む) は破棄する
+        self._selection_generation = 0
+        self._selection_push_generation = -1
+        # 最後に確認/送信したMayaの選択と、送信した選択の通知として無視する選択
+        self._maya_selection = None
+        self._selection_echo = None
         self._callback_ids = []
+        # API 2.0 のコールバックIDは int なので scriptJob とは別に管理する
+        self._api2_callback_ids = []
+
+        # シーンイベントはスケジューラでまとめてから差分/全体更新する
+        self._dag_events_suspended = False
+        self._refresh_scheduler = RefreshScheduler(
+            self._on_scheduled_refresh, debounce_ms=150, max_latency_ms=1000, parent=self.view)
+        # シーン階層のディスクキャッシュ。起動時/シーンを開いた時の全走査を後回しにする
+        self._snapshot_cache = SnapshotCache()
+        # 走査後のソート・カテゴリ分け・検索インデックス作成はワーカースレッドで行う
+        self._scene_pipeline = ScenePipeline(self.model.prepare_scene_data, parent=self.view)
+        self._scene_pipeline.ready.connect(self._on_scene_data_ready)
+        self._scene_pipeline.failed.connect(self._on_scene_data_failed)
+        # キャッシュから表示した階層とシーンの照合も、走査結果との比較はワーカースレッドで行う
+        self._reconcile_pipeline = ScenePipeline(self.model.plan_reconcile, parent=self.view)
+        self._reconcile_pipeline.ready.connect(self._on_reconcile_plan_ready)
+        self._reconcile_pipeline.failed.connect(self._on_reconcile_plan_failed)
+        # 照合のための再走査はメインスレッドで時間を区切って少しずつ進める
+        # (走査中にDAGイベントが届いたら、その時点の走査は破棄してやり直す)
+        self._validation_scan = None
+        self._validation_events = 0
+        self._validation_timer = QtCore.QTimer(self.view)
+        self._validation_timer.setInterval(0)
+        self._validation_timer.timeout.connect(self._advance_cached_scene_validation)
+        # 計測中は統計パネルを定期的に更新する
+        self._profiler_timer = QtCore.QTimer(self.view)
+        self._profiler_timer.setInterval(1000)
+        self._profiler_timer.timeout.connect(self._refresh_profiler_panel)
+        self._selection_push_timer = QtCore.QTimer(self.view)
+        self._selection_push_timer.setSingleShot(True)
+        self._selection_push_timer.setInterval(SELECTION_PUSH_DELAY_MS)
+        self._selection_push_timer.timeout.connect(self._push_tree_selection)
+        # レイヤー一覧はレジストリの差分 (追加/削除/名前変更/統計の更新) だけを反映する
+        self.view.layer_list_model.set_stats_provider(self.model.layer_registry.stats)
+        self.model.layer_registry.add_listener(self.view.apply_layer_list_op)
 
         self._connect_signals()
         self._install_callbacks()
@@ -26,38 +84,125 @@ class RenderLayerController:
 
     def _connect_signals(self):
         self.view.request_populate_tree.connect(self.refresh_scene_tree)
-        self.view.scene_objects_tree.itemSelectionChanged.connect(self.on_tree_selection_changed)
+        self.view.scene_selection_changed.connect(self.on_tree_selection_changed)
         self.view.request_add_to_target.connect(self.on_add_to_list)
         self.view.request_remove_from_target.connect(self.on_remove_from_list)
         self.view.request_create_layer.connect(self.on_create_layer)
+        self.view.request_estimate_cost.connect(self.on_estimate_cost)
         self.view.request_layer_list_refresh.connect(self.refresh_layer_list)
         self.view.request_delete_selected_layers.connect(self.on_delete_selected)
         self.view.request_delete_all_layers.connect(self.on_delete_all)
         self.view.widget_closed.connect(self.cleanup)
+        self.view.search_text_changed.connect(self.on_search_text_changed)
+        self.view.request_apply_aov_preset.connect(self.on_apply_aov_preset)
+        self.view.request_profiling_toggled.connect(self.on_profiling_toggled)
+        self.view.request_profiler_reset.connect(self.on_profiler_reset)
+        self.view.request_profiler_dump.connect(self.on_profiler_dump)
 
     def _install_callbacks(self):
         """Mayaのシーン変更を検知するためのコールバックをインストールします。"""
-        # --- ★★ここを修正★★ ---
-        # "DagObjectDeleted" をリストから削除し、より安定した "delete" 条件を個別に追加
-        events = ["DagObjectCreated", "NameChanged", "Undo", "Redo"]
-        for event in events:
-            try:
-                job_id = cmds.scriptJob(event=[event, self.refresh_scene_tree], protected=True)
-                self._callback_ids.append(job_id)
-            except Exception as e:
-                print(f"Failed to install scriptJob for {event}: {e}")
-        
-        # オブジェクト削除は 'conditionTrue' (ct) で監視する
+        # DAGの追加/削除/リペアレントとトランスフォームのリネームだけを差分として受け取る
+        # (Undo/Redo もこれらのメッセージとして通知される)
         try:
-            delete_job_id = cmds.scriptJob(ct=["delete", self.refresh_scene_tree], protected=True)
-            self._callback_ids.append(delete_job_id)
+            self._api2_callback_ids.extend([
+                om2.MDagMessage.addChildAddedCallback(self._on_dag_child_changed),
+                om2.MDagMessage.addChildRemovedCallback(self._on_dag_child_changed),
+                om2.MNodeMessage.addNameChangedCallback(om2.MObject(), self._on_node_name_changed),
+            ])
         except Exception as e:
-            print(f"Failed to install scriptJob for delete condition: {e}")
-        # -------------------------
+            print(f"Failed to install DAG callbacks: {e}")
+
+        # シーンを開く/新規作成した場合は差分ではなく全体を再構築する
+        for message, suspend in (
+            (om2.MSceneMessage.kBeforeOpen, True),
+            (om2.MSceneMessage.kBeforeNew, True),
+            (om2.MSceneMessage.kAfterOpen, False),
+            (om2.MSceneMessage.kAfterNew, False),
+        ):
+            try:
+                cb_id = om2.MSceneMessage.addCallback(
+                    message, lambda *args, suspend=suspend: self._on_scene_file_event(suspend))
+                self._api2_callback_ids.append(cb_id)
+            except Exception as e:
+                print(f"Failed to install scene callback {message}: {e}")
 
         selection_cb_id = om.MEventMessage.addEventCallback("SelectionChanged", self.on_maya_selection_changed)
         self._callback_ids.append(selection_cb_id)
 
+    # --- DAG差分コールバック ---
+
+    def _on_dag_child_changed(self, child, parent, *args):
+        if self._dag_events_suspended:
+            return
+        if child.hasFn(om2.MFn.kTransform):
+            path = f"{parent.fullPathName()}|{om2.MFnDagNode(child).name()}"
+        elif child.hasFn(om2.MFn.kShape):
+            # シェイプの増減は親トランスフォームの分類にのみ影響する
+            path = parent.fullPathName()
+        else:
+            return
+        if path:
+            self._refresh_scheduler.post('dag', ('dirty', path))
+
+    def _on_node_name_changed(self, node, prev_name, *args):
+        if self._dag_events_suspended or not prev_name:
+            return
+        if not node.hasFn(om2.MFn.kDagNode):
+            # レンダーレイヤーの名前変更はレイヤー一覧にだけ反映する
+            fn_node = om2.MFnDependencyNode(node)
+            if fn_node.typeName == 'renderSetupLayer':
+                self.model.layer_registry.rename(prev_name, fn_node.name())
+            return
+        # シェイプのリネームはツリーに影響しない
+        if not node.hasFn(om2.MFn.kTransform):
+            return
+        try:
+            new_path = om2.MDagPath.getAPathTo(node).fullPathName()
+        except RuntimeError:
+            return
+        parent_path, _, new_name = new_path.rpartition('|')
+        if new_name != prev_name:
+            self._refresh_scheduler.post('dag', ('rename', f"{parent_path}|{prev_name}", new_path))
+
+    def _on_scene_file_event(self, suspend):
+        if suspend:
+            # 閉じる前のシーンの階層を次回のために保存する
+            self._save_snapshot_cache()
+            self._stop_cached_scene_validation()
+        self._dag_events_suspended = suspend
+        self._refresh_scheduler.discard('dag')
+        if not suspend:
+            self._refresh_scheduler.post('full')
+
+    @profiler.instrument()
+    def _on_scheduled_refresh(self, events):
+        """スケジューラから呼ばれ、溜まったイベントを1回の更新として処理します。"""
+        if not self._api2_callback_ids:
+            return
+        if 'full' in events:
+            # 新しいシーンの Render Setup に登録し直し、レイヤー一覧を作り直す
+            self.model.layer_registry.attach()
+        changes = events.get('dag', [])
+        if 'full' in events and self._restore_scene_tree_from_cache():
+            return
+        if ('full' in events or len(changes) > FULL_REFRESH_CHANGE_THRESHOLD or self._scene_pipeline.is_busy()
+                or self._reconcile_pipeline.is_busy()):
+            # 処理中のスナップショットには今回の変更が含まれていない可能性があるので走査し直す
+            # (照合中のスナップショットはワーカーが読んでいるので書き換えない)
+            self.refresh_scene_tree()
+            return
+        ops = self.model.apply_dag_changes(changes)
+        self.view.apply_scene_tree_delta(ops)
+        if ops and self.view.scene_tree_model.is_filtered():
+            self.on_search_text_changed(self.view.search_le.text())
+        if self._validation_scan is not None:
+            # 差分を反映したスナップショットに対して照合をやり直す
+            self._start_cached_scene_validation()
+
+    def get_refresh_stats(self) -> dict:
+        """更新スケジューラのカウンタ (投稿数・集約数・実行回数) を返します。"""
+        return dict(self._refresh_scheduler.stats)
+
     def cleanup(self):
         """ツール終了時にコールバックをすべて解除します。"""
         for cb_id in self._callback_ids:
@@ -70,62 +215,374 @@ class RenderLayerController:
             except Exception:
                 pass # Maya終了時などにエラーが出ることがあるが無視してよい
         self._callback_ids = []
+
+        try:
+            om2.MMessage.removeCallbacks(self._api2_callback_ids)
+        except Exception:
+            pass
+        self._api2_callback_ids = []
+        self._refresh_scheduler.stop()
+        self._selection_push_timer.stop()
+        self._scene_pipeline.shutdown()
+        self._reconcile_pipeline.shutdown()
+        self.model.layer_switcher.close()
+        self.model.layer_registry.remove_listener(self.view.apply_layer_list_op)
+        self.model.layer_registry.detach()
+        self._save_snapshot_cache()
+        self._stop_cached_scene_validation()
+        self._profiler_timer.stop()
+        profiler.disable()
         print("Cleaned up callbacks.")
 
     def refresh_all_ui(self):
-        self.refresh_scene_tree()
+        if not self._restore_scene_tree_from_cache():
+            self.refresh_scene_tree()
         self.refresh_layer_list()
 
+    @profiler.instrument()
     def refresh_scene_tree(self):
+        """
+        シーンを走査し直します。メインスレッドではスナップショットの取得のみ行い、
+        後処理が終わった時点 (_on_scene_data_ready) でツリーを作り直します。
+        """
+        # 全体を再走査するので保留中の差分は不要になる
+        self._refresh_scheduler.discard()
+        self._stop_cached_scene_validation()
+        self._reconcile_pipeline.cancel()
+        snapshot = self.model.scan_scene_snapshot()
+        self._scene_pipeline.submit(snapshot)
+        self.view.set_status(f"シーン階層を処理しています ({len(snapshot):,} ノード)...", color="#FFC107")
+
+    @profiler.instrument()
+    def _on_scene_data_ready(self, generation: int, data: dict):
+        if not self._api2_callback_ids:
+            return # ツールが閉じられている
+        hierarchy = self.model.adopt_scene_data(data)
+        self.view.populate_scene_tree_hierarchy(data['categorized'])
+        if self.view.search_le.text().strip():
+            self._apply_search(self.view.search_le.text())
+        self.sync_tree_with_maya_selection()
+        self.view.set_status(f"シーン階層を読み込みました ({self.model.node_count():,} ノード, ルート {len(hierarchy):,})。")
+
+    def _on_scene_data_failed(self, generation: int, message: str):
+        # ワーカーで失敗した場合はメインスレッドで従来どおり処理する
+        print(f"Scene post-processing failed, falling back to the main thread: {message}")
         hierarchy = self.model.get_scene_hierarchy()
-        self.view.populate_scene_tree_hierarchy(hierarchy)
+        self.view.populate_scene_tree_hierarchy(self.model.categorize_hierarchy(hierarchy))
+        if self.view.search_le.text().strip():
+            self._apply_search(self.view.search_le.text())
+        self.sync_tree_with_maya_selection()
+
+    # --- スナップショットキャッシュ ---
+
+    def _restore_scene_tree_from_cache(self) -> bool:
+        """
+        ディスクキャッシュの階層ですぐにツリーを表示し、シーンとの照合は表示後に時間を区切って行います。
+        キャッシュが使えない場合 (フィンガープリントが一致しない場合を含む) は False を返します。
+        """
+        hierarchy = self.model.load_cached_hierarchy(self._snapshot_cache)
+        if hierarchy is None:
+            return False
+        self._refresh_scheduler.discard()
+        self._scene_pipeline.cancel()
+        self._reconcile_pipeline.cancel()
+        self.view.populate_scene_tree_hierarchy(self.model.categorize_hierarchy(hierarchy))
+        if self.view.search_le.text().strip():
+            self._apply_search(self.view.search_le.text())
+        self.sync_tree_with_maya_selection()
+        self.view.set_status("キャッシュからシーン階層を読み込みました。シーンと照合しています...")
+        self._start_cached_scene_validation()
+        return True
+
+    def _start_cached_scene_validation(self):
+        """キャッシュから表示した階層とシーンの照合を (最初から) 始めます。"""
+        self._validation_scan = scene_scan.iter_scan_snapshot()
+        self._validation_events = self._refresh_scheduler.stats['events_posted']
+        self._validation_timer.start()
+
+    def _stop_cached_scene_validation(self):
+        self._validation_timer.stop()
+        self._validation_scan = None
+
+    @profiler.instrument()
+    def _advance_cached_scene_validation(self):
+        """
+        照合のための再走査を VALIDATION_TIME_BUDGET 秒ぶん進めます。走査が終わったら
+        比較をワーカースレッドに渡し、違いは比較の完了時 (_on_reconcile_plan_ready) に差分だけを反映します。
+        """
+        if not self._api2_callback_ids:
+            self._stop_cached_scene_validation()
+            return # ツールが閉じられている
+        if self._refresh_scheduler.stats['events_posted'] != self._validation_events:
+            # 中断している間にDAGが変更されたので、途中までの走査は使えない
+            self._start_cached_scene_validation()
+        deadline = time.perf_counter() + VALIDATION_TIME_BUDGET
+        scanned = None
+        while scanned is None and time.perf_counter() < deadline:
+            scanned = next(self._validation_scan)
+        if scanned is None:
+            return
+        self._stop_cached_scene_validation()
+        self._reconcile_pipeline.submit(self.model.begin_reconcile(scanned))
+
+    @profiler.instrument()
+    def _on_reconcile_plan_ready(self, generation: int, result: dict):
+        if not self._api2_callback_ids:
+            return # ツールが閉じられている
+        ops = self.model.apply_reconcile_plan(result)
+        if ops is None:
+            return # 比較中にスナップショットが置き換えられた
+        self.view.apply_scene_tree_delta(ops)
+        if ops and self.view.scene_tree_model.is_filtered():
+            self.on_search_text_changed(self.view.search_le.text())
+        self._save_snapshot_cache()
+        self.view.set_status(f"シーン階層を照合しました ({len(ops)} 件の変更)。")
+
+    def _on_reconcile_plan_failed(self, generation: int, message: str):
+        # 照合できなかった場合はキャッシュの階層を使わずに走査し直す
+        print(f"Scene reconcile failed, rescanning the scene: {message}")
+        self.refresh_scene_tree()
+
+    def _save_snapshot_cache(self):
+        if (self._refresh_scheduler.has_pending() or self._scene_pipeline.is_busy()
+                or self._reconcile_pipeline.is_busy() or self._validation_scan is not None):
+            # 反映していないDAGの変更や照合中の違いがあり、スナップショットがシーンと一致している保証がない
+            return
+        try:
+            self.model.save_hierarchy_cache(self._snapshot_cache)
+        except Exception as e:
+            print(f"Failed to save snapshot cache: {e}")
+
+    @profiler.instrument()
+    def on_search_text_changed(self, text: str):
+        self._apply_search(text)
         self.sync_tree_with_maya_selection()
 
+    def _apply_search(self, text: str):
+        try:
+            visible_paths = self.model.search_scene(text)
+        except ValueError as e:
+            self.view.set_status(f"検索エラー: {e}", color="#F44336")
+            return
+        self.view.filter_scene_tree(visible_paths)
+        if visible_paths is not None:
+            self.view.set_status(f"検索: {len(visible_paths)} ノードを表示しています。")
+
+    @profiler.instrument()
     def refresh_layer_list(self):
-        layers = self.model.get_all_layers()
-        self.view.populate_render_layer_list(layers)
+        """レイヤー一覧を Render Setup から作り直します (通常はレジストリの差分通知で更新される)。"""
+        self.model.layer_registry.rebuild()
 
+    @profiler.instrument()
     def on_create_layer(self):
         layer_name = self.view.layer_name_le.text()
         targets = [self.view.target_list_widget.item(i).text() for i in range(self.view.target_list_widget.count())]
         pv_off = [self.view.pvoff_list_widget.item(i).text() for i in range(self.view.pvoff_list_widget.count())]
+        auto_matte = self.view.auto_matte_checkbox.isChecked()
+
+        if self.view.create_each_checkbox.isChecked():
+            self._create_layers_each(targets, pv_off, auto_matte)
+            return
         
         if not layer_name:
             self.view.set_status("エラー: レイヤー名を入力してください。", color="#F44336")
             return
             
-        success = self.model.create_layer(layer_name, targets, pv_off)
+        self.model.reset_selector_stats()
+        success = self.model.create_layer(layer_name, targets, pv_off, auto_matte=auto_matte)
         if success:
-            self.view.set_status(f"レイヤー '{layer_name}' を作成しました。", color="#7EE081")
-            self.refresh_layer_list()
+            self.view.set_status(
+                f"レイヤー '{layer_name}' を作成しました。{self._selector_stats_text()}", color="#7EE081")
+            self._apply_checked_aovs([layer_name])
         else:
             self.view.set_status("レイヤーの作成に失敗しました。", color="#F44336")
 
+    def _create_layers_each(self, targets: list, pv_off: list, auto_matte: bool = False):
+        """個別作成モード: 対象リストの各オブジェクトに1レイヤーずつ作成します。"""
+        if not targets:
+            self.view.set_status("エラー: 対象リストが空です。", color="#F44336")
+            return
+
+        progress = QtWidgets.QProgressDialog("レイヤーを作成中...", "キャンセル", 0, len(targets), self.view)
+        progress.setWindowModality(QtCore.Qt.WindowModal)
+        progress.setMinimumDuration(500)
+
+        def on_progress(done, total, layer_name, seconds):
+            progress.setValue(done)
+            progress.setLabelText(f"{layer_name} ({done}/{total})")
+            QtWidgets.QApplication.processEvents()
+            return not progress.wasCanceled()
+
+        self.model.reset_selector_stats()
+        try:
+            result = self.model.create_layers_each(
+                targets, pv_off, progress_callback=on_progress, auto_matte=auto_matte)
+        except Exception as e:
+            self.view.set_status(f"レイヤーの作成に失敗しました: {e}", color="#F44336")
+            return
+        finally:
+            progress.close()
+
+        created, reused = result['created'], result['reused']
+        timings = result['timings']
+        if timings:
+            slowest = max(timings, key=timings.get)
+            print(f"Created {len(created)} and updated {len(reused)} layers in {result['elapsed']:.2f}s "
+                  f"(avg {result['elapsed'] / len(timings) * 1000:.1f} ms, slowest {slowest}: {timings[slowest] * 1000:.1f} ms)")
+        message = f"{len(created)} 個のレイヤーを作成しました"
+        if reused:
+            message += f" (既存の {len(reused)} 個は内容を更新)"
+        message += f" ({result['elapsed']:.2f} 秒)。{self._selector_stats_text()}"
+        if result['cancelled']:
+            message = "キャンセルしました。" + message
+        self.view.set_status(message, color="#FFC107" if result['cancelled'] else "#7EE081")
+        self._apply_checked_aovs(created + reused)
+
+    @profiler.instrument()
+    def on_estimate_cost(self):
+        """作成予定のレイヤー (対象/PV OFFリスト) と既存レイヤーのレンダーコストを見積もります。"""
+        targets = [self.view.target_list_widget.item(i).text() for i in range(self.view.target_list_widget.count())]
+        pv_off = [self.view.pvoff_list_widget.item(i).text() for i in range(self.view.pvoff_list_widget.count())]
+        auto_matte = self.view.auto_matte_checkbox.isChecked()
+
+        planned = []
+        if targets:
+            if self.view.create_each_checkbox.isChecked():
+                planned = [{'name': self.model.layer_name_for_target(target), 'targets': [target],
+                            'mattes': pv_off, 'auto_matte': auto_matte} for target in targets]
+            else:
+                planned = [{'name': self.view.layer_name_le.text() or "(新規レイヤー)", 'targets': targets,
+                            'mattes': pv_off, 'auto_matte': auto_matte}]
+        planned_names = {spec['name'] for spec in planned}
+        specs = planned + [spec for spec in self.model.layer_specs_from_scene() if spec['name'] not in planned_names]
+        if not specs:
+            self.view.set_status("見積もるレイヤーがありません。", color="#FFC107")
+            return
+
+        try:
+            result = self.model.estimate_render_cost(specs)
+        except Exception as e:
+            self.view.set_status(f"コストの見積もりに失敗しました: {e}", color="#F44336")
+            return
+
+        print(f"{'Layer':<32} {'Meshes':>8} {'Mattes':>8} {'Triangles':>12} {'Effective':>12} {'Share':>7}")
+        for row in sorted(result['layers'], key=lambda row: row['cost'], reverse=True):
+            print(f"{row['name']:<32} {row['meshes']:>8,} {row['mattes']:>8,} {row['triangles']:>12,} "
+                  f"{row['effective_triangles']:>12,} {row['share'] * 100:>6.1f}%")
+        if result['warning']:
+            self.view.set_status(f"警告: {result['warning']} (詳細はスクリプトエディタ)", color="#FFC107")
+        else:
+            self.view.set_status(f"{len(result['layers'])} レイヤーのコストを見積もりました (詳細はスクリプトエディタ)。")
+
+    def _selector_stats_text(self) -> str:
+        stats = self.model.selector_stats
+        if not stats['original_entries']:
+            return ""
+        return f" (セレクター: {stats['original_entries']} → {stats['optimized_entries']} エントリ)"
+
+    # --- AOV ---
+
+    @profiler.instrument()
+    def on_apply_aov_preset(self, preset_name: str):
+        """
+        プリセットをチェックボックスに反映して適用します。レイヤーリストで選択中のレイヤーがあれば
+        そのレイヤーのAOVだけを切り替え、なければシーン全体のAOVをプリセットに合わせます。
+        """
+        aov_names = AOV_PRESETS.get(preset_name)
+        if aov_names is None:
+            self.view.set_status(f"不明なAOVプリセットです: {preset_name}", color="#F44336")
+            return
+        self.view.set_aov_checkboxes(aov_names)
+        layer_names = self.view.get_selected_layer_names()
+        self._apply_aovs(aov_names, layer_names, label=f"プリセット '{preset_name}'")
+
+    def _apply_checked_aovs(self, layer_names: list):
+        """作成したレイヤーに、チェックされているAOVを適用します (チェックがなければ何もしません)。"""
+        aov_names = [name for name, checked in self.view.get_aov_settings().items() if checked]
+        if aov_names and layer_names:
+            self._apply_aovs(aov_names, layer_names, label="AOV設定")
+
+    def _apply_aovs(self, aov_names: list, layer_names: list, label: str):
+        try:
+            if layer_names:
+                result = self.model.apply_layer_aovs(layer_names, aov_names)
+            else:
+                result = self.model.apply_scene_aovs(aov_names)
+        except Exception as e:
+            self.view.set_status(f"AOVの適用に失敗しました: {e}", color="#F44336")
+            return
+        target = f"{len(result['layers'])} レイヤー" if layer_names else "シーン"
+        self.view.set_status(
+            f"{label} を{target}に適用しました (作成 {len(result['created'])} / 削除 {len(result['deleted'])})。",
+            color="#7EE081")
+
+    # --- パフォーマンス計測 ---
+
+    def on_profiling_toggled(self, enabled: bool):
+        if enabled:
+            profiler.enable()
+            self._profiler_timer.start()
+            self.view.set_status("パフォーマンス計測を開始しました。")
+        else:
+            profiler.disable()
+            self._profiler_timer.stop()
+            self.view.set_status("パフォーマンス計測を停止しました。")
+        self._refresh_profiler_panel()
+
+    def on_profiler_reset(self):
+        profiler.reset()
+        self._refresh_profiler_panel()
+
+    def on_profiler_dump(self, fmt: str):
+        if fmt == 'chrome':
+            caption, file_filter, dump = "Chrome Trace の保存", "Trace JSON (*.json)", profiler.dump_chrome_trace
+        else:
+            caption, file_filter, dump = "計測結果の保存", "JSON (*.json)", profiler.dump_json
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self.view, caption, "", file_filter)
+        if not path:
+            return
+        try:
+            dump(path)
+        except OSError as e:
+            self.view.set_status(f"計測結果の保存に失敗しました: {e}", color="#F44336")
+            return
+        self.view.set_status(f"計測結果を保存しました: {path}")
+
+    def _refresh_profiler_panel(self):
+        self.view.show_profiler_summary(profiler.summary())
+
+    @profiler.instrument()
     def on_delete_selected(self):
-        selected_items = self.view.layer_list_widget.selectedItems()
-        layer_names = [item.text() for item in selected_items]
+        layer_names = self.view.get_selected_layer_names()
         if not layer_names or not self._confirm_dialog("選択したレイヤーを削除しますか？"):
             return
             
-        self.model.delete_layers(layer_names)
-        self.refresh_layer_list()
+        self._report_deleted(self.model.delete_layers(layer_names))
 
+    @profiler.instrument()
     def on_delete_all(self):
         if not self._confirm_dialog("本当にすべてのレンダーレイヤーを削除しますか？\nこの操作は元に戻せません。", is_warning=True):
             return
             
-        self.model.delete_all_layers()
-        self.refresh_layer_list()
+        self._report_deleted(self.model.delete_all_layers())
+
+    def _report_deleted(self, result: dict):
+        timings = result['timings']
+        phases = ", ".join(f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in timings.items())
+        print(f"Deleted {len(result['deleted'])} layers ({phases})")
+        message = f"{len(result['deleted'])} 個のレイヤーを削除しました ({sum(timings.values()):.2f} 秒)。"
+        if result['missing']:
+            message += f" 見つからないレイヤー: {', '.join(result['missing'])}"
+        self.view.set_status(message, color="#FFC107" if result['missing'] else "#7EE081")
     
     def on_add_to_list(self, list_name: str):
         target_widget = self.view.target_list_widget if list_name == 'target' else self.view.pvoff_list_widget
-        selected_items = self.view.scene_objects_tree.selectedItems()
+        selected_paths = self.view.get_selected_tree_paths()
         
         current_list_items = {target_widget.item(i).text() for i in range(target_widget.count())}
         
-        for item in selected_items:
-            path = item.data(0, QtCore.Qt.UserRole)
-            if path and path not in current_list_items:
+        for path in selected_paths:
+            if path not in current_list_items:
                 target_widget.addItem(path)
 
     def on_remove_from_list(self, list_name: str):
@@ -134,24 +591,70 @@ class RenderLayerController:
             target_widget.takeItem(target_widget.row(item))
 
     def on_tree_selection_changed(self):
-        if self._is_syncing: return
-        self._is_syncing = True
-        selected_paths = [item.data(0, QtCore.Qt.UserRole) for item in self.view.scene_objects_tree.selectedItems()]
-        if selected_paths:
-            cmds.select([path for path in selected_paths if cmds.objExists(path)], r=True)
+        # 連続した変更は最後の状態だけを送る。予約時の世代を記録し、送信時に古ければ破棄する
+        self._selection_push_generation = self._selection_generation
+        self._selection_push_timer.start()
+
+    @profiler.instrument()
+    def _push_tree_selection(self):
+        """ツリーの選択をMayaへ1回の cmds.select で送ります。前回の選択との差分が追加/解除だけならその分だけを送ります。"""
+        if self._selection_push_generation != self._selection_generation:
+            return # 予約後にMayaの選択をツリーへ反映した
+        desired = self.view.selected_tree_path_set()
+        known = self._maya_selection
+        if known is None:
+            added, removed = desired, set()
+        else:
+            # ツリーに表示されないノード (シェイプ・シェーダーなど) の選択は差分の対象にしない
+            current = {path for path in known if self.model.has_node(path)}
+            added, removed = desired - current, current - desired
+        if not added and not removed:
+            return
+
+        if not desired:
+            expected = frozenset()
+            command = {'clear': True}
+            paths = []
+        elif known is not None and not removed:
+            paths = self.model.existing_paths(added)
+            expected = known | frozenset(paths)
+            command = {'add': True}
+        elif known is not None and not added:
+            paths = self.model.existing_paths(removed)
+            expected = known - frozenset(removed)
+            command = {'deselect': True}
+        else:
+            paths = self.model.existing_paths(desired)
+            expected = frozenset(paths)
+            command = {'replace': True} if paths else {'clear': True}
+
+        if not paths and 'clear' not in command:
+            return # 送るノードがすべて削除済み
+
+        # 通知が同期的に届く場合に備え、選択を変更する前に無視する選択を設定する
+        self._selection_echo = self._maya_selection = expected
+        if paths:
+            cmds.select(paths, **command)
         else:
             cmds.select(clear=True)
-        self._is_syncing = False
 
     def on_maya_selection_changed(self, *args, **kwargs):
-        if self._is_syncing: return
-        self.sync_tree_with_maya_selection()
+        # 無視する選択はツリーからの送信に対する選択変更通知でだけ消費する。
+        # 検索などほかの経路からの同期で消費すると、後から届いた通知でツリーを作り直してしまう
+        echo, self._selection_echo = self._selection_echo, None
+        self.sync_tree_with_maya_selection(ignore=echo)
 
-    def sync_tree_with_maya_selection(self):
-        self._is_syncing = True
+    @profiler.instrument()
+    def sync_tree_with_maya_selection(self, ignore: frozenset = None):
         selected_paths = self.model.get_selection()
+        current = frozenset(selected_paths)
+        if ignore is not None and current == ignore:
+            # ツリーから送った選択の通知。遅れて届いた場合も現在の選択で判定するため、取り違えない
+            return
+        self._maya_selection = current
         self.view.sync_tree_selection(selected_paths)
-        self._is_syncing = False
+        # 反映中にツリーから発行された変更と、それ以前に予約された送信を無効にする
+        self._selection_generation += 1
 
     def _confirm_dialog(self, message: str, is_warning: bool = False) -> bool:
         msg_box = QtWidgets.QMessageBox(self.view)
@@ -0,0 +1,135 @@
+# render_layer_tool/headless.py
+# -*- coding: utf-8 -*-
+"""
+GUIなしでレシピを適用するエントリーポイント。
+
+使い方:
+    mayapy headless.py --recipe layers.json shot010.ma [shot020.ma ...] [--save | --output-dir DIR]
+    mayapy headless.py --worker
+
+シーンごとに開く→レシピ適用→保存を行い、結果をJSONで標準出力に書き出します。
+--worker モードでは標準入力から1行1ジョブのJSONを受け取り、結果を WORKER_MARKER 付きの1行で返します
+(batch_runner から常駐ワーカーとして使用されます)。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+
+# Mayaのログと区別するため、ワーカーの結果行にはこの接頭辞を付ける
+WORKER_MARKER = "@@RENDER_LAYER_TOOL@@"
+
+
+def initialize_standalone():
+    """mayapy から実行された場合に maya.standalone を初期化します。"""
+    import maya.standalone
+    try:
+        maya.standalone.initialize(name='python')
+    except RuntimeError:
+        pass # 既に初期化済み (Maya内から呼ばれた場合など)
+
+
+def process_scene(scene_path: str, recipe_data: dict, save: bool = False, output_path: str = None) -> dict:
+    """1シーンを開いてレシピを適用し、必要に応じて保存します。"""
+    import maya.cmds as cmds
+    import model
+    import recipe
+
+    report = {'scene': scene_path, 'ok': False, 'timings': {}}
+    start = time.perf_counter()
+    cmds.file(scene_path, open=True, force=True, prompt=False)
+    report['timings']['open'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    layer_model = model.RenderLayerModel()
+    result = recipe.apply_recipe(recipe_data, layer_model)
+    report['timings']['apply'] = time.perf_counter() - start
+    # layers は適用したすべてのレイヤー。再適用で更新しただけの既存レイヤーは reused に分ける
+    report['layers'] = result['created'] + result['reused']
+    report['created'] = result['created']
+    report['reused'] = result['reused']
+    report['aovs'] = result['aovs']
+
+    if save or output_path:
+        start = time.perf_counter()
+        if output_path:
+            cmds.file(rename=output_path)
+        cmds.file(save=True, force=True)
+        report['timings']['save'] = time.perf_counter() - start
+        report['saved_to'] = cmds.file(q=True, sceneName=True)
+
+    report['ok'] = True
+    return report
+
+
+def serve_worker(stdin=None, stdout=None):
+    """
+    常駐ワーカーとしてジョブを処理します。Mayaの初期化は1回だけ行い、レシピは読み込み済みのものを再利用します。
+    ジョブ: {"id", "scene", "recipe", "save", "output_path"}
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    initialize_standalone()
+    import recipe
+
+    recipes = {}
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        job = json.loads(line)
+        try:
+            recipe_path = job['recipe']
+            if recipe_path not in recipes:
+                recipes[recipe_path] = recipe.load_recipe(recipe_path)
+            report = process_scene(job['scene'], recipes[recipe_path],
+                                   save=job.get('save', False), output_path=job.get('output_path'))
+        except Exception as e:
+            report = {'scene': job.get('scene'), 'ok': False, 'error': str(e), 'traceback': traceback.format_exc()}
+        report['id'] = job.get('id')
+        stdout.write(WORKER_MARKER + json.dumps(report, ensure_ascii=False) + "\n")
+        stdout.flush()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render Layer Tool: レシピをシーンに適用します。")
+    parser.add_argument('--worker', action='store_true', help="標準入力からジョブを受け取る常駐ワーカーとして動作する")
+    parser.add_argument('--recipe', help="レシピJSONのパス")
+    parser.add_argument('scenes', nargs='*', help="処理するシーンファイル")
+    parser.add_argument('--save', action='store_true', help="適用後にシーンを上書き保存する")
+    parser.add_argument('--output-dir', help="適用後のシーンを保存するディレクトリ")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        serve_worker()
+        return 0
+    if not args.recipe or not args.scenes:
+        parser.error("--recipe とシーンファイルを指定してください。")
+
+    initialize_standalone()
+    import recipe
+
+    try:
+        recipe_data = recipe.load_recipe(args.recipe)
+    except (OSError, ValueError) as e:
+        print(json.dumps({'ok': False, 'error': f"レシピを読み込めません: {e}"}, ensure_ascii=False))
+        return 2
+
+    reports = []
+    for scene_path in args.scenes:
+        output_path = None
+        if args.output_dir:
+            output_path = os.path.join(args.output_dir, os.path.basename(scene_path))
+        try:
+            reports.append(process_scene(scene_path, recipe_data, save=args.save, output_path=output_path))
+        except Exception as e:
+            reports.append({'scene': scene_path, 'ok': False, 'error': str(e), 'traceback': traceback.format_exc()})
+
+    print(json.dumps({'ok': all(r['ok'] for r in reports), 'scenes': reports}, ensure_ascii=False, indent=2))
+    return 0 if all(r['ok'] for r in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# render_layer_tool/layer_list_model.py
+# -*- coding: utf-8 -*-
+"""
+既存レンダーレイヤー一覧用の QAbstractListModel。
+LayerRegistry の差分 (insert / remove / rename / update / reset) を行単位で反映し、一覧全体を作り直しません。
+統計 (コレクション数・メンバー数) は表示される行についてだけ取得します。
+"""
+from PySide6 import QtCore
+
+
+class LayerListModel(QtCore.QAbstractListModel):
+    """
+    レイヤー名の一覧を保持します。UserRole でレイヤー名を返します。
+    stats_provider(name) は {'collections', 'members'} を返す関数です (LayerRegistry.stats)。
+    """
+    def __init__(self, stats_provider=None, parent=None):
+        super(LayerListModel, self).__init__(parent)
+        self._names = []
+        self._rows = {}
+        self._stats_provider = stats_provider
+
+    def set_stats_provider(self, stats_provider):
+        self._stats_provider = stats_provider
+
+    def _reindex(self, start=0):
+        for row in range(start, len(self._names)):
+            self._rows[self._names[row]] = row
+
+    # --- QAbstractListModel ---
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._names)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._names):
+            return None
+        name = self._names[index.row()]
+        if role == QtCore.Qt.UserRole:
+            return name
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.ToolTipRole):
+            stats = self._stats_provider(name) if self._stats_provider else None
+            if not stats:
+                return name
+            if role == QtCore.Qt.ToolTipRole:
+                return f"{name}\nコレクション: {stats['collections']}\nメンバー (静的選択): {stats['members']}"
+            return f"{name}  ({stats['collections']} col / {stats['members']} mem)"
+        return None
+
+    # --- 差分の反映 ---
+
+    def names(self) -> list[str]:
+        return list(self._names)
+
+    def index_for_name(self, name: str) -> QtCore.QModelIndex:
+        row = self._rows.get(name)
+        return self.index(row, 0) if row is not None else QtCore.QModelIndex()
+
+    def reset_names(self, names):
+        self.beginResetModel()
+        self._names = list(names)
+        self._rows = {}
+        self._reindex()
+        self.endResetModel()
+
+    def apply_op(self, op):
+        """LayerRegistry の差分を1件反映します。"""
+        kind = op[0]
+        if kind == 'reset':
+            self.reset_names(op[1])
+        elif kind == 'insert':
+            name = op[2]
+            if name in self._rows:
+                return
+            row = min(op[1], len(self._names))
+            self.beginInsertRows(QtCore.QModelIndex(), row, row)
+            self._names.insert(row, name)
+            self._reindex(row)
+            self.endInsertRows()
+        elif kind == 'remove':
+            row = self._rows.pop(op[1], None)
+            if row is None:
+                return
+            self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+            del self._names[row]
+            self._reindex(row)
+            self.endRemoveRows()
+        elif kind == 'rename':
+            row = self._rows.pop(op[1], None)
+            if row is None:
+                return
+            self._names[row] = op[2]
+            self._rows[op[2]] = row
+            index = self.index(row, 0)
+            self.dataChanged.emit(index, index)
+        elif kind == 'update':
+            index = self.index_for_name(op[1])
+            if index.isValid():
+                self.dataChanged.emit(index, index)
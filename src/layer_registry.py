@@ -0,0 +1,208 @@
+# render_layer_tool/layer_registry.py
+# -*- coding: utf-8 -*-
+"""
+レンダーレイヤーの名前 -> レイヤーの索引と、レイヤーごとの統計 (コレクション数・メンバー数) を保持するレジストリ。
+Render Setup のリストオブザーバー通知でレイヤーの追加/削除を追従し、getRenderLayers() の線形探索を避けます。
+変更はリスナーに差分 (insert / remove / rename / update / reset) として通知します。
+"""
+import logging
+
+logger = logging.getLogger("RenderLayerTool")
+
+_registries = {}
+
+
+def get_registry(rs_instance) -> "LayerRegistry":
+    """Render Setup インスタンスごとに共有される LayerRegistry を返します。"""
+    registry = _registries.get(id(rs_instance))
+    if registry is None or registry.rs is not rs_instance:
+        registry = _registries[id(rs_instance)] = LayerRegistry(rs_instance)
+    return registry
+
+
+class _CollectionObserver:
+    """レイヤーのコレクションの追加/削除を受け取り、レジストリの統計を無効にします。"""
+    def __init__(self, registry, layer):
+        self.registry = registry
+        self.layer = layer
+
+    def listItemAdded(self, item):
+        self.registry._on_collections_changed(self.layer)
+
+    def listItemRemoved(self, item):
+        self.registry._on_collections_changed(self.layer)
+
+
+class LayerRegistry:
+    """
+    Render Setup のリストオブザーバーとして登録し、レイヤーの一覧を差分で更新します。
+    オブザーバーを登録できない環境では、参照のたびに一覧を作り直します。
+
+    リスナー listener(op) に渡される差分:
+      ('insert', 行, 名前) / ('remove', 名前) / ('rename', 旧名前, 新名前) / ('update', 名前) / ('reset', [名前])
+    """
+    def __init__(self, rs_instance):
+        self.rs = rs_instance
+        self._layers = {}
+        self._stats = {}
+        self._collection_observers = {}
+        self._listeners = []
+        self._observing = False
+        self._built = False
+
+    # --- オブザーバー ---
+
+    def attach(self) -> bool:
+        """Render Setup のオブザーバーに登録し、現在のレイヤーで一覧を作り直します。"""
+        if not self._observing:
+            try:
+                self.rs.addListObserver(self)
+                self._observing = True
+            except (AttributeError, RuntimeError) as e:
+                logger.warning(f"Failed to observe render layers: {e}")
+        self.rebuild()
+        return self._observing
+
+    def detach(self):
+        if self._observing:
+            try:
+                self.rs.removeListObserver(self)
+            except Exception:
+                pass # シーンを閉じた後などは既に解除されている
+            self._observing = False
+        self._unobserve_collections()
+        self._built = False
+
+    def listItemAdded(self, layer):
+        name = layer.name()
+        self._layers[name] = layer
+        self._observe_collections(layer)
+        self._notify(('insert', len(self._layers) - 1, name))
+
+    def listItemRemoved(self, layer):
+        name = next((key for key, value in self._layers.items() if value is layer), None)
+        if name is None:
+            return
+        del self._layers[name]
+        self._stats.pop(name, None)
+        self._collection_observers.pop(id(layer), None)
+        self._notify(('remove', name))
+
+    def rename(self, old_name: str, new_name: str):
+        """レイヤー (renderSetupLayer ノード) の名前変更を反映します。"""
+        if old_name not in self._layers or new_name in self._layers:
+            return
+        self._layers = {(new_name if name == old_name else name): layer for name, layer in self._layers.items()}
+        if old_name in self._stats:
+            self._stats[new_name] = self._stats.pop(old_name)
+        self._notify(('rename', old_name, new_name))
+
+    def _observe_collections(self, layer):
+        if id(layer) in self._collection_observers:
+            return
+        observer = _CollectionObserver(self, layer)
+        try:
+            layer.addListObserver(observer)
+        except (AttributeError, RuntimeError):
+            return
+        # Render Setup はオブザーバーを弱参照で保持するので、ここで参照を保持する
+        self._collection_observers[id(layer)] = observer
+
+    def _unobserve_collections(self):
+        for observer in self._collection_observers.values():
+            try:
+                observer.layer.removeListObserver(observer)
+            except Exception:
+                pass
+        self._collection_observers = {}
+
+    def _on_collections_changed(self, layer):
+        name = layer.name()
+        if name in self._layers:
+            self.invalidate_stats(name)
+
+    # --- リスナー ---
+
+    def add_listener(self, listener):
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, op):
+        for listener in list(self._listeners):
+            try:
+                listener(op)
+            except Exception as e:
+                logger.error(f"Layer registry listener failed: {e}", exc_info=True)
+
+    # --- 参照 ---
+
+    def rebuild(self):
+        """Render Setup から一覧を作り直します。"""
+        self._unobserve_collections()
+        self._layers = {}
+        for layer in self.rs.getRenderLayers():
+            self._layers[layer.name()] = layer
+            if self._observing:
+                self._observe_collections(layer)
+        self._stats = {}
+        self._built = True
+        self._notify(('reset', list(self._layers)))
+
+    def _ensure(self) -> bool:
+        """一覧が最新でない場合に作り直します。作り直した場合に True を返します。"""
+        if not self._observing or not self._built:
+            self.rebuild()
+            return True
+        return False
+
+    def names(self) -> list[str]:
+        self._ensure()
+        return list(self._layers)
+
+    def layer_map(self) -> dict:
+        """{名前: レイヤー} のコピーを Render Setup の順序で返します。"""
+        self._ensure()
+        return dict(self._layers)
+
+    def get(self, name: str):
+        """名前からレイヤーを返します。存在しない場合は None を返します。"""
+        rebuilt = self._ensure()
+        layer = self._layers.get(name)
+        if layer is not None and layer.name() == name:
+            return layer
+        if layer is None:
+            if rebuilt:
+                return None
+            # 通知されなかった名前変更で新しい名前が索引にないだけの場合がある。
+            # 作り直し (リスナーへの reset 通知) は実際にその名前のレイヤーがある場合だけ行う
+            if not any(candidate.name() == name for candidate in self.rs.getRenderLayers()):
+                return None
+        # 通知されなかった名前変更がある
+        self.rebuild()
+        return self._layers.get(name)
+
+    def stats(self, name: str) -> dict:
+        """{'collections': コレクション数, 'members': 静的選択のメンバー数} を返します (結果はキャッシュされる)。"""
+        cached = self._stats.get(name)
+        if cached is not None:
+            return cached
+        layer = self.get(name)
+        if layer is None:
+            return {'collections': 0, 'members': 0}
+        collections = layer.getCollections()
+        members = 0
+        for collection in collections:
+            static = collection.getSelector().getStaticSelection() or ()
+            members += len(static.split() if isinstance(static, str) else static)
+        stats = self._stats[name] = {'collections': len(collections), 'members': members}
+        return stats
+
+    def invalidate_stats(self, name: str):
+        """レイヤーの内容を変更した後に呼び出します。"""
+        self._stats.pop(name, None)
+        if name in self._layers:
+            self._notify(('update', name))
@@ -0,0 +1,150 @@
+# render_layer_tool/layer_switcher.py
+# -*- coding: utf-8 -*-
+"""
+Render Setup の表示レイヤー切り替えを一元管理するサービス。
+切り替えの完了は待機や再試行ではなく Render Setup のアクティブレイヤーのオブザーバー通知で確認し、
+既に表示中のレイヤーへの切り替えは省略します。batch() の中の連続した切り替え要求は最後の1回にまとめます。
+Model の一括編集 (_batch_edit) は全体を batch() で囲むため、その中の切り替えはブロックを抜けた時に1回だけ行われます。
+"""
+import collections
+import contextlib
+import logging
+import time
+
+import profiler
+
+logger = logging.getLogger("RenderLayerTool")
+
+# 記録しておく切り替え履歴の件数
+HISTORY_SIZE = 200
+
+_switchers = {}
+
+
+def get_switcher(rs_instance) -> "LayerSwitcher":
+    """Render Setup インスタンスごとに共有される LayerSwitcher を返します。"""
+    switcher = _switchers.get(id(rs_instance))
+    if switcher is None or switcher.rs is not rs_instance:
+        switcher = _switchers[id(rs_instance)] = LayerSwitcher(rs_instance)
+    return switcher
+
+
+class LayerSwitcher:
+    """
+    表示レイヤーの切り替えを行います。
+    history には (レイヤー名, 所要時間[秒], オブザーバー通知で確認できたか) を新しい順に最大 HISTORY_SIZE 件保持します。
+    """
+    def __init__(self, rs_instance):
+        self.rs = rs_instance
+        self.history = collections.deque(maxlen=HISTORY_SIZE)
+        self.stats = {
+            'requested': 0,  # switch_to() の呼び出し回数
+            'skipped': 0,    # 既に表示中だったため省略した回数
+            'coalesced': 0,  # batch() 内で後の要求にまとめられた回数
+            'switched': 0,   # 実際に switchToLayer を呼び出した回数
+            'failed': 0,     # 切り替え後も表示レイヤーが変わらなかった回数
+        }
+        self._notifications = 0
+        self._observing = False
+        self._batch_depth = 0
+        self._pending_layer = None
+
+    # --- オブザーバー ---
+
+    def _on_active_layer_changed(self, *args):
+        self._notifications += 1
+
+    def _ensure_observer(self):
+        if self._observing:
+            return
+        try:
+            self.rs.addActiveLayerObserver(self._on_active_layer_changed)
+            self._observing = True
+        except (AttributeError, RuntimeError) as e:
+            logger.warning(f"Failed to observe the active render layer: {e}")
+
+    def close(self):
+        """オブザーバーを解除します。"""
+        if not self._observing:
+            return
+        try:
+            self.rs.removeActiveLayerObserver(self._on_active_layer_changed)
+        except Exception:
+            pass # シーンを閉じた後などは既に解除されている
+        self._observing = False
+
+    # --- 切り替え ---
+
+    def visible_layer(self):
+        return self.rs.getVisibleRenderLayer()
+
+    def switch_to(self, layer) -> bool:
+        """
+        layer を表示レイヤーにします。batch() の中では要求を記録するだけで、抜けた時点で最後の要求だけを実行します。
+        切り替えに成功した (または既に表示中だった) 場合に True を返します。
+        """
+        if layer is None:
+            return False
+        self.stats['requested'] += 1
+        if self._batch_depth:
+            if self._pending_layer is not None:
+                self.stats['coalesced'] += 1
+            self._pending_layer = layer
+            return True
+        return self._switch_now(layer)
+
+    def switch_to_master(self) -> bool:
+        return self.switch_to(self.rs.getDefaultRenderLayer())
+
+    @contextlib.contextmanager
+    def batch(self):
+        """ブロック内の切り替え要求をまとめ、ブロックを抜けた時に最後の要求だけを実行します。"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def flush(self) -> bool:
+        """
+        batch() の中で保留している切り替えを今すぐ実行します (表示中のレイヤーを削除する前など)。
+        保留がない場合、または切り替えに成功した場合に True を返します。
+        """
+        if self._pending_layer is None:
+            return True
+        layer, self._pending_layer = self._pending_layer, None
+        return self._switch_now(layer)
+
+    @profiler.instrument()
+    def _switch_now(self, layer) -> bool:
+        if self.rs.getVisibleRenderLayer() == layer:
+            self.stats['skipped'] += 1
+            return True
+
+        self._ensure_observer()
+        notifications = self._notifications
+        start = time.perf_counter()
+        self.rs.switchToLayer(layer)
+        elapsed = time.perf_counter() - start
+        self.stats['switched'] += 1
+
+        # switchToLayer は同期的にオブザーバーへ通知する。通知がない場合のみ表示レイヤーを直接確認する
+        notified = self._notifications != notifications
+        switched = notified or self.rs.getVisibleRenderLayer() == layer
+        name = layer.name()
+        self.history.appendleft((name, elapsed, notified))
+        if not switched:
+            self.stats['failed'] += 1
+            logger.error(f"Failed to switch to render layer '{name}'.")
+            return False
+        return True
+
+    def timing_summary(self) -> dict:
+        """履歴にある切り替えの回数・合計/平均/最大時間 (秒) を返します。"""
+        durations = [entry[1] for entry in self.history]
+        if not durations:
+            return {'count': 0, 'total': 0.0, 'mean': 0.0, 'max': 0.0}
+        total = sum(durations)
+        return {'count': len(durations), 'total': total, 'mean': total / len(durations), 'max': max(durations)}
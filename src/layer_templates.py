@@ -0,0 +1,209 @@
+# render_layer_tool/layer_templates.py
+# -*- coding: utf-8 -*-
+"""
+レンダーレイヤーのテンプレートライブラリ。
+Render Setup の encode() で書き出したレイヤー定義 (JSON) を内容のハッシュをキーにローカルに保存し、
+別のシーンでも対象ノード・ネームスペース・レイヤー名を置き換えて1回の decode() で再現できるようにします。
+読み込んだテンプレートはメモリにキャッシュし、同じセッション内での再適用ではJSONの解析を省略します。
+
+ライブラリの構成:
+    index.json     {ハッシュ: {'name', 'layers', 'targets', 'created'}}
+    <ハッシュ>.json {'version', 'name', 'hash', 'layers': [Render Setup のレイヤー定義], 'targets': [ノードパス]}
+"""
+import collections
+import hashlib
+import json
+import os
+import time
+
+TEMPLATE_VERSION = 1
+# メモリに保持する解析済みテンプレートの数
+DEFAULT_CACHE_SIZE = 32
+
+# セレクターの中でノードパスを並べたキー (値は改行/空白区切りの文字列)
+_PATH_KEYS = ('staticSelection', 'pattern')
+
+_default_library = None
+
+
+def default_library_dir() -> str:
+    return os.path.join(os.path.expanduser("~"), ".render_layer_tool", "templates")
+
+
+def default_library() -> "TemplateLibrary":
+    """セッション内で共有するライブラリ (メモリキャッシュも共有される) を返します。"""
+    global _default_library
+    if _default_library is None:
+        _default_library = TemplateLibrary()
+    return _default_library
+
+
+def content_hash(layers: list) -> str:
+    """レイヤー定義の内容から決まるハッシュ (キーの順序や空白の違いは無視する)。"""
+    canonical = json.dumps(layers, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def layer_name_of(layer_data: dict) -> str:
+    """encode() が返すレイヤー定義 ({'renderSetupLayer': {...}}) からレイヤー名を取り出します。"""
+    for value in layer_data.values():
+        if isinstance(value, dict) and 'name' in value:
+            return value['name']
+    return ""
+
+
+def collect_paths(layers: list) -> list:
+    """レイヤー定義のセレクターに含まれるDAGパスを出現順に重複なく返します。"""
+    paths = {}
+
+    def walk(item):
+        if isinstance(item, dict):
+            for key, value in item.items():
+                if key == 'staticSelection' and isinstance(value, str):
+                    paths.update(dict.fromkeys(token for token in value.split() if '|' in token))
+                else:
+                    walk(value)
+        elif isinstance(item, list):
+            for value in item:
+                walk(value)
+
+    walk(layers)
+    return list(paths)
+
+
+def _substitute_token(token: str, paths: dict, namespaces: dict) -> str:
+    token = paths.get(token, token)
+    if namespaces and ':' in token:
+        parts = []
+        for part in token.split('|'):
+            namespace, sep, name = part.rpartition(':')
+            parts.append(f"{namespaces.get(namespace, namespace)}{sep}{name}" if sep else part)
+        token = '|'.join(parts)
+    return token
+
+
+def instantiate(layers: list, paths: dict = None, namespaces: dict = None, layer_names: dict = None) -> list:
+    """
+    テンプレートのレイヤー定義を置き換えた新しい定義を返します (元の定義は変更しません)。
+    paths: {テンプレートのパス: シーンのパス}, namespaces: {元のネームスペース: 新しいネームスペース},
+    layer_names: {元のレイヤー名: 新しいレイヤー名}。コレクション名などレイヤー名で始まる名前も置き換えます。
+    """
+    paths = paths or {}
+    namespaces = namespaces or {}
+    layer_names = layer_names or {}
+
+    def rename(name):
+        for old, new in layer_names.items():
+            if name == old or name.startswith(old + '_'):
+                return new + name[len(old):]
+        return name
+
+    def walk(item, key=None):
+        if isinstance(item, dict):
+            return {k: walk(v, k) for k, v in item.items()}
+        if isinstance(item, list):
+            return [walk(v) for v in item]
+        if isinstance(item, str):
+            if key in _PATH_KEYS and (paths or namespaces):
+                # 区切り文字 (改行/空白) を保ったまま各トークンだけを置き換える
+                return '\n'.join(' '.join(_substitute_token(token, paths, namespaces) for token in line.split(' '))
+                                 for line in item.split('\n'))
+            if key == 'name' and layer_names:
+                return rename(item)
+        return item
+
+    return walk(layers)
+
+
+class TemplateLibrary:
+    """テンプレートをディレクトリに保存し、解析済みの内容をメモリにキャッシュします。"""
+    def __init__(self, library_dir: str = None, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.library_dir = library_dir or default_library_dir()
+        self.cache_size = cache_size
+        # ハッシュ -> (ファイルの更新時刻, テンプレート)。最近使ったものを末尾に置く (LRU)
+        self._decoded = collections.OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _path_for(self, template_hash: str) -> str:
+        return os.path.join(self.library_dir, f"{template_hash}.json")
+
+    def _index_path(self) -> str:
+        return os.path.join(self.library_dir, "index.json")
+
+    def _write_json(self, path: str, data):
+        os.makedirs(self.library_dir, exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def index(self) -> dict:
+        """{ハッシュ: {'name', 'layers', 'targets', 'created'}} を返します。"""
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, name: str, layers: list) -> str:
+        """テンプレートを保存してハッシュを返します。同じ内容が保存済みの場合は名前だけを更新します。"""
+        template_hash = content_hash(layers)
+        template = {
+            'version': TEMPLATE_VERSION,
+            'name': name,
+            'hash': template_hash,
+            'layers': layers,
+            'targets': collect_paths(layers),
+        }
+        if not os.path.exists(self._path_for(template_hash)):
+            self._write_json(self._path_for(template_hash), template)
+        index = self.index()
+        index[template_hash] = {'name': name, 'layers': [layer_name_of(layer) for layer in layers],
+                                'targets': len(template['targets']), 'created': time.time()}
+        self._write_json(self._index_path(), index)
+        return template_hash
+
+    def resolve(self, key: str) -> str:
+        """ハッシュ、またはテンプレート名 (同名が複数ある場合は最新) からハッシュを返します。"""
+        index = self.index()
+        if key in index:
+            return key
+        named = [(entry['created'], template_hash) for template_hash, entry in index.items() if entry['name'] == key]
+        if not named:
+            raise KeyError(f"テンプレートが見つかりません: {key}")
+        return max(named)[1]
+
+    def load(self, key: str) -> dict:
+        """
+        テンプレートを返します。キャッシュ済みでファイルが更新されていなければ解析を省略します。
+        返される辞書はキャッシュと共有されるため変更しないでください (instantiate は新しい定義を作成します)。
+        """
+        template_hash = key if key in self._decoded else self.resolve(key)
+        path = self._path_for(template_hash)
+        mtime = os.path.getmtime(path)
+        cached = self._decoded.get(template_hash)
+        if cached is not None and cached[0] == mtime:
+            self._decoded.move_to_end(template_hash)
+            self.stats['hits'] += 1
+            return cached[1]
+
+        self.stats['misses'] += 1
+        with open(path, 'r', encoding='utf-8') as f:
+            template = json.load(f)
+        if template.get('version') != TEMPLATE_VERSION:
+            raise ValueError(f"未対応のテンプレートバージョンです: {template.get('version')}")
+        self._decoded[template_hash] = (mtime, template)
+        while len(self._decoded) > self.cache_size:
+            self._decoded.popitem(last=False)
+        return template
+
+    def delete(self, key: str):
+        template_hash = self.resolve(key)
+        self._decoded.pop(template_hash, None)
+        index = self.index()
+        index.pop(template_hash, None)
+        self._write_json(self._index_path(), index)
+        try:
+            os.remove(self._path_for(template_hash))
+        except OSError:
+            pass
@@ -3,9 +3,11 @@
 from __future__ import annotations
 import logging
 import re
-import maya.cmds as cmds
-import maya.utils as utils
-import time
+
+import layer_registry
+import layer_switcher
+# Arnold のヘルパーはツール本体からも使うため src/arnold_utils.py に移した (互換のため再エクスポート)
+from arnold_utils import ensure_arnold_renderer, ensure_mtoa_loaded as _ensure_mtoa_loaded
 
 RENDER_SETUP_API_AVAILABLE = False
 renderSetup = None
@@ -23,22 +25,6 @@ if not logger.handlers:
     handler.setFormatter(formatter)
     logger.addHandler(handler)
 
-def _ensure_mtoa_loaded():
-    if not cmds.pluginInfo("mtoa", q=True, loaded=True):
-        try:
-            cmds.loadPlugin("mtoa", quiet=True)
-            return True
-        except Exception: return False
-    return True
-
-def ensure_arnold_renderer():
-    _ensure_mtoa_loaded()
-    if cmds.getAttr("defaultRenderGlobals.currentRenderer") != "arnold":
-        try:
-            cmds.setAttr("defaultRenderGlobals.currentRenderer", "arnold", type="string")
-        except Exception as e:
-            logger.error(f"Failed to set Arnold as renderer: {e}")
-
 def get_render_setup_instance():
     if renderSetup:
         try: return renderSetup.instance()
@@ -48,27 +34,17 @@ def get_render_setup_instance():
 
 def get_or_create_layer(rs_instance, layer_name):
     try:
-        for layer in rs_instance.getRenderLayers():
-            if layer.name() == layer_name:
-                return layer
-        return rs_instance.createRenderLayer(layer_name)
+        layer = layer_registry.get_registry(rs_instance).get(layer_name)
+        return layer or rs_instance.createRenderLayer(layer_name)
     except Exception as e:
         logger.error(f"Failed to get/create layer '{layer_name}': {e}")
         return None
 
 def _safe_switch_to_master(rs_instance) -> bool:
+    # 切り替えは layer_switcher に一元化している (待機・再試行は行わない)
     if not rs_instance: return False
     try:
-        master_layer = rs_instance.getDefaultRenderLayer()
-        if not master_layer: return False
-        for attempt in range(3):
-            if rs_instance.getVisibleRenderLayer() == master_layer: return True
-            rs_instance.switchToLayer(master_layer)
-            utils.executeDeferred(cmds.evalDeferred)
-            time.sleep(0.1 * (attempt + 1))
-            if rs_instance.getVisibleRenderLayer() == master_layer: return True
-        logger.error("Failed to switch to master layer.")
-        return False
+        return layer_switcher.get_switcher(rs_instance).switch_to_master()
     except Exception as e:
         logger.error(f"Error in _safe_switch_to_master: {e}", exc_info=True)
         return False
@@ -3,8 +3,53 @@
 """
 データ処理とMayaのシーン操作を担当するModel層。
 """
+import contextlib
+import hashlib
+import os
+import re
+import time
+
 import maya.cmds as cmds
 from maya.app.renderSetup.model import renderSetup, renderLayer, override, selector
+from maya.app.renderSetup.model import collection as rs_collection
+
+import layer_registry
+import layer_switcher
+import layer_templates
+import profiler
+import render_cost
+import scene_scan
+from aov_manager import AOVManager
+from scene_search import SceneSearchIndex
+from scene_snapshot import NO_NODE, TYPE_CODES, NodeView
+from selector_optimizer import SelectorOptimizer
+
+# Render Setup エディタのワークスペースコントロール名
+RENDER_SETUP_WINDOW = "RenderSetupWindowWorkspaceControl"
+
+# ツールが作成・管理するコレクション名の接尾辞 (Mayaが重複名に付ける連番を含む)
+MANAGED_COLLECTION_SUFFIX = r"_(?:AUTOMATTE|TARGETS|MATTES|OV\d+)\d*$"
+
+# ルートノードのタイプ -> Viewのカテゴリキー
+ROOT_CATEGORY_BY_TYPE = {
+    'geometry': 'geometry',
+    'light': 'lights',
+    'camera': 'cameras',
+    'group': 'groups',
+}
+
+
+def category_for_type(node_type: str) -> str:
+    return ROOT_CATEGORY_BY_TYPE.get(node_type, 'other')
+
+
+def _replace_path_prefix(path: str, old_prefix: str, new_prefix: str) -> str:
+    if path == old_prefix:
+        return new_prefix
+    if path.startswith(old_prefix + '|'):
+        return new_prefix + path[len(old_prefix):]
+    return path
+
 
 class RenderLayerModel:
     """
@@ -16,91 +61,962 @@ class RenderLayerModel:
         except Exception as e:
             raise RuntimeError(f"Render Setupの初期化に失敗しました: {e}")
 
+        # シーン階層のスナップショット (SceneSnapshot) と、そのルートを階層辞書として見せるアダプター
+        self._snapshot = None
+        self._hierarchy = {}
+        # 検索インデックス/セレクター最適化はスナップショットが変わったら作り直す
+        self._search_index = None
+        self._selector_optimizer = None
+        # 直近のレイヤー作成でのセレクター圧縮結果 (元のエントリ数, 圧縮後のエントリ数)
+        self.selector_stats = {'original_entries': 0, 'optimized_entries': 0}
+        self.aov_manager = AOVManager()
+        # 表示レイヤーの切り替えはすべてこのサービスを経由する
+        self.layer_switcher = layer_switcher.get_switcher(self.rs)
+        # レイヤーの名前 -> レイヤーの索引。Render Setup のオブザーバー通知で差分更新する
+        self.layer_registry = layer_registry.get_registry(self.rs)
+        self.layer_registry.attach()
+
     # --- レイヤー操作 ---
     
+    @profiler.instrument()
     def get_all_layers(self) -> list[str]:
-        layers = self.rs.getRenderLayers()
-        return [lyr.name() for lyr in layers if lyr.name() not in ('masterLayer', 'defaultRenderLayer')]
+        return [name for name in self.layer_registry.names() if name not in ('masterLayer', 'defaultRenderLayer')]
 
-    def create_layer(self, layer_name: str, targets: list[str], pv_off: list[str]) -> bool:
+    @profiler.instrument()
+    def create_layer(self, layer_name: str, targets: list[str], pv_off: list[str], auto_matte: bool = False) -> bool:
         if not layer_name:
             cmds.warning("レイヤー名が指定されていません。")
             return False
             
-        layer = self.rs.getRenderLayer(layer_name) or self.rs.createRenderLayer(layer_name)
+        layer = self.layer_registry.get(layer_name) or self.rs.createRenderLayer(layer_name)
+        self._build_layer_contents(layer, layer_name, targets, pv_off, auto_matte)
+        return True
 
-        if targets:
-            target_col = layer.createCollection(f"{layer_name}_TARGETS")
-            target_col.getSelector().setStaticSelection(targets)
-            ov = target_col.createAbsoluteOverride(targets[0], 'primaryVisibility')
-            ov.setAttrValue(True)
+    def _build_layer_contents(self, layer, layer_name: str, targets: list[str], pv_off: list[str],
+                              auto_matte: bool = False, overrides=()) -> list:
+        """レイヤーの内容を要求された状態に合わせます。既存のコレクションは差分だけを更新します。"""
+        desired = self.plan_layer_contents(layer_name, targets, pv_off, auto_matte, overrides)
+        ops = self.diff_layer_contents(layer_name, desired, self.read_layer_contents(layer))
+        self._apply_layer_ops(layer, ops)
+        if ops:
+            self.layer_registry.invalidate_stats(layer_name)
+        return ops
 
+    @profiler.instrument()
+    def reconcile_layer(self, layer_name: str, targets: list[str], pv_off: list[str], auto_matte: bool = False,
+                        overrides=(), dry_run: bool = False) -> dict:
+        """
+        レイヤーの現在のコレクション/セレクター/オーバーライドを要求された状態と比較し、必要な変更だけを適用します。
+        変更がなければ何も実行しません。dry_run=True の場合は適用せずに計画だけを返します。
+        戻り値: {'layer': レイヤー名, 'create_layer': レイヤーを新規作成するか, 'operations': diff_layer_contents の操作リスト}
+        """
+        layer = self.layer_registry.get(layer_name)
+        desired = self.plan_layer_contents(layer_name, targets, pv_off, auto_matte, overrides)
+        current = self.read_layer_contents(layer) if layer is not None else {}
+        ops = self.diff_layer_contents(layer_name, desired, current)
+        result = {'layer': layer_name, 'create_layer': layer is None, 'operations': ops}
+        if dry_run or (layer is not None and not ops):
+            return result
+        with self._batch_edit("RenderLayerTool_ReconcileLayer"):
+            if layer is None:
+                layer = self.rs.createRenderLayer(layer_name)
+            self._apply_layer_ops(layer, ops)
+        self.layer_registry.invalidate_stats(layer_name)
+        return result
+
+    def plan_layer_contents(self, layer_name: str, targets: list[str], pv_off: list[str], auto_matte: bool = False,
+                            overrides=()) -> list[dict]:
+        """
+        レイヤーにあるべきコレクションの一覧を優先度の低い順 (作成順) で返します。
+        Render Setup では後に作成したコレクションのオーバーライドが優先されるため、
+        自動マットを先頭にし、対象/PV OFF コレクションで上書きさせます。
+        """
+        desired = []
+        if auto_matte:
+            # Soloモード: 補集合を静的リストにせず「全メッシュ」のパターン指定で表し、後続コレクションの優先度で除外する
+            sample = self._first_complement_geometry(targets + pv_off)
+            if sample is not None: # 補集合が空ならコレクションは不要
+                desired.append(self._collection_spec(
+                    f"{layer_name}_AUTOMATTE", sample, 'primaryVisibility', False, pattern="*", custom_filter="mesh"))
+        if targets:
+            desired.append(self._collection_spec(
+                f"{layer_name}_TARGETS", targets[0], 'primaryVisibility', True, members=targets))
         if pv_off:
-            pv_off_col = layer.createCollection(f"{layer_name}_MATTES")
-            pv_off_col.getSelector().setStaticSelection(pv_off)
-            ov = pv_off_col.createAbsoluteOverride(pv_off[0], 'primaryVisibility')
-            ov.setAttrValue(False)
-            
-        return True
+            desired.append(self._collection_spec(
+                f"{layer_name}_MATTES", pv_off[0], 'primaryVisibility', False, members=pv_off))
+        for i, ov_spec in enumerate(overrides, 1):
+            nodes = ov_spec['nodes']
+            if nodes:
+                desired.append(self._collection_spec(
+                    f"{layer_name}_OV{i}", nodes[0], ov_spec['attribute'], ov_spec['value'], members=nodes))
+        return desired
+
+    def _collection_spec(self, name: str, override_node: str, attribute: str, value, members=None,
+                         pattern: str = "", custom_filter: str = None) -> dict:
+        static = []
+        if members:
+            plan = self._member_plan(members)
+            static = plan['static']
+            pattern = ' '.join(plan['patterns'])
+        return {'name': name, 'static': static, 'pattern': pattern, 'custom_filter': custom_filter,
+                'override': {'node': override_node, 'attribute': attribute, 'value': value}}
+
+    def _member_plan(self, paths: list[str]) -> dict:
+        """
+        paths を同じメンバーを表す最小限の静的選択/パターンに圧縮します。
+        圧縮結果がスナップショット上で同値と確認できない場合は、冗長なパスを除いただけの結果になります。
+        """
+        if self._snapshot is None:
+            self.get_scene_hierarchy()
+        if self._selector_optimizer is None:
+            self._selector_optimizer = SelectorOptimizer(self._hierarchy)
+        plan = self._selector_optimizer.optimize(paths)
+        self.selector_stats['original_entries'] += plan['original_count']
+        self.selector_stats['optimized_entries'] += plan['entry_count']
+        return plan
+
+    def reset_selector_stats(self):
+        self.selector_stats = {'original_entries': 0, 'optimized_entries': 0}
+
+    @staticmethod
+    def read_layer_contents(layer) -> dict:
+        """
+        レイヤーの現在のコレクションを {名前: 状態} (レイヤー内の順序) で返します。
+        状態: {'collection', 'static': set, 'pattern', 'custom_filter', 'overrides': [(override, 属性名, 値)]}
+        """
+        current = {}
+        for col in layer.getCollections():
+            col_selector = col.getSelector()
+            static = col_selector.getStaticSelection() or ()
+            if isinstance(static, str):
+                static = static.split()
+            custom_filter = None
+            if col_selector.getFilterType() == selector.Filters.kCustom:
+                custom_filter = col_selector.getCustomFilterValue()
+            current[col.name()] = {
+                'collection': col,
+                'static': set(static),
+                'pattern': col_selector.getPattern() or "",
+                'custom_filter': custom_filter,
+                'overrides': [(ov, ov.attributeName(), ov.getAttrValue()) for ov in col.getOverrides()],
+            }
+        return current
+
+    @staticmethod
+    def diff_layer_contents(layer_name: str, desired: list[dict], current: dict) -> list:
+        """
+        あるべき状態 (plan_layer_contents) と現在の状態 (read_layer_contents) の差分操作を返します。
+        操作: ('delete_collection', 名前) / ('create_collection', spec) / ('set_selector', 名前, spec) /
+              ('create_override', 名前, override_spec) / ('set_override_value', 名前, 属性名, 値) /
+              ('delete_override', 名前, オーバーライド)
+        ツールが管理する名前のコレクションのうち不要なもの (以前の実行で重複したものなど) は削除し、
+        ユーザーが追加したコレクションや他の属性のオーバーライドには触れません。
+        """
+        ops = []
+        wanted = [spec['name'] for spec in desired]
+        managed = re.compile(re.escape(layer_name) + MANAGED_COLLECTION_SUFFIX)
+        for name in current:
+            if name not in wanted and managed.match(name):
+                ops.append(('delete_collection', name))
+
+        # 作成順が優先度になるので、順序が崩れる位置以降のコレクションは作り直す
+        result_order = [name for name in current if name in wanted]
+        result_order += [name for name in wanted if name not in current]
+        recreate_from = next(
+            (i for i, (actual, expected) in enumerate(zip(result_order, wanted)) if actual != expected), len(wanted))
+
+        for i, spec in enumerate(desired):
+            name = spec['name']
+            state = current.get(name)
+            if state is not None and i >= recreate_from:
+                ops.append(('delete_collection', name))
+                state = None
+            if state is None:
+                ops.append(('create_collection', spec))
+                continue
+
+            if (set(spec['static']) != state['static'] or spec['pattern'] != state['pattern']
+                    or spec['custom_filter'] != state['custom_filter']):
+                ops.append(('set_selector', name, spec))
+
+            ov_spec = spec['override']
+            matching = [entry for entry in state['overrides'] if entry[1] == ov_spec['attribute']]
+            if not matching:
+                ops.append(('create_override', name, ov_spec))
+                continue
+            if matching[0][2] != ov_spec['value']:
+                ops.append(('set_override_value', name, ov_spec['attribute'], ov_spec['value']))
+            for ov, _, _ in matching[1:]:
+                ops.append(('delete_override', name, ov))
+        return ops
+
+    def _apply_layer_ops(self, layer, ops: list):
+        if not ops:
+            return
+        collections = {col.name(): col for col in layer.getCollections()}
+        for op in ops:
+            kind = op[0]
+            if kind == 'delete_collection':
+                rs_collection.delete(collections.pop(op[1]))
+            elif kind == 'create_collection':
+                spec = op[1]
+                col = layer.createCollection(spec['name'])
+                self._configure_selector(col, spec)
+                self._create_override(col, spec['override'])
+                collections[col.name()] = col
+            elif kind == 'set_selector':
+                self._configure_selector(collections[op[1]], op[2])
+            elif kind == 'create_override':
+                self._create_override(collections[op[1]], op[2])
+            elif kind == 'set_override_value':
+                for ov in collections[op[1]].getOverrides():
+                    if ov.attributeName() == op[2]:
+                        ov.setAttrValue(op[3])
+                        break
+            elif kind == 'delete_override':
+                override.delete(op[2])
+
+    @staticmethod
+    def _configure_selector(col, spec: dict):
+        col_selector = col.getSelector()
+        col_selector.setStaticSelection(spec['static'])
+        col_selector.setPattern(spec['pattern'])
+        if spec['custom_filter']:
+            col_selector.setFilterType(selector.Filters.kCustom)
+            col_selector.setCustomFilterValue(spec['custom_filter'])
+        else:
+            # 再利用したコレクションにカスタムフィルターが残っていると、選択されるノードが変わってしまう
+            col_selector.setFilterType(selector.Filters.kAll)
+
+    @staticmethod
+    def _create_override(col, ov_spec: dict):
+        ov = col.createAbsoluteOverride(ov_spec['node'], ov_spec['attribute'])
+        ov.setAttrValue(ov_spec['value'])
+        return ov
+
+    def _first_complement_geometry(self, covered_paths: list[str]):
+        """
+        スナップショット上で、covered_paths とその子孫に含まれない最初のジオメトリのパスを返します。
+        見つかった時点で走査を打ち切ります。
+        """
+        if self._snapshot is None:
+            self.get_scene_hierarchy()
+        snapshot = self._snapshot
+        covered = {snapshot.index_of(path) for path in covered_paths}
+        geometry = TYPE_CODES['geometry']
+        stack = list(snapshot.roots())
+        while stack:
+            index = stack.pop()
+            if index in covered:
+                continue # コレクションは子階層も含むため、子孫もまとめて除外される
+            if snapshot.types[index] == geometry:
+                return snapshot.path(index)
+            stack.extend(snapshot.children(index))
+        return None
+
+    @staticmethod
+    def layer_name_for_target(target: str, prefix: str = "RL_") -> str:
+        """個別作成モードで対象ノードから作るレイヤー名 (例: |grp|chr:body -> RL_chr_body)。"""
+        short_name = target.rpartition('|')[2]
+        return prefix + re.sub(r'[^0-9A-Za-z_]', '_', short_name)
+
+    @profiler.instrument()
+    def create_layers_each(self, targets: list[str], pv_off: list[str], progress_callback=None,
+                           auto_matte: bool = False) -> dict:
+        """
+        対象ノードごとに1レイヤーを作成します (個別作成モード)。PV OFFリストは全レイヤー共通です。
+        全体を1つのUndoチャンクで実行し、その間ビューポートとRender Setupエディタの更新を止めます。
+
+        progress_callback(done, total, layer_name, seconds) が False を返すと残りをキャンセルします。
+        既存の同名レイヤーは作り直さずに内容だけを更新し、'reused' に入れます。
+        戻り値: {'created': [新規作成したレイヤー名], 'reused': [更新した既存レイヤー名], 'timings': {レイヤー名: 秒},
+                 'cancelled': bool, 'elapsed': 秒}
+        """
+        result = {'created': [], 'reused': [], 'timings': {}, 'cancelled': False, 'elapsed': 0.0}
+        if not targets:
+            return result
+
+        # レイヤー名を先に決め、同じ短縮名のノードには連番を付ける
+        names = []
+        used = set()
+        for target in targets:
+            base = name = self.layer_name_for_target(target)
+            suffix = 2
+            while name in used:
+                name = f"{base}_{suffix}"
+                suffix += 1
+            used.add(name)
+            names.append(name)
+
+        batch_start = time.perf_counter()
+        with self._batch_edit("RenderLayerTool_CreateLayersEach"):
+            existing = self.layer_registry.layer_map()
+            total = len(targets)
+            for done, (target, layer_name) in enumerate(zip(targets, names), 1):
+                layer_start = time.perf_counter()
+                layer = existing.get(layer_name)
+                if layer is None:
+                    layer = self.rs.createRenderLayer(layer_name)
+                    result['created'].append(layer_name)
+                else:
+                    result['reused'].append(layer_name)
+                self._build_layer_contents(layer, layer_name, [target], pv_off, auto_matte)
+                seconds = time.perf_counter() - layer_start
+
+                result['timings'][layer_name] = seconds
+                if progress_callback and progress_callback(done, total, layer_name, seconds) is False:
+                    result['cancelled'] = done < total
+                    break
+        result['elapsed'] = time.perf_counter() - batch_start
+        return result
+
+    @profiler.instrument()
+    def apply_layer_specs(self, specs: list[dict]) -> dict:
+        """
+        コンパイル済みのレイヤー定義 (recipe.compile_recipe の結果) を1つのUndoチャンクでまとめて適用します。
+        spec: {'name', 'targets', 'mattes', 'auto_matte', 'overrides': [{'nodes', 'attribute', 'value'}]}
+        既存のレイヤーは差分だけを更新して 'reused' に入れるため、同じレシピを再適用してもコレクションは重複しません。
+        戻り値: {'created': [新規作成したレイヤー名], 'reused': [更新した既存レイヤー名], 'timings': {レイヤー名: 秒},
+                 'operations': {レイヤー名: 変更操作数}, 'elapsed': 秒}
+        """
+        result = {'created': [], 'reused': [], 'timings': {}, 'operations': {}, 'elapsed': 0.0}
+        batch_start = time.perf_counter()
+        with self._batch_edit("RenderLayerTool_ApplyRecipe"):
+            existing = self.layer_registry.layer_map()
+            for spec in specs:
+                layer_start = time.perf_counter()
+                layer_name = spec['name']
+                layer = existing.get(layer_name)
+                if layer is None:
+                    layer = existing[layer_name] = self.rs.createRenderLayer(layer_name)
+                    result['created'].append(layer_name)
+                else:
+                    result['reused'].append(layer_name)
+                ops = self._build_layer_contents(layer, layer_name, spec['targets'], spec['mattes'],
+                                                 spec.get('auto_matte', False), spec.get('overrides', ()))
+                result['operations'][layer_name] = len(ops)
+                result['timings'][layer_name] = time.perf_counter() - layer_start
+        result['elapsed'] = time.perf_counter() - batch_start
+        return result
+
+    # --- レンダーコスト ---
+
+    @profiler.instrument()
+    def estimate_render_cost(self, layer_specs: list[dict],
+                             imbalance_ratio: float = render_cost.DEFAULT_IMBALANCE_RATIO) -> dict:
+        """
+        レイヤー定義ごとのレンダーコストを見積もります。対象/PV OFF はコレクションと同様に子孫のメッシュも含みます。
+        layer_specs: [{'name', 'targets', 'mattes', 'auto_matte'}] (create_layer / apply_layer_specs と同じ指定)
+        戻り値: render_cost.estimate_layers の結果
+        """
+        if self._snapshot is None:
+            self.get_scene_hierarchy()
+        memo = {}
+        # primaryVisibility がもともと Off のメッシュ。ジオメトリを集める時に一緒に記録する
+        invisible = set()
+        layers = []
+        for spec in layer_specs:
+            layers.append({
+                'name': spec['name'],
+                'meshes': self._geometry_under(spec.get('targets', ()), memo, invisible),
+                'matte_meshes': self._geometry_under(spec.get('mattes', ()), memo, invisible),
+                'auto_matte': spec.get('auto_matte', False),
+            })
+
+        if any(layer['auto_matte'] for layer in layers):
+            meshes = self._geometry_under([None], memo, invisible)
+        else:
+            meshes = list(dict.fromkeys(
+                path for layer in layers for key in ('meshes', 'matte_meshes') for path in layer[key]))
+        stats = render_cost.gather_mesh_stats(meshes)
+        return render_cost.estimate_layers(layers, stats, invisible, imbalance_ratio)
+
+    def _geometry_under(self, paths, memo: dict, invisible: set) -> list[str]:
+        """
+        paths とその子孫のうちジオメトリのパスを返します (None はシーン全体)。パスごとの結果は memo で使い回します。
+        primaryVisibility が Off のジオメトリは invisible に追加します。
+        """
+        snapshot = self._snapshot
+        geometry = TYPE_CODES['geometry']
+        result = {}
+        for path in paths:
+            found = memo.get(path)
+            if found is None:
+                index = NO_NODE if path is None else snapshot.index_of(path)
+                found = memo[path] = []
+                if index != NO_NODE and snapshot.first_child[index] == NO_NODE:
+                    # 子のないノード (対象の大半を占めるメッシュ) はパスを組み立て直さない
+                    if snapshot.types[index] == geometry:
+                        found.append(path)
+                        if snapshot.primary_visibility(index) is False:
+                            invisible.add(path)
+                elif path is None or index != NO_NODE:
+                    for node, node_path in snapshot.iter_paths(index):
+                        if snapshot.types[node] == geometry:
+                            found.append(node_path)
+                            if snapshot.primary_visibility(node) is False:
+                                invisible.add(node_path)
+            result.update(dict.fromkeys(found))
+        return list(result)
+
+    def layer_specs_from_scene(self, layer_names: list[str] = None) -> list[dict]:
+        """
+        ツールが作成した既存レイヤーの _TARGETS / _MATTES / _AUTOMATTE コレクションからレイヤー定義を復元します。
+        セレクターの静的選択のみを使い、パターン指定のメンバーは含みません。
+        """
+        specs = []
+        for name, layer in self.layer_registry.layer_map().items():
+            if name in ('masterLayer', 'defaultRenderLayer') or (layer_names is not None and name not in layer_names):
+                continue
+            current = self.read_layer_contents(layer)
+            targets = current.get(f"{name}_TARGETS")
+            mattes = current.get(f"{name}_MATTES")
+            specs.append({
+                'name': name,
+                'targets': sorted(targets['static']) if targets else [],
+                'mattes': sorted(mattes['static']) if mattes else [],
+                'auto_matte': f"{name}_AUTOMATTE" in current,
+            })
+        return specs
+
+    # --- テンプレート ---
+
+    @profiler.instrument()
+    def capture_layer_template(self, name: str, layer_names: list[str], library=None) -> str:
+        """
+        指定レイヤーを Render Setup の encode() で書き出し、テンプレートライブラリに保存してハッシュを返します。
+        シーン全体の設定 (レンダー設定・シーンAOV) は含めません。
+        """
+        library = library or layer_templates.default_library()
+        encoded = self.rs.encode(None)
+        wanted = set(layer_names)
+        layers = [layer for layer in encoded.get('renderSetup', {}).get('renderLayers', [])
+                  if layer_templates.layer_name_of(layer) in wanted]
+        missing = wanted - {layer_templates.layer_name_of(layer) for layer in layers}
+        if missing:
+            raise ValueError(f"レイヤーが見つかりません: {', '.join(sorted(missing))}")
+        return library.save(name, layers)
+
+    @profiler.instrument()
+    def instantiate_layer_template(self, key: str, targets=None, namespaces: dict = None,
+                                   layer_names: dict = None, library=None) -> dict:
+        """
+        テンプレートの対象・ネームスペース・レイヤー名を置き換え、全レイヤーを1回の decode() で作成します。
+        同名のレイヤーは上書き (マージ) されます。
+        targets: {テンプレートのパス: シーンのパス}、またはテンプレートの 'targets' と同じ順序のパスのリスト
+        戻り値: {'hash', 'layers': [作成したレイヤー名], 'elapsed': 秒}
+        """
+        library = library or layer_templates.default_library()
+        start = time.perf_counter()
+        template = library.load(key)
+        if isinstance(targets, (list, tuple)):
+            targets = dict(zip(template['targets'], targets))
+        layers = layer_templates.instantiate(template['layers'], targets, namespaces, layer_names)
+        with self._batch_edit("RenderLayerTool_InstantiateTemplate"):
+            self.rs.decode({'renderSetup': {'renderLayers': layers}}, renderSetup.DECODE_AND_MERGE, None)
+        return {'hash': template['hash'], 'layers': [layer_templates.layer_name_of(layer) for layer in layers],
+                'elapsed': time.perf_counter() - start}
+
+    # --- AOV ---
+
+    @profiler.instrument()
+    def apply_scene_aovs(self, aov_names: list[str], remove_others: bool = True) -> dict:
+        """シーンのArnold AOVを aov_names に合わせます (差分のみ作成/削除)。戻り値は AOVManager.apply と同じ。"""
+        with self._batch_edit("RenderLayerTool_ApplyAOVs"):
+            return self.aov_manager.apply(aov_names, remove_others=remove_others)
+
+    @profiler.instrument()
+    def apply_layer_aovs(self, layer_names: list[str], aov_names: list[str]) -> dict:
+        """
+        指定レイヤーで aov_names のAOVだけが有効になるよう、レイヤーごとの enabled オーバーライドを設定します。
+        他のレイヤーが使うAOVがあるため、シーンのAOVは作成のみ行い削除はしません。
+        戻り値: AOVManager.apply の結果に 'layers' (設定したレイヤー名) と 'missing' を加えた辞書
+        """
+        with self._batch_edit("RenderLayerTool_ApplyLayerAOVs"):
+            result = self.aov_manager.apply(aov_names, remove_others=False)
+            wanted = set(aov_names)
+            enabled = [node for name, node in result['nodes'].items() if name in wanted]
+            disabled = [node for name, node in result['nodes'].items() if name not in wanted]
+
+            result.update(layers=[], missing=[])
+            layers_by_name = self.layer_registry.layer_map()
+            for layer_name in dict.fromkeys(layer_names):
+                layer = layers_by_name.get(layer_name)
+                if layer is None:
+                    result['missing'].append(layer_name)
+                    continue
+                collections = {col.name(): col for col in layer.getCollections()}
+                self._set_aov_collection(layer, collections, f"{layer_name}_AOV_ON", enabled, True)
+                self._set_aov_collection(layer, collections, f"{layer_name}_AOV_OFF", disabled, False)
+                self.layer_registry.invalidate_stats(layer_name)
+                result['layers'].append(layer_name)
+        return result
+
+    @staticmethod
+    def _set_aov_collection(layer, collections: dict, collection_name: str, aov_nodes: list[str], enabled: bool):
+        """aiAOV ノードの enabled を上書きするコレクションを、なければ作成し、あればメンバーだけ更新します。"""
+        collection = collections.get(collection_name)
+        if collection is None:
+            if not aov_nodes:
+                return None
+            collection = layer.createCollection(collection_name)
+            collection_selector = collection.getSelector()
+            collection_selector.setFilterType(selector.Filters.kCustom)
+            collection_selector.setCustomFilterValue("aiAOV")
+            ov = collection.createAbsoluteOverride(aov_nodes[0], 'enabled')
+            ov.setAttrValue(enabled)
+        collection.getSelector().setStaticSelection(aov_nodes)
+        return collection
+
+    @contextlib.contextmanager
+    def _batch_edit(self, chunk_name: str, suspend_evaluation: bool = False):
+        """
+        1つのUndoチャンクにまとめ、その間ビューポートとRender Setupエディタの再描画を止めます。
+        suspend_evaluation=True の場合はEvaluation Managerも停止し、編集ごとのグラフ再構築を避けます。
+        ブロック内のレイヤー切り替えは LayerSwitcher.batch() でまとめ、Undoチャンクを閉じる前に1回だけ実行します。
+        """
+        # mayapy -batch ではUIコマンドが存在しないため、再描画の停止は対話モードのみ行う
+        interactive = not cmds.about(batch=True)
+        rs_window_visible = False
+        if interactive:
+            try:
+                rs_window_visible = bool(
+                    cmds.workspaceControl(RENDER_SETUP_WINDOW, exists=True)
+                    and cmds.workspaceControl(RENDER_SETUP_WINDOW, q=True, visible=True))
+            except RuntimeError:
+                pass
+
+        evaluation_mode = None
+        if suspend_evaluation:
+            evaluation_mode = (cmds.evaluationManager(q=True, mode=True) or [None])[0]
 
-    def delete_layers(self, layer_names: list[str]) -> bool:
+        cmds.undoInfo(openChunk=True, chunkName=chunk_name)
+        if interactive:
+            cmds.refresh(suspend=True)
+        if evaluation_mode and evaluation_mode != 'off':
+            cmds.evaluationManager(mode='off')
+        if rs_window_visible:
+            # Render Setup には更新を止める公開APIがないため、エディタを一時的に隠して再描画を避ける
+            cmds.workspaceControl(RENDER_SETUP_WINDOW, e=True, visible=False)
+        try:
+            with self.layer_switcher.batch():
+                yield
+        finally:
+            if rs_window_visible:
+                cmds.workspaceControl(RENDER_SETUP_WINDOW, e=True, visible=True)
+            if evaluation_mode and evaluation_mode != 'off':
+                cmds.evaluationManager(mode=evaluation_mode)
+            if interactive:
+                cmds.refresh(suspend=False)
+            cmds.undoInfo(closeChunk=True)
+
+    @profiler.instrument()
+    def delete_layers(self, layer_names: list[str]) -> dict:
+        """
+        レイヤーをまとめて削除します。レイヤーの解決は1回、レイヤー切り替えは表示中のレイヤーが
+        削除対象の場合のみ行い、削除全体を1つのUndoチャンク内で再描画/評価を止めて実行します。
+        戻り値: {'deleted': [名前], 'missing': [名前], 'timings': {フェーズ: 秒}}
+        """
+        result = {'deleted': [], 'missing': [], 'timings': {}}
         if not layer_names:
-            return False
-        self._safe_switch_to_master()
-        for name in layer_names:
-            layer_to_delete = self.rs.getRenderLayer(name)
-            if layer_to_delete:
-                renderLayer.delete(layer_to_delete)
-        return True
+            return result
+
+        start = time.perf_counter()
+        layers_by_name = self.layer_registry.layer_map()
+        layers = []
+        for name in dict.fromkeys(layer_names):
+            layer = layers_by_name.get(name)
+            if layer is None:
+                result['missing'].append(name)
+            else:
+                layers.append((name, layer))
+        result['timings']['resolve'] = time.perf_counter() - start
+        if not layers:
+            return result
+
+        with self._batch_edit("RenderLayerTool_DeleteLayers", suspend_evaluation=True):
+            start = time.perf_counter()
+            visible_layer = self.rs.getVisibleRenderLayer()
+            if visible_layer is not None and visible_layer.name() in dict(layers):
+                # 表示中のレイヤーは削除できないので、保留せずにここで切り替える
+                self.layer_switcher.switch_to_master()
+                self.layer_switcher.flush()
+            result['timings']['switch'] = time.perf_counter() - start
 
-    def delete_all_layers(self) -> bool:
+            start = time.perf_counter()
+            for name, layer in layers:
+                renderLayer.delete(layer)
+                result['deleted'].append(name)
+            result['timings']['delete'] = time.perf_counter() - start
+        return result
+
+    def delete_all_layers(self) -> dict:
         all_layers = self.get_all_layers()
         return self.delete_layers(all_layers)
 
-    def _safe_switch_to_master(self):
-        master_layer = self.rs.getRenderLayer('masterLayer')
-        if self.rs.getVisibleRenderLayer() != master_layer:
-            self.rs.switchToLayer(master_layer)
-
     # --- シーン情報 ---
 
     def get_selection(self) -> list[str]:
         return cmds.ls(sl=True, long=True) or []
 
-    def get_scene_hierarchy(self) -> dict:
-        hierarchy = {}
-        for root in cmds.ls(assemblies=True, long=True):
-            # --- ★★ここを修正★★ ---
-            # カメラ以外のオブジェクトでエラーが出ないようにtry...exceptで囲む
-            try:
-                if cmds.camera(root, q=True, startupCamera=True):
+    def has_node(self, path: str) -> bool:
+        """path が階層のスナップショット (ツリーに表示されるノード) にあるかを返します。"""
+        return self._snapshot is not None and self._snapshot.index_of(path) != NO_NODE
+
+    def existing_paths(self, paths) -> list[str]:
+        """
+        paths のうちシーンに存在するノードのフルパスを返します。
+        スナップショットにないパスを先に除き、残りは cmds.ls の1回の呼び出しでまとめて確認します (パスごとの objExists は行わない)。
+        """
+        if self._snapshot is not None and len(self._snapshot):
+            candidates = [path for path in paths if self._snapshot.index_of(path) != NO_NODE]
+        else:
+            candidates = list(paths)
+        if not candidates:
+            return []
+        return cmds.ls(candidates, long=True) or []
+
+    @profiler.instrument()
+    def get_scene_hierarchy(self):
+        """シーンを走査し、階層 (スナップショットのルートを見せる読み取り専用の階層辞書) を返します。"""
+        # MItDag による一括走査。ノードごとの listRelatives / nodeType / getAttr 呼び出しは行わない
+        return self._set_snapshot(scene_scan.scan_snapshot())
+
+    def scan_scene_snapshot(self):
+        """
+        シーンを走査してスナップショット (SceneSnapshot) を返します。Mayaを参照するためメインスレッドで呼び出し、
+        後処理は prepare_scene_data に任せます。
+        """
+        return scene_scan.scan_snapshot()
+
+    @staticmethod
+    @profiler.instrument()
+    def prepare_scene_data(snapshot) -> dict:
+        """
+        スナップショットの兄弟を名前順に並べ、カテゴリ分けと検索インデックスを作成します。
+        Mayaを参照しないため、ワーカースレッドで実行できます (スナップショットは採用されるまでワーカーだけが触る)。
+        各階層の子は名前 (大文字小文字を区別しない) 順に並べるので、ツリーの取得時のソートはほぼ整列済みの入力になります。
+        """
+        snapshot.sort_children()
+        hierarchy = snapshot.as_hierarchy()
+        return {
+            'snapshot': snapshot,
+            'hierarchy': hierarchy,
+            'categorized': RenderLayerModel.categorize_hierarchy(hierarchy),
+            'search_index': SceneSearchIndex.from_snapshot(snapshot),
+        }
+
+    def adopt_scene_data(self, data: dict):
+        """prepare_scene_data の結果を現在のスナップショットとして採用します。メインスレッドで呼び出してください。"""
+        self._snapshot = data['snapshot']
+        self._hierarchy = data['hierarchy']
+        self._search_index = data['search_index']
+        self._selector_optimizer = None
+        return self._hierarchy
+
+    def _set_snapshot(self, snapshot):
+        self._snapshot = snapshot
+        self._hierarchy = snapshot.as_hierarchy()
+        self._search_index = None
+        self._selector_optimizer = None
+        return self._hierarchy
+
+    def node_count(self) -> int:
+        """スナップショットのノード数。"""
+        return len(self._snapshot) if self._snapshot is not None else 0
+
+    # --- スナップショットキャッシュ ---
+
+    @staticmethod
+    def _scene_cache_key():
+        """キャッシュのキーとなる (シーンパス, 更新時刻)。未保存のシーンでは None を返します。"""
+        scene_path = cmds.file(q=True, sceneName=True)
+        if not scene_path or not os.path.isfile(scene_path):
+            return None
+        return scene_path, os.path.getmtime(scene_path)
+
+    @staticmethod
+    def dag_fingerprint() -> str:
+        """
+        キャッシュの階層がシーンと食い違っていないかを、DAG全体を走査せずに判定するための値。
+        シーンファイル自体の変更は更新時刻で検出できるので、ファイル以外から変わる部分
+        (ワールド直下のノード名、参照ファイルのロード状態と更新時刻) のハッシュを返します。
+        """
+        digest = hashlib.sha1()
+        for root in sorted(cmds.ls(assemblies=True, long=True) or []):
+            digest.update(root.encode('utf-8') + b'\0')
+
+        references = list(cmds.file(q=True, reference=True) or [])
+        while references:
+            reference = references.pop()
+            # "file.ma{1}" のような同じファイルの複数参照の番号を除いたものが実際のパス
+            path = reference.split('{', 1)[0]
+            loaded = cmds.referenceQuery(reference, isLoaded=True)
+            mtime = os.path.getmtime(path) if os.path.isfile(path) else -1.0
+            digest.update(f"{reference}\0{int(bool(loaded))}\0{mtime!r}\0".encode('utf-8'))
+            if loaded:
+                references.extend(cmds.file(reference, q=True, reference=True) or [])
+        return digest.hexdigest()
+
+    @profiler.instrument()
+    def load_cached_hierarchy(self, cache):
+        """
+        現在のシーンのスナップショットをディスクキャッシュから読み込みます。
+        フィンガープリントが保存時と一致しない場合 (参照ファイルが更新されたなど) はキャッシュを使いません。
+        戻り値: キャッシュの階層。キャッシュが使えない場合は None
+        """
+        key = self._scene_cache_key()
+        if key is None:
+            return None
+        cached = cache.load(*key)
+        if cached is None:
+            return None
+        snapshot, fingerprint = cached
+        if fingerprint != self.dag_fingerprint():
+            return None
+        return self._set_snapshot(snapshot)
+
+    @profiler.instrument()
+    def save_hierarchy_cache(self, cache) -> bool:
+        """
+        現在のスナップショットをディスクキャッシュに保存します。
+        キャッシュはシーンファイルの更新時刻をキーにするため、未保存の変更があるシーンでは保存しません
+        (ファイルにない編集を含んだ階層が、次に同じファイルを開いた時に使われてしまう)。
+        """
+        key = self._scene_cache_key()
+        if key is None or not self.node_count() or cmds.file(q=True, modified=True):
+            return False
+        try:
+            cache.save(key[0], key[1], self.dag_fingerprint(), self._snapshot)
+        except OSError as e:
+            cmds.warning(f"スナップショットキャッシュの保存に失敗しました: {e}")
+            return False
+        return True
+
+    def reconcile_hierarchy(self) -> list:
+        """
+        シーンを再走査してスナップショット (キャッシュから読み込んだものなど) との差分を反映し、
+        apply_dag_changes と同じ形式の差分操作のリストを返します。
+        UIでは begin_reconcile / plan_reconcile / apply_reconcile_plan に分け、比較をワーカースレッドで行います。
+        """
+        return self.apply_reconcile_plan(self.plan_reconcile(self.begin_reconcile()))
+
+    def begin_reconcile(self, scanned=None):
+        """
+        plan_reconcile に渡す (現在のスナップショット, 再走査結果) を返します。
+        scanned を省略した場合はここでシーンを再走査するため、メインスレッドで呼び出してください
+        (UIでは scene_scan.iter_scan_snapshot で少しずつ走査した結果を渡します)。
+        """
+        if scanned is None:
+            scanned = scene_scan.scan_snapshot()
+        return self._snapshot, scanned
+
+    @staticmethod
+    @profiler.instrument()
+    def plan_reconcile(job) -> dict:
+        """
+        begin_reconcile の結果を比較し、スナップショットの書き換え手順を作成します。
+        どちらのスナップショットも読み取るだけなので、ワーカースレッドで実行できます。
+        手順: ('remove', index) / ('update', index, scanned_index) / ('insert', parent, scanned_index)
+        """
+        snapshot, scanned = job
+        plan = []
+        stack = [(NO_NODE, NO_NODE)]
+        while stack:
+            parent, scanned_parent = stack.pop()
+            wanted = {scanned.name(child): child for child in scanned.children(scanned_parent)}
+            existing = {}
+            for child in snapshot.children(parent):
+                name = snapshot.name(child)
+                if name in wanted:
+                    existing[name] = child
+                else:
+                    plan.append(('remove', child))
+            for name, scanned_child in wanted.items():
+                child = existing.get(name)
+                if child is None:
+                    plan.append(('insert', parent, scanned_child))
                     continue
-            except RuntimeError:
-                # オブジェクトがカメラでない場合にこのエラーが発生するが、
-                # 処理を続行して問題ないため、passで無視する
-                pass
-            # -------------------------
-            
-            hierarchy[root] = self._build_hierarchy_recursive(root)
-        return hierarchy
-
-    def _build_hierarchy_recursive(self, node: str) -> dict:
-        node_info = {'type': 'group', 'primaryVisibility': None, 'children': {}}
-        shapes = cmds.listRelatives(node, shapes=True, noIntermediate=True, fullPath=True)
-        if shapes:
-            shape = shapes[0]
-            node_type = cmds.nodeType(shape)
-            if 'mesh' in node_type:
-                node_info['type'] = 'geometry'
-                if cmds.attributeQuery('primaryVisibility', node=shape, exists=True):
-                    node_info['primaryVisibility'] = cmds.getAttr(f"{shape}.primaryVisibility")
-            elif 'camera' in cmds.nodeType(shape, inherited=True):
-                node_info['type'] = 'camera'
-            elif 'light' in cmds.nodeType(shape, inherited=True):
-                node_info['type'] = 'light'
-
-        children = cmds.listRelatives(node, children=True, type='transform', fullPath=True) or []
-        for child in children:
-            node_info['children'][child] = self._build_hierarchy_recursive(child)
-            
-        return node_info
\ No newline at end of file
+                if (snapshot.node_type(child) != scanned.node_type(scanned_child)
+                        or snapshot.primary_visibility(child) != scanned.primary_visibility(scanned_child)
+                        or snapshot.has_shape(child) != scanned.has_shape(scanned_child)):
+                    plan.append(('update', child, scanned_child))
+                stack.append((child, scanned_child))
+        return {'snapshot': snapshot, 'scanned': scanned, 'plan': plan}
+
+    @profiler.instrument()
+    def apply_reconcile_plan(self, result: dict):
+        """
+        plan_reconcile の結果をスナップショットに反映し、apply_dag_changes と同じ形式の差分操作のリストを返します。
+        比較の間にスナップショットが置き換えられていた場合は None を返します。メインスレッドで呼び出してください。
+        """
+        snapshot, scanned = result['snapshot'], result['scanned']
+        if snapshot is None or snapshot is not self._snapshot:
+            return None
+        ops = []
+        for step in result['plan']:
+            if step[0] == 'remove':
+                ops.append(('remove', snapshot.path(step[1])))
+                snapshot.remove_subtree(step[1])
+            elif step[0] == 'update':
+                index, scanned_index = step[1], step[2]
+                node_type = scanned.node_type(scanned_index)
+                snapshot.set_type(index, node_type)
+                snapshot.set_primary_visibility(index, scanned.primary_visibility(scanned_index))
+                snapshot.set_has_shape(index, scanned.has_shape(scanned_index))
+                ops.append(('update', snapshot.path(index), NodeView(snapshot, index), category_for_type(node_type)))
+            else:
+                parent = step[1]
+                child = snapshot.copy_subtree(parent, scanned, step[2])
+                ops.append(('insert', snapshot.path(parent), snapshot.path(child), NodeView(snapshot, child),
+                            category_for_type(snapshot.node_type(child))))
+        if ops:
+            self._search_index = None
+            self._selector_optimizer = None
+        return ops
+
+    @profiler.instrument()
+    def search_scene(self, query: str):
+        """
+        スナップショットを検索し、表示すべきノード (一致ノードと祖先) のパス集合を返します。
+        クエリが空の場合は None を返します。
+        """
+        if self._search_index is None:
+            self._search_index = (SceneSearchIndex.from_snapshot(self._snapshot) if self._snapshot is not None
+                                  else SceneSearchIndex({}))
+        return self._search_index.visible_paths(query)
+
+    @profiler.instrument()
+    def match_nodes(self, patterns: list[str]) -> list[str]:
+        """
+        名前/パスのパターン (グロブ, "re:" 正規表現, 完全一致) に一致するノードのフルパスを返します。
+        レシピなど、UIを介さずに対象を指定する場合に使用します。
+        """
+        if self._snapshot is None:
+            self.get_scene_hierarchy()
+        if self._search_index is None:
+            self._search_index = SceneSearchIndex.from_snapshot(self._snapshot)
+        matched = {}
+        for pattern in patterns:
+            if self.has_node(pattern):
+                matched[pattern] = True
+                continue
+            for path in self._search_index.match(pattern, substring=False):
+                matched[path] = True
+        return list(matched)
+
+    @staticmethod
+    def categorize_hierarchy(hierarchy: dict) -> dict:
+        """ルートノードをViewのカテゴリ (geometry/lights/cameras/groups/other) に振り分けます。"""
+        categorized = {}
+        for path, node_info in hierarchy.items():
+            categorized.setdefault(category_for_type(node_info['type']), {})[path] = node_info
+        return categorized
+
+    # --- 差分更新 ---
+
+    @profiler.instrument()
+    def apply_dag_changes(self, changes: list) -> list:
+        """
+        DAG変更イベント列をスナップショットに反映し、View用の差分操作のリストを返します。
+        changes: ('dirty', path) または ('rename', old_path, new_path) のリスト (発生順)
+        戻り値: ('insert', parent_path, path, node_info, category) / ('update', path, node_info, category) /
+                ('remove', path) / ('rename', old_path, new_path)
+        node_info はスナップショットのノードを見せる読み取り専用の NodeView です。
+        """
+        ops = []
+        dirty = []
+        for change in changes:
+            if change[0] == 'rename':
+                old_path, new_path = change[1], change[2]
+                # 先に積まれた dirty パスもリネーム後のパスに読み替える
+                dirty = [_replace_path_prefix(p, old_path, new_path) for p in dirty]
+                index = self._snapshot.index_of(old_path) if self._snapshot is not None else NO_NODE
+                # 親が変わらないリネームのみ (リペアレントは dirty として扱う)
+                if (index != NO_NODE and old_path.rpartition('|')[0] == new_path.rpartition('|')[0]
+                        and self._snapshot.index_of(new_path) == NO_NODE):
+                    self._snapshot.rename(index, new_path.rpartition('|')[2])
+                    ops.append(('rename', old_path, new_path))
+                else:
+                    dirty.append(new_path)
+            else:
+                dirty.append(change[1])
+
+        # 祖先が dirty なパスは祖先の再同期に含まれるので除外する
+        resynced = set()
+        for path in sorted(set(dirty), key=lambda p: p.count('|')):
+            parent = path.rpartition('|')[0]
+            covered = False
+            while parent:
+                if parent in resynced:
+                    covered = True
+                    break
+                parent = parent.rpartition('|')[0]
+            if covered:
+                continue
+            resynced.add(path)
+            self._resync_subtree(path, ops)
+
+        if ops:
+            self._search_index = None
+            self._selector_optimizer = None
+        return ops
+
+    def _resync_subtree(self, path: str, ops: list):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return
+        scanned = scene_scan.scan_snapshot(path)
+        scanned_root = next(scanned.roots(), NO_NODE)
+        current = snapshot.index_of(path)
+
+        if scanned_root == NO_NODE:
+            if current != NO_NODE:
+                snapshot.remove_subtree(current)
+                ops.append(('remove', path))
+            return
+
+        parent_path = path.rpartition('|')[0]
+        parent = snapshot.index_of(parent_path) if parent_path else NO_NODE
+        if parent_path and parent == NO_NODE:
+            # 親がスナップショットにない (アンダーワールド等) ノードは対象外
+            return
+
+        if current == NO_NODE:
+            current = snapshot.copy_subtree(parent, scanned, scanned_root)
+            ops.append(('insert', parent_path, path, NodeView(snapshot, current),
+                        category_for_type(snapshot.node_type(current))))
+            return
+
+        self._diff_node(current, scanned, scanned_root, ops)
+
+    def _diff_node(self, index: int, scanned, scanned_index: int, ops: list):
+        """既存ノードと再走査結果 (別のスナップショット) を比較し、変化したノードだけを書き換えて差分操作にします。"""
+        snapshot = self._snapshot
+        node_type = scanned.node_type(scanned_index)
+        primary_visibility = scanned.primary_visibility(scanned_index)
+        has_shape = scanned.has_shape(scanned_index)
+        if (snapshot.node_type(index) != node_type or snapshot.primary_visibility(index) != primary_visibility
+                or snapshot.has_shape(index) != has_shape):
+            snapshot.set_type(index, node_type)
+            snapshot.set_primary_visibility(index, primary_visibility)
+            snapshot.set_has_shape(index, has_shape)
+            ops.append(('update', snapshot.path(index), NodeView(snapshot, index), category_for_type(node_type)))
+        self._diff_children(index, scanned, scanned_index, ops)
+
+    def _diff_children(self, parent: int, scanned, scanned_parent: int, ops: list):
+        snapshot = self._snapshot
+        wanted = {scanned.name(child): child for child in scanned.children(scanned_parent)}
+        for child in list(snapshot.children(parent)):
+            if snapshot.name(child) not in wanted:
+                ops.append(('remove', snapshot.path(child)))
+                snapshot.remove_subtree(child)
+        parent_path = snapshot.path(parent)
+        for name, scanned_child in wanted.items():
+            child = snapshot.child_named(parent, name)
+            if child == NO_NODE:
+                child = snapshot.copy_subtree(parent, scanned, scanned_child)
+                ops.append(('insert', parent_path, f"{parent_path}|{name}", NodeView(snapshot, child),
+                            category_for_type(snapshot.node_type(child))))
+            else:
+                self._diff_node(child, scanned, scanned_child, ops)
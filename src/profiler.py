@@ -0,0 +1,237 @@
+# render_layer_tool/profiler.py
+# -*- coding: utf-8 -*-
+"""
+ツールの処理時間を計測するオプトインの計測レイヤー。
+@instrument を付けた操作ごとに実行時間と、その間の maya.cmds / Render Setup API の呼び出し回数を記録します。
+記録は固定長のリングバッファに入り、操作ごとのレイテンシのヒストグラムも集計します。
+結果はJSON、または chrome://tracing / Perfetto で開ける Chrome Trace 形式で保存できます。
+
+無効時は @instrument のラッパーがフラグを1回確認するだけで、cmds/Render Setup への差し込みも行いません。
+"""
+import bisect
+import collections
+import functools
+import importlib
+import json
+import os
+import threading
+import time
+
+DEFAULT_CAPACITY = 20000
+# ヒストグラムのバケット上限 (ミリ秒)。最後のバケットはそれ以上
+HISTOGRAM_BOUNDS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# 呼び出し回数を数える Render Setup API のモジュール
+RENDER_SETUP_MODULES = (
+    'maya.app.renderSetup.model.renderSetup',
+    'maya.app.renderSetup.model.renderLayer',
+    'maya.app.renderSetup.model.collection',
+    'maya.app.renderSetup.model.selector',
+    'maya.app.renderSetup.model.override',
+)
+
+_CMDS = 0
+_RENDER_SETUP = 1
+# 差し込んだラッパーの目印。モジュールを再読み込みしても元に戻せるよう関数自体に持たせる
+_PATCH_MARKER = '_render_layer_tool_profiled'
+
+_enabled = False
+_records = collections.deque(maxlen=DEFAULT_CAPACITY)
+_histograms = {}
+_local = threading.local()
+_epoch = time.perf_counter()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable(capacity: int = None):
+    """計測を開始し、maya.cmds と Render Setup API に呼び出し回数のカウンターを差し込みます。"""
+    global _enabled, _records
+    if capacity and capacity != _records.maxlen:
+        _records = collections.deque(_records, maxlen=capacity)
+    if _enabled:
+        return
+    _patch_maya()
+    _enabled = True
+
+
+def disable():
+    """計測を停止し、差し込んだカウンターを取り除きます。記録は reset() するまで残ります。"""
+    global _enabled
+    _enabled = False
+    _unpatch_maya()
+
+
+def reset():
+    _records.clear()
+    _histograms.clear()
+
+
+# --- 記録 ---
+
+def _frames() -> list:
+    frames = getattr(_local, 'frames', None)
+    if frames is None:
+        frames = _local.frames = []
+    return frames
+
+
+def instrument(name: str = None):
+    """
+    関数/メソッドを計測対象にするデコレーター。name を省略した場合は修飾名を使います。
+    計測中に呼ばれた計測対象の操作は入れ子として記録され、呼び出し回数は外側の操作にも含まれます。
+    """
+    def decorator(func):
+        op_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            frames = _frames()
+            frame = [0, 0]
+            frames.append(frame)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                frames.pop()
+                if frames:
+                    frames[-1][_CMDS] += frame[_CMDS]
+                    frames[-1][_RENDER_SETUP] += frame[_RENDER_SETUP]
+                _record(op_name, start, duration, frame, len(frames))
+        return wrapper
+    return decorator
+
+
+def _record(name, start, duration, counts, depth):
+    _records.append((name, start - _epoch, duration, counts[_CMDS], counts[_RENDER_SETUP],
+                     depth, threading.get_ident()))
+    histogram = _histograms.get(name)
+    if histogram is None:
+        histogram = _histograms[name] = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    histogram[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, duration * 1000.0)] += 1
+
+
+# --- Maya API への差し込み ---
+
+def _counting(func, kind):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        frames = getattr(_local, 'frames', None)
+        if frames:
+            frames[-1][kind] += 1
+        return func(*args, **kwargs)
+    setattr(wrapper, _PATCH_MARKER, func)
+    return wrapper
+
+
+def _patch_targets():
+    """(差し込み先のオブジェクト, 属性名の一覧, 種類) を列挙します。"""
+    try:
+        import maya.cmds as cmds
+    except ImportError:
+        return
+    yield cmds, [n for n in dir(cmds) if not n.startswith('_')], _CMDS
+    for module_name in RENDER_SETUP_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        for cls in vars(module).values():
+            if isinstance(cls, type) and cls.__module__ == module_name:
+                yield cls, [n for n, v in vars(cls).items() if not n.startswith('_') and callable(v)], _RENDER_SETUP
+
+
+def _lookup(owner, attr_name):
+    # クラスは継承した属性を書き換えないよう、自身の __dict__ だけを見る
+    if isinstance(owner, type):
+        func = vars(owner).get(attr_name)
+        if isinstance(func, (staticmethod, classmethod)):
+            return None # 記述子を関数で置き換えると呼び出し方が変わってしまう
+        return func
+    return getattr(owner, attr_name, None)
+
+
+def _patch_maya():
+    for owner, names, kind in _patch_targets():
+        for attr_name in names:
+            func = _lookup(owner, attr_name)
+            if not callable(func) or isinstance(func, type) or hasattr(func, _PATCH_MARKER):
+                continue
+            try:
+                setattr(owner, attr_name, _counting(func, kind))
+            except (AttributeError, TypeError):
+                pass
+
+
+def _unpatch_maya():
+    for owner, names, _ in _patch_targets():
+        for attr_name in names:
+            original = getattr(_lookup(owner, attr_name), _PATCH_MARKER, None)
+            if original is not None:
+                setattr(owner, attr_name, original)
+
+
+# --- 集計/出力 ---
+
+def records() -> list:
+    """リングバッファの記録を dict のリストで返します (古い順)。"""
+    return [
+        {'name': name, 'start': start, 'duration': duration, 'cmds_calls': cmds_calls,
+         'render_setup_calls': rs_calls, 'depth': depth, 'thread': thread}
+        for name, start, duration, cmds_calls, rs_calls, depth, thread in list(_records)
+    ]
+
+
+def summary() -> list:
+    """操作ごとの集計 (合計時間の降順) を返します。パーセンタイルはリングバッファ内の記録から求めます。"""
+    grouped = {}
+    for name, _, duration, cmds_calls, rs_calls, _, _ in list(_records):
+        grouped.setdefault(name, []).append((duration, cmds_calls, rs_calls))
+
+    rows = []
+    for name, entries in grouped.items():
+        durations = sorted(d for d, _, _ in entries)
+        count = len(durations)
+        total = sum(durations)
+        rows.append({
+            'name': name,
+            'count': count,
+            'total_ms': total * 1000.0,
+            'mean_ms': total / count * 1000.0,
+            'p50_ms': durations[count // 2] * 1000.0,
+            'p95_ms': durations[min(count - 1, int(count * 0.95))] * 1000.0,
+            'max_ms': durations[-1] * 1000.0,
+            'cmds_calls': sum(c for _, c, _ in entries),
+            'render_setup_calls': sum(r for _, _, r in entries),
+            'histogram': list(_histograms.get(name, ())),
+        })
+    rows.sort(key=lambda row: row['total_ms'], reverse=True)
+    return rows
+
+
+def dump_json(path: str):
+    data = {
+        'histogram_bounds_ms': list(HISTOGRAM_BOUNDS_MS),
+        'summary': summary(),
+        'records': records(),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def dump_chrome_trace(path: str):
+    """Chrome Trace Event 形式 (完了イベント "X") で保存します。"""
+    pid = os.getpid()
+    events = [
+        {'name': r['name'], 'cat': 'render_layer_tool', 'ph': 'X', 'pid': pid, 'tid': r['thread'],
+         'ts': r['start'] * 1e6, 'dur': r['duration'] * 1e6,
+         'args': {'cmds_calls': r['cmds_calls'], 'render_setup_calls': r['render_setup_calls']}}
+        for r in records()
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
@@ -0,0 +1,127 @@
+# render_layer_tool/recipe.py
+# -*- coding: utf-8 -*-
+"""
+レンダーレイヤー構成を記述する宣言的なレシピ (JSON) の読み込み・コンパイル・適用。
+UIを介さずに RenderLayerModel で同じレイヤー構成を再現するために使用します。
+
+レシピの例:
+    {
+      "version": 1,
+      "renderer": "arnold",
+      "aovs": ["diffuse", "specular", "N"],
+      "layers": [
+        {
+          "name": "RL_Character",
+          "targets": ["chr:*"],
+          "mattes": ["|env|ground"],
+          "auto_matte": true,
+          "overrides": [
+            {"nodes": ["chr:body"], "attribute": "aiSubdivIterations", "value": 2}
+          ]
+        },
+        {"name": "RL_", "targets": ["prop_*"], "each": true}
+      ]
+    }
+
+パターンは完全一致の名前/フルパス、グロブ ("*" "?" "[")、"re:" で始まる正規表現が使えます。
+"each": true のレイヤーは一致したノードごとに "<name><ノード名>" のレイヤーに展開されます。
+"""
+import json
+
+import arnold_utils
+
+RECIPE_VERSION = 1
+
+_LAYER_KEYS = {'name', 'targets', 'mattes', 'auto_matte', 'each', 'overrides'}
+
+
+def load_recipe(path: str) -> dict:
+    """JSONファイルからレシピを読み込み、検証して返します。"""
+    with open(path, 'r', encoding='utf-8') as f:
+        recipe = json.load(f)
+    validate_recipe(recipe)
+    return recipe
+
+
+def validate_recipe(recipe: dict):
+    """レシピの構造を検証します。不正な場合は ValueError を送出します。"""
+    if not isinstance(recipe, dict):
+        raise ValueError("レシピはJSONオブジェクトである必要があります。")
+    version = recipe.get('version', RECIPE_VERSION)
+    if version != RECIPE_VERSION:
+        raise ValueError(f"未対応のレシピバージョンです: {version}")
+    if not isinstance(recipe.get('aovs', []), list):
+        raise ValueError("'aovs' はAOV名のリストである必要があります。")
+
+    layers = recipe.get('layers')
+    if not isinstance(layers, list) or not layers:
+        raise ValueError("'layers' に1つ以上のレイヤーを指定してください。")
+    for i, layer in enumerate(layers):
+        if not isinstance(layer, dict) or not layer.get('name'):
+            raise ValueError(f"layers[{i}]: 'name' が指定されていません。")
+        unknown = set(layer) - _LAYER_KEYS
+        if unknown:
+            raise ValueError(f"layers[{i}]: 不明なキーがあります: {', '.join(sorted(unknown))}")
+        for key in ('targets', 'mattes'):
+            if not isinstance(layer.get(key, []), list):
+                raise ValueError(f"layers[{i}]: '{key}' はパターンのリストである必要があります。")
+        for j, ov in enumerate(layer.get('overrides', [])):
+            if not isinstance(ov, dict) or 'attribute' not in ov or 'value' not in ov:
+                raise ValueError(f"layers[{i}].overrides[{j}]: 'attribute' と 'value' が必要です。")
+
+
+def compile_recipe(recipe: dict, model) -> list[dict]:
+    """
+    レシピのパターンを現在のシーンに対して一度だけ解決し、RenderLayerModel.apply_layer_specs に
+    渡せるレイヤー定義のリストにします。
+    """
+    validate_recipe(recipe)
+    resolved = {}
+
+    def resolve(patterns):
+        key = tuple(patterns)
+        if key not in resolved:
+            resolved[key] = model.match_nodes(list(patterns))
+        return resolved[key]
+
+    specs = []
+    for layer in recipe['layers']:
+        targets = resolve(layer.get('targets', []))
+        mattes = resolve(layer.get('mattes', []))
+        overrides = [
+            {
+                # ノード指定がなければレイヤーの対象に適用する
+                'nodes': resolve(ov['nodes']) if ov.get('nodes') else targets,
+                'attribute': ov['attribute'],
+                'value': ov['value'],
+            }
+            for ov in layer.get('overrides', [])
+        ]
+        base = {'targets': targets, 'mattes': mattes, 'auto_matte': bool(layer.get('auto_matte', False)),
+                'overrides': overrides}
+
+        if layer.get('each'):
+            for target in targets:
+                spec = dict(base, targets=[target])
+                spec['name'] = model.layer_name_for_target(target, prefix=layer['name'])
+                specs.append(spec)
+        else:
+            specs.append(dict(base, name=layer['name']))
+    return specs
+
+
+def apply_recipe(recipe: dict, model) -> dict:
+    """
+    レシピをコンパイルして現在のシーンに適用します。
+    戻り値: apply_layer_specs の結果に 'aovs' (作成したAOV名) を加えた辞書
+    """
+    specs = compile_recipe(recipe, model)
+
+    if recipe.get('renderer') == 'arnold' or recipe.get('aovs'):
+        arnold_utils.ensure_arnold_renderer()
+
+    result = model.apply_layer_specs(specs)
+    aov_names = recipe.get('aovs', [])
+    # レシピのAOVは追加のみ行い、既存のAOVは削除しない
+    result['aovs'] = model.apply_scene_aovs(aov_names, remove_others=False)['created'] if aov_names else []
+    return result
@@ -0,0 +1,81 @@
+# render_layer_tool/refresh_scheduler.py
+# -*- coding: utf-8 -*-
+"""
+連続して発生するシーンイベントをまとめ、落ち着いた時点で1回だけ更新処理を実行するスケジューラ。
+"""
+import time
+
+from PySide6 import QtCore
+
+
+class RefreshScheduler(QtCore.QObject):
+    """
+    post() されたイベントを種類ごとに集約し、デバウンス後に handler を1回呼び出します。
+    イベントが途切れない場合でも、最初のイベントから max_latency_ms 経過した時点で実行します。
+
+    handler には {kind: [payload, ...]} の辞書が渡されます。
+    """
+    def __init__(self, handler, debounce_ms: int = 150, max_latency_ms: int = 1000, parent=None):
+        super(RefreshScheduler, self).__init__(parent)
+        self._handler = handler
+        self.debounce_ms = debounce_ms
+        self.max_latency_ms = max_latency_ms
+
+        self._pending = {}
+        self._first_event_time = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+        self.stats = {
+            'events_posted': 0,     # post() された総イベント数
+            'events_coalesced': 0,  # 他のイベントとまとめられ、単独の更新にならなかった数
+            'refreshes_run': 0,     # 実際に handler を呼び出した回数
+        }
+
+    def post(self, kind: str, payload=None):
+        """イベントを登録します。同じ種類・同じ内容の連続イベントは1つにまとめます。"""
+        self.stats['events_posted'] += 1
+        payloads = self._pending.get(kind)
+        if payloads is None:
+            self._pending[kind] = payloads = []
+        else:
+            self.stats['events_coalesced'] += 1
+
+        if payload is not None and (not payloads or payloads[-1] != payload):
+            payloads.append(payload)
+
+        now = time.perf_counter()
+        if self._first_event_time is None:
+            self._first_event_time = now
+
+        # 最大待ち時間を超えない範囲でデバウンスタイマーを延長する
+        remaining_ms = self.max_latency_ms - (now - self._first_event_time) * 1000.0
+        self._timer.start(max(0, int(min(self.debounce_ms, remaining_ms))))
+
+    def has_pending(self, kind: str = None) -> bool:
+        return kind in self._pending if kind else bool(self._pending)
+
+    def discard(self, kind: str = None):
+        """保留中のイベントを破棄します。kind を省略した場合はすべて破棄します。"""
+        if kind:
+            self._pending.pop(kind, None)
+        else:
+            self._pending = {}
+        if not self._pending:
+            self._timer.stop()
+            self._first_event_time = None
+
+    def flush(self):
+        """保留中のイベントを即座に処理します。"""
+        self._timer.stop()
+        self._first_event_time = None
+        if not self._pending:
+            return
+        events, self._pending = self._pending, {}
+        self.stats['refreshes_run'] += 1
+        self._handler(events)
+
+    def stop(self):
+        self.discard()
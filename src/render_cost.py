@@ -0,0 +1,193 @@
+# render_layer_tool/render_cost.py
+# -*- coding: utf-8 -*-
+"""
+レイヤーごとのレンダーコストの見積もり。
+各レイヤーが描画する (対象) / マットにする (PV OFF) メッシュの統計 (三角形数・バウンディングボックス・
+Arnold のサブディビジョン設定) を OpenMaya API 2.0 でまとめて取得し、NumPy の配列で集計します。
+同じメッシュの統計は複数のレイヤーで共有し、メッシュごとの cmds 呼び出しは行いません。
+NumPy がない環境では同じ計算を純粋なPythonで行います。
+"""
+import maya.api.OpenMaya as om2
+
+NUMPY_AVAILABLE = False
+np = None
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    pass
+
+# マット (PV OFF) のメッシュは反射・影などの二次光線でのみ評価されるため、コストをこの割合で数える
+MATTE_COST_WEIGHT = 0.35
+# レイヤーのコストが中央値のこの倍数を超えたら偏りとして警告する
+DEFAULT_IMBALANCE_RATIO = 3.0
+# aiSubdivType: 0 = none, 1 = catclark, 2 = linear
+_SUBDIV_NONE = 0
+
+
+class MeshStats:
+    """メッシュ (ジオメトリのトランスフォーム) ごとの統計を並列の配列で保持します。"""
+    def __init__(self, paths: list[str]):
+        self.paths = paths
+        self.index = {path: i for i, path in enumerate(paths)}
+        count = len(paths)
+        self.triangles = [0] * count
+        self.effective_triangles = [0.0] * count
+        self.subdiv_iterations = [0] * count
+        # ワールド空間のバウンディングボックス (min xyz, max xyz)。直下のメッシュすべてを囲む
+        self.bounds = [(0.0, 0.0, 0.0, 0.0, 0.0, 0.0)] * count
+        # 直下に (中間オブジェクトでない) メッシュがあるか。ないものはバウンディングボックスの集計から除く
+        self.has_mesh = [False] * count
+
+    def freeze(self):
+        """集計用にリストを NumPy 配列に変換します。"""
+        if not NUMPY_AVAILABLE:
+            return
+        self.triangles = np.asarray(self.triangles, dtype=np.int64)
+        self.effective_triangles = np.asarray(self.effective_triangles, dtype=np.float64)
+        self.subdiv_iterations = np.asarray(self.subdiv_iterations, dtype=np.int32)
+        self.bounds = np.asarray(self.bounds, dtype=np.float64).reshape(len(self.paths), 6)
+        self.has_mesh = np.asarray(self.has_mesh, dtype=bool)
+
+
+def _plug_int(fn_node, attr: str) -> int:
+    if not fn_node.hasAttribute(attr):
+        return 0 # mtoa が読み込まれていない
+    return fn_node.findPlug(attr, False).asInt()
+
+
+def gather_mesh_stats(paths: list[str]) -> MeshStats:
+    """
+    ジオメトリのトランスフォームのパスから、直下の (中間オブジェクトでない) メッシュの統計を取得します。
+    1つの MSelectionList にまとめて登録し、API の関数セットだけで読み取ります。
+    """
+    stats = MeshStats(list(dict.fromkeys(paths)))
+    triangles = [0] * len(stats.paths)
+    effective = [0.0] * len(stats.paths)
+    iterations = [0] * len(stats.paths)
+    bounds = [(0.0, 0.0, 0.0, 0.0, 0.0, 0.0)] * len(stats.paths)
+    has_mesh = [False] * len(stats.paths)
+
+    selection = om2.MSelectionList()
+    valid = []
+    for i, path in enumerate(stats.paths):
+        try:
+            selection.add(path)
+        except RuntimeError:
+            continue # 削除済み
+        valid.append(i)
+
+    for list_index, i in enumerate(valid):
+        transform_path = selection.getDagPath(list_index)
+        for shape_index in range(transform_path.numberOfShapesDirectlyBelow()):
+            shape_path = om2.MDagPath(transform_path)
+            shape_path.extendToShapeDirectlyBelow(shape_index)
+            if not shape_path.hasFn(om2.MFn.kMesh):
+                continue
+            fn_mesh = om2.MFnMesh(shape_path)
+            if fn_mesh.isIntermediateObject:
+                continue
+            # 各面の三角形数は (頂点数 - 2) なので、合計は 面頂点数 - 2 * 面数
+            tris = fn_mesh.numFaceVertices - 2 * fn_mesh.numPolygons
+            subdiv = _plug_int(fn_mesh, 'aiSubdivIterations') if _plug_int(fn_mesh, 'aiSubdivType') != _SUBDIV_NONE else 0
+            box = fn_mesh.boundingBox
+            box.transformUsing(transform_path.inclusiveMatrix())
+            triangles[i] += tris
+            effective[i] += tris * (4 ** subdiv)
+            iterations[i] = max(iterations[i], subdiv)
+            shape_bounds = (box.min.x, box.min.y, box.min.z, box.max.x, box.max.y, box.max.z)
+            # 複数のシェイプを持つトランスフォームは、すべてのシェイプを囲むボックスにする
+            bounds[i] = _union_boxes(bounds[i], shape_bounds) if has_mesh[i] else shape_bounds
+            has_mesh[i] = True
+
+    stats.triangles, stats.effective_triangles = triangles, effective
+    stats.subdiv_iterations, stats.bounds, stats.has_mesh = iterations, bounds, has_mesh
+    stats.freeze()
+    return stats
+
+
+def _sum(values, indexes):
+    if NUMPY_AVAILABLE:
+        return float(values[indexes].sum()) if len(indexes) else 0.0
+    return float(sum(values[i] for i in indexes))
+
+
+def _union_boxes(a, b):
+    return tuple(min(a[axis], b[axis]) for axis in range(3)) + tuple(max(a[axis], b[axis]) for axis in range(3, 6))
+
+
+def _union_bounds(bounds, has_mesh, indexes):
+    """indexes のうちメッシュを持つトランスフォームのボックスを合成します。該当がなければ None を返します。"""
+    if NUMPY_AVAILABLE:
+        indexes = indexes[has_mesh[indexes]] if len(indexes) else indexes
+    else:
+        indexes = [i for i in indexes if has_mesh[i]]
+    if not len(indexes):
+        return None
+    if NUMPY_AVAILABLE:
+        selected = bounds[indexes]
+        return tuple(selected[:, :3].min(axis=0).tolist() + selected[:, 3:].max(axis=0).tolist())
+    selected = [bounds[i] for i in indexes]
+    return tuple(min(b[axis] for b in selected) for axis in range(3)) + \
+        tuple(max(b[axis] for b in selected) for axis in range(3, 6))
+
+
+def _as_indexes(index_set):
+    if NUMPY_AVAILABLE:
+        return np.fromiter(index_set, dtype=np.int64, count=len(index_set))
+    return list(index_set)
+
+
+def estimate_layers(layers: list[dict], stats: MeshStats, invisible: set = frozenset(),
+                    imbalance_ratio: float = DEFAULT_IMBALANCE_RATIO) -> dict:
+    """
+    layers: [{'name', 'meshes': [対象のメッシュパス], 'matte_meshes': [PV OFFのメッシュパス], 'auto_matte': bool}]
+    auto_matte のレイヤーは対象以外の stats の全メッシュをマットとして数えます (stats にはシーンの全メッシュが必要)。
+    invisible: primaryVisibility がもともと Off のメッシュ (対象でもマットとして数える)
+    戻り値: {'layers': [{'name', 'meshes', 'mattes', 'triangles', 'effective_triangles', 'cost', 'share', 'bounds'}],
+             'total_cost', 'median_cost', 'imbalanced': [レイヤー名], 'warning': str または None}
+    """
+    index = stats.index
+    all_effective = float(stats.effective_triangles.sum() if NUMPY_AVAILABLE else sum(stats.effective_triangles))
+    rows = []
+    for layer in layers:
+        mattes = {index[p] for p in layer['matte_meshes'] if p in index}
+        targets = {index[p] for p in layer['meshes'] if p in index and p not in invisible} - mattes
+        mattes |= {index[p] for p in layer['meshes'] if p in index and p in invisible}
+        target_indexes, matte_indexes = _as_indexes(targets), _as_indexes(mattes)
+
+        effective = _sum(stats.effective_triangles, target_indexes)
+        if layer.get('auto_matte'):
+            matte_count = len(stats.paths) - len(targets)
+            matte_effective = all_effective - effective
+        else:
+            matte_count = len(mattes)
+            matte_effective = _sum(stats.effective_triangles, matte_indexes)
+        rows.append({
+            'name': layer['name'],
+            'meshes': len(targets),
+            'mattes': matte_count,
+            'triangles': int(_sum(stats.triangles, target_indexes)),
+            'effective_triangles': int(effective),
+            'cost': effective + MATTE_COST_WEIGHT * matte_effective,
+            'bounds': _union_bounds(stats.bounds, stats.has_mesh, target_indexes),
+        })
+
+    costs = [row['cost'] for row in rows]
+    total = float(sum(costs))
+    if NUMPY_AVAILABLE and costs:
+        median = float(np.median(np.asarray(costs)))
+    else:
+        ordered = sorted(costs)
+        mid = len(ordered) // 2
+        median = (ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2.0) if ordered else 0.0
+    for row in rows:
+        row['share'] = row['cost'] / total if total else 0.0
+
+    imbalanced = [row['name'] for row in rows if median > 0 and row['cost'] > median * imbalance_ratio]
+    warning = None
+    if imbalanced:
+        heaviest = max(rows, key=lambda row: row['cost'])
+        warning = (f"{len(imbalanced)} 個のレイヤーのコストが中央値の {imbalance_ratio:g} 倍を超えています "
+                   f"(最大: {heaviest['name']}, 中央値の {heaviest['cost'] / median:.1f} 倍)。")
+    return {'layers': rows, 'total_cost': total, 'median_cost': median, 'imbalanced': imbalanced, 'warning': warning}
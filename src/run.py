@@ -13,6 +13,22 @@ from maya import OpenMayaUI as omui
 
 # --- 修正箇所 ---
 # 相対インポートから絶対インポートに変更
+import profiler
+import arnold_utils
+import render_cost
+import layer_registry
+import layer_switcher
+import layer_templates
+import scene_snapshot
+import scene_scan
+import scene_search
+import selector_optimizer
+import refresh_scheduler
+import scene_pipeline
+import aov_manager
+import snapshot_cache
+import scene_tree_model
+import layer_list_model
 import view
 import model
 import controller
@@ -51,7 +67,23 @@ def run():
                 print(f"既存ウィンドウのクローズに失敗しました: {e}")
 
         # 各モジュールをリロード
+        importlib.reload(profiler)
+        importlib.reload(arnold_utils)
+        importlib.reload(render_cost)
+        importlib.reload(layer_registry)
+        importlib.reload(layer_switcher)
+        importlib.reload(layer_templates)
+        importlib.reload(scene_snapshot)
+        importlib.reload(scene_scan)
+        importlib.reload(scene_search)
+        importlib.reload(selector_optimizer)
+        importlib.reload(aov_manager)
         importlib.reload(model)
+        importlib.reload(refresh_scheduler)
+        importlib.reload(scene_pipeline)
+        importlib.reload(snapshot_cache)
+        importlib.reload(scene_tree_model)
+        importlib.reload(layer_list_model)
         importlib.reload(view)
         importlib.reload(controller)
         
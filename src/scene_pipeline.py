@@ -0,0 +1,81 @@
+# render_layer_tool/scene_pipeline.py
+# -*- coding: utf-8 -*-
+"""
+シーン階層の後処理 (ソート・カテゴリ分け・検索インデックス作成) をワーカースレッドで実行するパイプライン。
+Mayaのコマンドはメインスレッドでしか呼べないため、メインスレッドでは不変のスナップショットを取るだけにし、
+純粋なPythonの処理をワーカーに任せます。結果はQtのシグナルでメインスレッドに戻します。
+"""
+import concurrent.futures
+
+from PySide6 import QtCore
+
+
+class ScenePipeline(QtCore.QObject):
+    """
+    submit() されたスナップショットを process(snapshot) でワーカースレッドに処理させ、
+    完了したら ready(世代番号, 結果) を発行します。処理中に新しく submit() された場合、
+    古い世代の結果は発行せずに破棄します。例外が発生した場合は failed(世代番号, メッセージ) を発行します。
+    """
+    ready = QtCore.Signal(int, object)
+    failed = QtCore.Signal(int, str)
+    # ワーカースレッドからの完了通知 (キュー接続でメインスレッドに渡す)
+    _finished = QtCore.Signal(int, object, object)
+
+    def __init__(self, process, parent=None):
+        super(ScenePipeline, self).__init__(parent)
+        self._process = process
+        # 新しい処理が古い処理を追い越さないよう、ワーカーは1つにする
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="ScenePipeline")
+        self._generation = 0
+        self._future = None
+        self._finished.connect(self._on_finished, QtCore.Qt.QueuedConnection)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def is_busy(self) -> bool:
+        """最新の世代の処理が終わっていない場合に True を返します。"""
+        return self._future is not None
+
+    def submit(self, snapshot) -> int:
+        """スナップショットの処理を開始し、その世代番号を返します。"""
+        self._generation += 1
+        generation = self._generation
+        if self._future is not None:
+            # まだ開始していなければ取り消す (実行中の処理は結果を破棄する)
+            self._future.cancel()
+        future = self._executor.submit(self._process, snapshot)
+        future.add_done_callback(lambda f: self._emit_finished(generation, f))
+        self._future = future
+        return generation
+
+    def cancel(self):
+        """処理中の結果をすべて破棄します。"""
+        self._generation += 1
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _emit_finished(self, generation, future):
+        # ワーカースレッド (取り消し時は呼び出し元のスレッド) で呼ばれる
+        if future.cancelled():
+            return
+        error = future.exception()
+        try:
+            self._finished.emit(generation, None if error else future.result(), error)
+        except RuntimeError:
+            pass # ツールが閉じられ、QObject が破棄されている
+
+    def _on_finished(self, generation, result, error):
+        if generation != self._generation:
+            return # 新しい世代が投入済み
+        self._future = None
+        if error is not None:
+            self.failed.emit(generation, f"{type(error).__name__}: {error}")
+        else:
+            self.ready.emit(generation, result)
@@ -0,0 +1,154 @@
+# render_layer_tool/scene_scan.py
+# -*- coding: utf-8 -*-
+"""
+OpenMaya API 2.0 の MItDag を使ってシーン階層を一括走査するモジュール。
+ノードごとの cmds 呼び出しを避け、ノード数に依存しない回数の cmds 呼び出しで済ませる。
+"""
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+
+from scene_snapshot import SceneSnapshot, NO_NODE
+
+# 新規シーンで作成されるスタートアップカメラのトランスフォーム名
+STARTUP_CAMERA_NAMES = frozenset(('persp', 'top', 'front', 'side'))
+
+# iter_scan_snapshot で中断するまでに進めるDAGノード数 (時間の確認はこの単位で行う)
+SCAN_SLICE_NODES = 256
+
+# シェイプのノードタイプ名 -> 分類 ('geometry' / 'camera' / 'light' / 'group') のキャッシュ。
+# ノードタイプの種類数ぶんしか cmds.nodeType を呼ばないようにする。
+_TYPE_CATEGORY_CACHE = {}
+
+
+def classify_shape_type(type_name: str) -> str:
+    """シェイプのノードタイプ名からツリー上の分類を返します。"""
+    category = _TYPE_CATEGORY_CACHE.get(type_name)
+    if category is not None:
+        return category
+
+    if 'mesh' in type_name:
+        category = 'geometry'
+    else:
+        inherited = cmds.nodeType(type_name, isTypeName=True, inherited=True) or []
+        if 'camera' in inherited:
+            category = 'camera'
+        elif 'light' in inherited:
+            category = 'light'
+        else:
+            category = 'group'
+    _TYPE_CATEGORY_CACHE[type_name] = category
+    return category
+
+
+def _read_primary_visibility(fn_shape):
+    try:
+        return fn_shape.findPlug('primaryVisibility', False).asBool()
+    except RuntimeError:
+        # アトリビュートが存在しないシェイプ
+        return None
+
+
+def _is_startup_camera(obj, dag_path, name: str) -> bool:
+    """
+    ワールド直下のトランスフォームがスタートアップカメラ (persp/top/front/side) かどうかを、cmds を呼ばずに判定します。
+    スタートアップカメラは新規シーンで作成されるデフォルトノードなので、名前を変えていても判定できます。
+    """
+    if name not in STARTUP_CAMERA_NAMES and not om2.MFnDagNode(obj).isDefaultNode:
+        return False
+    for i in range(dag_path.numberOfShapesDirectlyBelow()):
+        shape_path = om2.MDagPath(dag_path)
+        shape_path.extendToShapeDirectlyBelow(i)
+        if shape_path.hasFn(om2.MFn.kCamera):
+            return True
+    return False
+
+
+def scan_snapshot(root_path: str = None) -> SceneSnapshot:
+    """
+    DAGを1回だけ走査し、配列ベースの SceneSnapshot を返します。スタートアップカメラは走査中に除外します。
+    root_path を指定した場合はそのノード以下のみを走査し、root_path をルートとするスナップショットを返します。
+    """
+    for snapshot in iter_scan_snapshot(root_path, slice_nodes=0):
+        pass
+    return snapshot
+
+
+def iter_scan_snapshot(root_path: str = None, slice_nodes: int = SCAN_SLICE_NODES):
+    """
+    scan_snapshot の走査を slice_nodes ノードごとに中断できるジェネレーター。途中では None を、
+    最後に完成した SceneSnapshot を yield します (slice_nodes=0 なら途中で中断しない)。
+    メインスレッドで少しずつ進める場合、中断している間にDAGが変更されたら走査を破棄してください
+    (変更後の MItDag は使えない)。
+    """
+    iterator = om2.MItDag(om2.MItDag.kDepthFirst, om2.MFn.kInvalid)
+    if root_path:
+        sel = om2.MSelectionList()
+        try:
+            sel.add(root_path)
+        except RuntimeError:
+            yield SceneSnapshot()
+            return
+        iterator.reset(sel.getDagPath(0), om2.MItDag.kDepthFirst, om2.MFn.kInvalid)
+        snapshot = SceneSnapshot(root_path.rpartition('|')[0])
+    else:
+        snapshot = SceneSnapshot()
+
+    # 深さ優先なので、現在のノードの祖先トランスフォームだけを (フルパス, 番号) のスタックで保持すれば足りる
+    ancestors = []
+    classified = set()
+    visited = 0
+
+    while not iterator.isDone():
+        if slice_nodes:
+            visited += 1
+            if visited >= slice_nodes:
+                visited = 0
+                yield None
+
+        obj = iterator.currentItem()
+        is_transform = obj.hasFn(om2.MFn.kTransform)
+        if not is_transform and not obj.hasFn(om2.MFn.kShape):
+            iterator.next()
+            continue
+
+        full_path = iterator.fullPathName()
+        while ancestors and not full_path.startswith(ancestors[-1][0] + '|'):
+            ancestors.pop()
+        parent_path, _, name = full_path.rpartition('|')
+        parent = ancestors[-1][1] if ancestors and ancestors[-1][0] == parent_path else None
+
+        if is_transform:
+            if parent is None and not (full_path == root_path or (not root_path and not parent_path)):
+                # アンダーワールドなど、親がトランスフォームとして見つからないノードは対象外
+                iterator.prune()
+                iterator.next()
+                continue
+            if not parent_path and _is_startup_camera(obj, iterator.getPath(), name):
+                iterator.prune()
+                iterator.next()
+                continue
+            index = snapshot.add_node(NO_NODE if parent is None else parent, name)
+            ancestors.append((full_path, index))
+
+        elif parent is not None and parent not in classified:
+            # 最初の非中間シェイプのみで分類する (listRelatives(shapes=True)[0] と同等)
+            fn_shape = om2.MFnDagNode(iterator.getPath())
+            if not fn_shape.isIntermediateObject:
+                classified.add(parent)
+                category = classify_shape_type(fn_shape.typeName)
+                snapshot.set_type(parent, category)
+                snapshot.set_has_shape(parent, True)
+                if category == 'geometry':
+                    snapshot.set_primary_visibility(parent, _read_primary_visibility(fn_shape))
+
+        iterator.next()
+
+    yield snapshot
+
+
+def scan_scene(root_path: str = None) -> dict:
+    """
+    DAGを1回だけ走査し、get_scene_hierarchy と同じ形式の階層辞書を返します。
+    root_path を指定した場合はそのノード以下のみを走査し、{root_path: node_info} を返します。
+    """
+    return scan_snapshot(root_path).to_hierarchy()
@@ -0,0 +1,113 @@
+# render_layer_tool/scene_search.py
+# -*- coding: utf-8 -*-
+"""
+シーン階層スナップショットに対する検索インデックス。
+部分一致・グロブ・正規表現・ネームスペース/パス指定のパターンに対応し、ネストしたノードも検索する。
+"""
+import re
+
+from selector_optimizer import compile_name_pattern
+
+REGEX_PREFIX = "re:"
+
+
+class SceneSearchIndex:
+    """
+    階層辞書から正規化済みの名前一覧を一度だけ作成し、検索に使い回します。
+
+    クエリの種類:
+      - "re:<pattern>"           正規表現 (大文字小文字を区別しない)
+      - "*" "?" "[" を含む       グロブ (名前全体に一致)
+      - それ以外                 部分一致
+    ":" を含むクエリはネームスペース付きの名前、"|" を含むクエリはフルパスに対して照合します。
+    グロブは Maya の ls と同様に ":" と "|" をまたがないため、"*body" は "chr:body" に一致しません
+    (ネームスペース付きのノードは "*:body" のように指定します)。
+    """
+    def __init__(self, hierarchy: dict):
+        paths = []
+        stack = [hierarchy]
+        while stack:
+            for path, node_info in stack.pop().items():
+                paths.append(path)
+                if node_info['children']:
+                    stack.append(node_info['children'])
+        self._set_paths(paths)
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "SceneSearchIndex":
+        """SceneSnapshot から作成します。アダプターを介さずにパスを組み立てるので、階層辞書から作るより速い。"""
+        index = cls.__new__(cls)
+        index._set_paths([path for _, path in snapshot.iter_paths()])
+        return index
+
+    def _set_paths(self, paths: list):
+        self._paths = paths
+        # ネームスペースを含む短い名前 (小文字)
+        self._names = [path.rpartition('|')[2].lower() for path in paths]
+        self._lower_paths = None
+
+        # 直前の部分一致検索の結果 (クエリが伸びた場合はこの中だけを再検索する)
+        self._last_key = None
+        self._last_matches = None
+
+    def __len__(self):
+        return len(self._paths)
+
+    def _targets_for(self, query):
+        if '|' in query:
+            if self._lower_paths is None:
+                self._lower_paths = [path.lower() for path in self._paths]
+            return 'path', self._lower_paths
+        return 'name', self._names
+
+    def match(self, query: str, substring: bool = True) -> list:
+        """
+        クエリに一致したノードのフルパスを返します。正規表現が不正な場合は ValueError を送出します。
+        substring=False の場合、ワイルドカードを含まないクエリは部分一致ではなく名前全体の一致になります。
+        """
+        query = query.strip()
+        if not query:
+            return list(self._paths)
+
+        if query.startswith(REGEX_PREFIX):
+            try:
+                pattern = re.compile(query[len(REGEX_PREFIX):], re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"正規表現が不正です: {e}")
+            _, targets = self._targets_for(query[len(REGEX_PREFIX):])
+            matches = [i for i, text in enumerate(targets) if pattern.search(text)]
+            self._last_key = None
+
+        elif not substring or any(ch in query for ch in '*?['):
+            pattern = compile_name_pattern(query.lower())
+            _, targets = self._targets_for(query)
+            matches = [i for i, text in enumerate(targets) if pattern.match(text)]
+            self._last_key = None
+
+        else:
+            needle = query.lower()
+            target_kind, targets = self._targets_for(query)
+            # 前回の部分一致を含むクエリなら、前回の一致結果だけを絞り込めばよい
+            if self._last_key and self._last_key[0] == target_kind and self._last_key[1] in needle:
+                candidates = self._last_matches
+            else:
+                candidates = range(len(targets))
+            matches = [i for i in candidates if needle in targets[i]]
+            self._last_key = (target_kind, needle)
+            self._last_matches = matches
+
+        return [self._paths[i] for i in matches]
+
+    def visible_paths(self, query: str):
+        """
+        一致したノードとその祖先ノードのフルパス集合を返します。
+        クエリが空の場合はフィルターなしを表す None を返します。
+        """
+        if not query.strip():
+            return None
+        visible = set()
+        for path in self.match(query):
+            while path and path not in visible:
+                visible.add(path)
+                path = path.rpartition('|')[0]
+        return visible
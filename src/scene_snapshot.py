@@ -0,0 +1,488 @@
+# render_layer_tool/scene_snapshot.py
+# -*- coding: utf-8 -*-
+"""
+シーン階層を配列で保持するコンパクトなスナップショット。
+ノードごとの辞書やフルパス文字列を持たず、親/最初の子/兄弟の番号と、共有した短縮名の番号、
+タイプコード、primaryVisibility とシェイプの有無のビット列だけを保持します。フルパスは必要な時に組み立てます。
+タイプが 'group' でもシェイプを持つノード (スタンドイン・カーブなど) があるため、シェイプの有無は別に持ちます。
+
+ツールの Model はこのスナップショットをシーン階層として保持し、DAGの変更 (追加/削除/リネーム/タイプの変化) は
+その場で書き換えます。従来の階層辞書 ({フルパス: {'type', 'primaryVisibility', 'hasShape', 'children'}}) を読むコード
+(ツリーモデル・検索インデックス・セレクター最適化) には as_hierarchy() が返す読み取り専用のアダプターを渡します。
+アダプターはパスを持たずに番号だけを参照するので、書き換えた内容がそのまま見えます。
+"""
+from array import array
+from collections.abc import Mapping
+
+NO_NODE = -1
+
+TYPE_CODES = {'group': 0, 'geometry': 1, 'camera': 2, 'light': 3}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+# 子の索引のキー: (親の番号 + 1) << _LOOKUP_SHIFT | 短縮名の番号
+_LOOKUP_SHIFT = 32
+
+
+class SceneSnapshot:
+    """
+    配列ベースのシーン階層。ノードは追加順の番号で参照し、親は必ず子より前に追加します。
+    兄弟の順序は追加順です (sort_children で並べ替えられます)。
+    削除したノードの番号は再利用せず、兄弟のリンクから外すだけなので、他のノードの番号は変わりません。
+    """
+    def __init__(self, base_path: str = ""):
+        # ルートノードの親のパス ("" はワールド)。部分走査の結果でもフルパスを組み立てられるようにする
+        self.base_path = base_path
+        self.parents = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.prev_sibling = array('i')
+        self.name_ids = array('i')
+        self.types = array('b')
+        # primaryVisibility は「値を持つか」と「値」の2つのビット列で表す
+        self._pv_known = bytearray()
+        self._pv_value = bytearray()
+        self._shape_bits = bytearray()
+        self.names = []
+        self._name_index = {}
+        # 兄弟を末尾へ O(1) で追加するための最後の子
+        self._last_child = array('i')
+        self._first_root = NO_NODE
+        self._last_root = NO_NODE
+        self._removed = 0
+        # (親, 短縮名) -> 番号 の索引。パスからの検索で初めて作成し、以後は書き換えに合わせて更新する
+        self._child_lookup = None
+
+    def __len__(self):
+        """削除されていないノードの数。"""
+        return len(self.parents) - self._removed
+
+    # --- 構築 ---
+
+    def _intern(self, name: str) -> int:
+        name_id = self._name_index.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.names.append(name)
+            self._name_index[name] = name_id
+        return name_id
+
+    def add_node(self, parent: int, name: str, node_type: str = 'group', primary_visibility=None,
+                 has_shape: bool = None) -> int:
+        """
+        短縮名 name のノードを parent (ルートは NO_NODE) の最後の子として追加し、番号を返します。
+        has_shape を省略した場合は 'group' 以外のタイプのノードだけをシェイプを持つノードとします。
+        """
+        index = len(self.parents)
+        name_id = self._intern(name)
+        self.parents.append(parent)
+        self.first_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        self.prev_sibling.append(NO_NODE)
+        self._last_child.append(NO_NODE)
+        self.name_ids.append(name_id)
+        self.types.append(TYPE_CODES.get(node_type, 0))
+        if index % 8 == 0:
+            self._pv_known.append(0)
+            self._pv_value.append(0)
+            self._shape_bits.append(0)
+        self.set_primary_visibility(index, primary_visibility)
+        self.set_has_shape(index, node_type != 'group' if has_shape is None else has_shape)
+        self._link_last(parent, index)
+        if self._child_lookup is not None:
+            self._child_lookup[(parent + 1) << _LOOKUP_SHIFT | name_id] = index
+        return index
+
+    def _link_last(self, parent: int, index: int):
+        if parent == NO_NODE:
+            previous = self._last_root
+            if previous == NO_NODE:
+                self._first_root = index
+            self._last_root = index
+        else:
+            previous = self._last_child[parent]
+            if previous == NO_NODE:
+                self.first_child[parent] = index
+            self._last_child[parent] = index
+        self.prev_sibling[index] = previous
+        self.next_sibling[index] = NO_NODE
+        if previous != NO_NODE:
+            self.next_sibling[previous] = index
+
+    def set_type(self, index: int, node_type: str):
+        self.types[index] = TYPE_CODES.get(node_type, 0)
+
+    def set_primary_visibility(self, index: int, value):
+        byte, mask = index >> 3, 1 << (index & 7)
+        if value is None:
+            self._pv_known[byte] &= ~mask & 0xFF
+            self._pv_value[byte] &= ~mask & 0xFF
+            return
+        self._pv_known[byte] |= mask
+        if value:
+            self._pv_value[byte] |= mask
+        else:
+            self._pv_value[byte] &= ~mask & 0xFF
+
+    def set_has_shape(self, index: int, value: bool):
+        byte, mask = index >> 3, 1 << (index & 7)
+        if value:
+            self._shape_bits[byte] |= mask
+        else:
+            self._shape_bits[byte] &= ~mask & 0xFF
+
+    # --- 書き換え ---
+
+    def remove_subtree(self, index: int):
+        """ノードとその子孫を階層から外します。"""
+        parent = self.parents[index]
+        previous, following = self.prev_sibling[index], self.next_sibling[index]
+        if previous != NO_NODE:
+            self.next_sibling[previous] = following
+        elif parent == NO_NODE:
+            self._first_root = following
+        else:
+            self.first_child[parent] = following
+        if following != NO_NODE:
+            self.prev_sibling[following] = previous
+        elif parent == NO_NODE:
+            self._last_root = previous
+        else:
+            self._last_child[parent] = previous
+        self.prev_sibling[index] = self.next_sibling[index] = NO_NODE
+
+        removed = list(self.walk(index))
+        self._removed += len(removed)
+        if self._child_lookup is not None:
+            lookup = self._child_lookup
+            for node in removed:
+                key = (self.parents[node] + 1) << _LOOKUP_SHIFT | self.name_ids[node]
+                if lookup.get(key) == node:
+                    del lookup[key]
+
+    def rename(self, index: int, name: str):
+        """ノードの短縮名を変更します。子孫のパスは親をたどって組み立てるため、書き換えは不要です。"""
+        name_id = self._intern(name)
+        if self._child_lookup is not None:
+            prefix = (self.parents[index] + 1) << _LOOKUP_SHIFT
+            if self._child_lookup.get(prefix | self.name_ids[index]) == index:
+                del self._child_lookup[prefix | self.name_ids[index]]
+            self._child_lookup[prefix | name_id] = index
+        self.name_ids[index] = name_id
+
+    def copy_subtree(self, parent: int, source: "SceneSnapshot", source_index: int) -> int:
+        """source の source_index 以下を parent の最後の子として複製し、複製したノードの番号を返します。"""
+        mapping = {}
+        for node in source.walk(source_index):
+            node_parent = parent if node == source_index else mapping[source.parents[node]]
+            mapping[node] = self.add_node(node_parent, source.name(node), source.node_type(node),
+                                          source.primary_visibility(node), source.has_shape(node))
+        return mapping[source_index]
+
+    def sort_children(self, key=None):
+        """各階層の兄弟を key(短縮名) の順に並べ替えます (既定は大文字小文字を区別しない名前順)。"""
+        key = key or str.lower
+        names, name_ids = self.names, self.name_ids
+        # 短縮名は共有しているので、キーは名前ごとに1回だけ計算する
+        sort_keys = [key(name) for name in names]
+        parents = [NO_NODE]
+        parents.extend(index for index in self.walk() if self.first_child[index] != NO_NODE)
+        for parent in parents:
+            children = list(self.roots() if parent == NO_NODE else self.children(parent))
+            if len(children) < 2:
+                continue
+            ordered = sorted(children, key=lambda index: sort_keys[name_ids[index]])
+            if ordered == children:
+                continue
+            if parent == NO_NODE:
+                self._first_root = self._last_root = NO_NODE
+            else:
+                self.first_child[parent] = self._last_child[parent] = NO_NODE
+            for index in ordered:
+                self._link_last(parent, index)
+
+    # --- 参照 ---
+
+    def name(self, index: int) -> str:
+        return self.names[self.name_ids[index]]
+
+    def node_type(self, index: int) -> str:
+        return TYPE_NAMES.get(self.types[index], 'group')
+
+    def primary_visibility(self, index: int):
+        byte, mask = index >> 3, 1 << (index & 7)
+        if not self._pv_known[byte] & mask:
+            return None
+        return bool(self._pv_value[byte] & mask)
+
+    def has_shape(self, index: int) -> bool:
+        """ノードが (中間オブジェクトでない) シェイプを持つかどうか。"""
+        return bool(self._shape_bits[index >> 3] & 1 << (index & 7))
+
+    def roots(self):
+        return self._siblings_from(self._first_root)
+
+    def children(self, index: int):
+        if index == NO_NODE:
+            return self.roots()
+        return self._siblings_from(self.first_child[index])
+
+    def _siblings_from(self, index: int):
+        next_sibling = self.next_sibling
+        while index != NO_NODE:
+            yield index
+            index = next_sibling[index]
+
+    def walk(self, index: int = NO_NODE):
+        """index (省略時はすべてのルート) 以下のノードを、親が子より先になる深さ優先の順で返します。"""
+        first_child, next_sibling = self.first_child, self.next_sibling
+        if index == NO_NODE:
+            stack = list(self.roots())
+            stack.reverse()
+        else:
+            stack = [index]
+        while stack:
+            current = stack.pop()
+            yield current
+            child = first_child[current]
+            if child != NO_NODE:
+                # 兄弟の順序で取り出せるよう、逆順に積む
+                start = len(stack)
+                while child != NO_NODE:
+                    stack.append(child)
+                    child = next_sibling[child]
+                stack[start:] = stack[start:][::-1]
+
+    def path(self, index: int) -> str:
+        """ノードのフルパスを親をたどって組み立てます。"""
+        if index == NO_NODE:
+            return self.base_path
+        parts = []
+        while index != NO_NODE:
+            parts.append(self.names[self.name_ids[index]])
+            index = self.parents[index]
+        parts.append(self.base_path)
+        return '|'.join(reversed(parts))
+
+    def iter_paths(self, index: int = NO_NODE):
+        """walk() と同じ順序で (番号, フルパス) を返します。親のパスを使い回すので path() を繰り返すより速い。"""
+        names, name_ids, first_child, next_sibling = self.names, self.name_ids, self.first_child, self.next_sibling
+        if index == NO_NODE:
+            prefix = self.base_path + '|'
+            stack = [(node, prefix) for node in self.roots()]
+        else:
+            stack = [(index, self.path(self.parents[index]) + '|')]
+        stack.reverse()
+        while stack:
+            node, prefix = stack.pop()
+            path = prefix + names[name_ids[node]]
+            yield node, path
+            child = first_child[node]
+            if child != NO_NODE:
+                start = len(stack)
+                path += '|'
+                while child != NO_NODE:
+                    stack.append((child, path))
+                    child = next_sibling[child]
+                stack[start:] = stack[start:][::-1]
+
+    def _build_child_lookup(self):
+        lookup = {}
+        parents, name_ids = self.parents, self.name_ids
+        for index in self.walk():
+            lookup[(parents[index] + 1) << _LOOKUP_SHIFT | name_ids[index]] = index
+        self._child_lookup = lookup
+
+    def child_named(self, parent: int, name: str) -> int:
+        """parent (ルートは NO_NODE) の子のうち短縮名が name のノードの番号を返します。なければ NO_NODE。"""
+        name_id = self._name_index.get(name)
+        if name_id is None:
+            return NO_NODE
+        if self._child_lookup is None:
+            self._build_child_lookup()
+        return self._child_lookup.get((parent + 1) << _LOOKUP_SHIFT | name_id, NO_NODE)
+
+    def index_of(self, path: str) -> int:
+        """フルパスからノード番号を返します。見つからない場合は NO_NODE を返します。"""
+        if self.base_path:
+            if not path.startswith(self.base_path + '|'):
+                return NO_NODE
+            path = path[len(self.base_path):]
+        if not path.startswith('|'):
+            return NO_NODE
+        if self._child_lookup is None:
+            self._build_child_lookup()
+        lookup, name_index = self._child_lookup, self._name_index
+        index = NO_NODE
+        for name in path[1:].split('|'):
+            name_id = name_index.get(name)
+            if name_id is None:
+                return NO_NODE
+            index = lookup.get((index + 1) << _LOOKUP_SHIFT | name_id, NO_NODE)
+            if index == NO_NODE:
+                return NO_NODE
+        return index
+
+    def __contains__(self, path) -> bool:
+        return self.index_of(path) != NO_NODE
+
+    # --- 階層辞書との変換 ---
+
+    @classmethod
+    def from_hierarchy(cls, hierarchy: dict, base_path: str = "") -> "SceneSnapshot":
+        snapshot = cls(base_path)
+        stack = [(NO_NODE, path, info) for path, info in reversed(list(hierarchy.items()))]
+        while stack:
+            parent, path, info = stack.pop()
+            index = snapshot.add_node(parent, path.rpartition('|')[2], info['type'], info['primaryVisibility'],
+                                      info.get('hasShape'))
+            # 子を元の順序で取り出せるよう逆順に積む
+            stack.extend((index, child_path, child_info)
+                         for child_path, child_info in reversed(list(info['children'].items())))
+        return snapshot
+
+    # --- 配列のまま保存/復元する ---
+
+    def compacted(self) -> "SceneSnapshot":
+        """削除済みのノードを含まないスナップショットを返します (削除がなければ自身を返す)。"""
+        if not self._removed:
+            return self
+        compact = SceneSnapshot(self.base_path)
+        mapping = {NO_NODE: NO_NODE}
+        for index in self.walk():
+            mapping[index] = compact.add_node(mapping[self.parents[index]], self.name(index), self.node_type(index),
+                                              self.primary_visibility(index), self.has_shape(index))
+        return compact
+
+    def columns(self) -> dict:
+        """from_columns で復元できる、スナップショットを構成する配列の辞書を返します (コピーはしない)。"""
+        return {
+            'parents': self.parents, 'first_child': self.first_child, 'next_sibling': self.next_sibling,
+            'prev_sibling': self.prev_sibling, 'last_child': self._last_child, 'name_ids': self.name_ids,
+            'types': self.types, 'pv_known': self._pv_known, 'pv_value': self._pv_value,
+            'shape_bits': self._shape_bits, 'names': self.names,
+            'first_root': self._first_root, 'last_root': self._last_root, 'removed': self._removed,
+        }
+
+    @classmethod
+    def from_columns(cls, columns: dict, base_path: str = "") -> "SceneSnapshot":
+        """columns() の配列からスナップショットを作成します。配列はそのまま使うので、呼び出し側で共有しないでください。"""
+        snapshot = cls(base_path)
+        snapshot.parents = columns['parents']
+        snapshot.first_child = columns['first_child']
+        snapshot.next_sibling = columns['next_sibling']
+        snapshot.prev_sibling = columns['prev_sibling']
+        snapshot._last_child = columns['last_child']
+        snapshot.name_ids = columns['name_ids']
+        snapshot.types = columns['types']
+        snapshot._pv_known = columns['pv_known']
+        snapshot._pv_value = columns['pv_value']
+        snapshot._shape_bits = columns['shape_bits']
+        snapshot.names = columns['names']
+        snapshot._name_index = dict(zip(snapshot.names, range(len(snapshot.names))))
+        snapshot._first_root = columns['first_root']
+        snapshot._last_root = columns['last_root']
+        snapshot._removed = columns.get('removed', 0)
+        return snapshot
+
+    def to_hierarchy(self) -> dict:
+        """従来形式の (変更可能な) 階層辞書を作成します。"""
+        hierarchy = {}
+        paths = {}
+        infos = {}
+        names, name_ids, parents = self.names, self.name_ids, self.parents
+        root_prefix = self.base_path + '|'
+        # walk() は親を子より先に、兄弟を現在の順序で返すので、1回たどれば同じ順序の辞書になる
+        for index in self.walk():
+            info = {'type': self.node_type(index),
+                    'primaryVisibility': self.primary_visibility(index),
+                    'hasShape': self.has_shape(index),
+                    'children': {}}
+            parent = parents[index]
+            if parent == NO_NODE:
+                path = root_prefix + names[name_ids[index]]
+                hierarchy[path] = info
+            else:
+                path = paths[parent] + '|' + names[name_ids[index]]
+                infos[parent]['children'][path] = info
+            paths[index] = path
+            infos[index] = info
+        return hierarchy
+
+    def as_hierarchy(self) -> "HierarchyView":
+        """ルートノードを {フルパス: NodeView} として見せる読み取り専用のアダプターを返します。"""
+        return HierarchyView(self, NO_NODE)
+
+
+class HierarchyView(Mapping):
+    """ある親ノードの子を {フルパス: NodeView} として見せる読み取り専用のアダプター。"""
+    __slots__ = ('_snapshot', '_parent')
+
+    def __init__(self, snapshot: SceneSnapshot, parent: int):
+        self._snapshot = snapshot
+        self._parent = parent
+
+    def _prefix(self) -> str:
+        # 親のリネーム後も正しいパスになるよう、パスは参照のたびに組み立てる
+        return self._snapshot.path(self._parent) + '|'
+
+    def __iter__(self):
+        prefix = self._prefix()
+        snapshot = self._snapshot
+        for index in snapshot.children(self._parent):
+            yield prefix + snapshot.name(index)
+
+    def __len__(self):
+        return sum(1 for _ in self._snapshot.children(self._parent))
+
+    def __bool__(self):
+        return next(iter(self._snapshot.children(self._parent)), NO_NODE) != NO_NODE
+
+    def _index_of(self, path) -> int:
+        if not isinstance(path, str):
+            return NO_NODE
+        parent_path, _, name = path.rpartition('|')
+        if parent_path + '|' != self._prefix():
+            return NO_NODE
+        return self._snapshot.child_named(self._parent, name)
+
+    def __contains__(self, path) -> bool:
+        return self._index_of(path) != NO_NODE
+
+    def __getitem__(self, path):
+        index = self._index_of(path)
+        if index == NO_NODE:
+            raise KeyError(path)
+        return NodeView(self._snapshot, index)
+
+    def items(self):
+        prefix = self._prefix()
+        snapshot = self._snapshot
+        return [(prefix + snapshot.name(index), NodeView(snapshot, index))
+                for index in snapshot.children(self._parent)]
+
+
+class NodeView(Mapping):
+    """1ノードを {'type', 'primaryVisibility', 'hasShape', 'children'} として見せる読み取り専用のアダプター。"""
+    __slots__ = ('_snapshot', 'index')
+    _KEYS = ('type', 'primaryVisibility', 'hasShape', 'children')
+
+    def __init__(self, snapshot: SceneSnapshot, index: int):
+        self._snapshot = snapshot
+        self.index = index
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def __getitem__(self, key):
+        if key == 'type':
+            return self._snapshot.node_type(self.index)
+        if key == 'primaryVisibility':
+            return self._snapshot.primary_visibility(self.index)
+        if key == 'hasShape':
+            return self._snapshot.has_shape(self.index)
+        if key == 'children':
+            return HierarchyView(self._snapshot, self.index)
+        raise KeyError(key)
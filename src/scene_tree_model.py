@@ -0,0 +1,512 @@
+# render_layer_tool/scene_tree_model.py
+# -*- coding: utf-8 -*-
+"""
+シーン階層ツリー用の遅延取得型 QAbstractItemModel。
+ノードはID (int) で管理するコンパクトなストアに保持し、子ノードは展開時にのみ生成・ソートする。
+子が多いノードは先頭 (画面に見える範囲) だけをすぐに挿入し、残りはタイマーで時間を区切って少しずつ挿入する。
+"""
+import time
+
+from PySide6 import QtCore, QtGui
+
+# カテゴリキー -> 表示名 (表示順)
+CATEGORY_MAP = {
+    "geometry": "オブジェクト",
+    "lights": "ライト",
+    "cameras": "カメラ",
+    "groups": "グループ",
+    "other": "その他"
+}
+
+_ROOT_ID = 0
+
+# 子の数がこれを超える場合は分割して挿入する
+INCREMENTAL_FETCH_THRESHOLD = 2000
+# 1回の挿入 (beginInsertRows) で追加する行数
+FETCH_CHUNK_SIZE = 256
+# タイマー1回あたりに挿入処理に使う時間 (秒)
+FETCH_TIME_BUDGET = 0.008
+
+
+def _sort_key(item):
+    return item[0].rpartition('|')[2].lower()
+
+
+class SceneTreeModel(QtCore.QAbstractItemModel):
+    """
+    カテゴリヘッダーをトップレベルに持つシーン階層モデル。
+    Model のスナップショットを見せる node_info ({'type', 'primaryVisibility', 'children'}; scene_snapshot.NodeView) を
+    そのまま遅延取得元として参照します。
+    分割挿入中は population_progress(挿入済み行数, 全行数) を通知します。
+    """
+    population_progress = QtCore.Signal(int, int)
+
+    def __init__(self, icons, parent=None):
+        super(SceneTreeModel, self).__init__(parent)
+        self._fetch_timer = QtCore.QTimer(self)
+        self._fetch_timer.setSingleShot(True)
+        self._fetch_timer.setInterval(0)
+        self._fetch_timer.timeout.connect(self._on_fetch_tick)
+        self._icons = icons
+        self._header_font = QtGui.QFont()
+        self._header_font.setBold(True)
+        # カテゴリキー -> ルートノード辞書 (フィルターで非表示のカテゴリも保持する)
+        self._category_sources = {}
+        # 検索フィルター中に表示するパスの集合 (None はフィルターなし) と、その親パスの集合
+        self._visible = None
+        self._visible_parents = set()
+        self._clear_store()
+
+    # --- ノードストア ---
+
+    def _clear_store(self):
+        # ID 0 は非表示ルート。各属性はIDをインデックスとする並列リスト
+        self._path = [None]       # フルDAGパス (カテゴリヘッダーは None)
+        self._name = ['']         # 表示名
+        self._type = [None]       # ノードタイプ (ヘッダーはカテゴリキー)
+        self._parent = [-1]       # 親ID
+        self._row = [0]           # 親内での行番号
+        self._children = [[]]     # 子IDのリスト (未取得は None)
+        self._source = [None]     # 子ノードの取得元 {path: node_info} (HierarchyView)
+        self._free_ids = []
+        self._path_ids = {}
+        self._category_ids = {}
+        # 分割挿入中のノード: ノードID -> [ソート済みの (path, node_info) リスト, 挿入済みの数]
+        # ストアを作り直すと破棄され、進行中の挿入は取り消される
+        self._pending = {}
+        self._pending_total = 0
+        self._pending_done = 0
+        self._fetch_timer.stop()
+
+    def _alloc(self, parent_id, row, path, name, node_type, source):
+        if self._free_ids:
+            node_id = self._free_ids.pop()
+            self._path[node_id] = path
+            self._name[node_id] = name
+            self._type[node_id] = node_type
+            self._parent[node_id] = parent_id
+            self._row[node_id] = row
+            self._children[node_id] = None
+            self._source[node_id] = source
+        else:
+            node_id = len(self._path)
+            self._path.append(path)
+            self._name.append(name)
+            self._type.append(node_type)
+            self._parent.append(parent_id)
+            self._row.append(row)
+            self._children.append(None)
+            self._source.append(source)
+        if path is not None:
+            self._path_ids[path] = node_id
+        return node_id
+
+    def _release_subtree(self, node_id):
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            if self._path[current] is not None:
+                self._path_ids.pop(self._path[current], None)
+            if self._children[current]:
+                stack.extend(self._children[current])
+            self._path[current] = None
+            self._children[current] = None
+            self._source[current] = None
+            self._free_ids.append(current)
+
+    def _renumber(self, parent_id, start=0):
+        children = self._children[parent_id]
+        for row in range(start, len(children)):
+            self._row[children[row]] = row
+
+    def _index_for_id(self, node_id):
+        if node_id == _ROOT_ID:
+            return QtCore.QModelIndex()
+        return self.createIndex(self._row[node_id], 0, node_id)
+
+    @staticmethod
+    def _id_of(index):
+        return index.internalId() if index.isValid() else _ROOT_ID
+
+    def _sorted_row(self, parent_id, name, exclude_id=None):
+        key = name.lower()
+        children = [c for c in self._children[parent_id] if c != exclude_id]
+        lo, hi = 0, len(children)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name[children[mid]].lower() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    # --- 構築 ---
+
+    def reset_hierarchy(self, categorized_data: dict):
+        """カテゴリ分けされた階層でモデルを作り直します。子ノードは展開時に生成されます。"""
+        self._category_sources = {
+            key: dict(root_nodes) for key, root_nodes in categorized_data.items() if root_nodes}
+        self._rebuild_categories()
+
+    def set_visible_paths(self, visible_paths):
+        """
+        検索フィルターを設定します。visible_paths に含まれるノードのみ表示し、None で解除します。
+        祖先ノードは呼び出し側で visible_paths に含めてください。
+        """
+        self._visible = visible_paths
+        self._visible_parents = (
+            {path.rpartition('|')[0] for path in visible_paths} if visible_paths is not None else set())
+        self._rebuild_categories()
+
+    def is_filtered(self) -> bool:
+        return self._visible is not None
+
+    def _passes_filter(self, path):
+        return self._visible is None or path in self._visible
+
+    def _rebuild_categories(self):
+        self.beginResetModel()
+        self._clear_store()
+        for key in CATEGORY_MAP:
+            source = self._category_sources.get(key)
+            # データがあるカテゴリのみ表示
+            if source and (self._visible is None or any(path in self._visible for path in source)):
+                self._create_category(key, source, notify=False)
+        self.endResetModel()
+
+    def _create_category(self, key, source, notify=True):
+        order = list(CATEGORY_MAP)
+        row = sum(1 for k in self._category_ids if order.index(k) < order.index(key))
+        if notify:
+            self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        header_id = self._alloc(_ROOT_ID, row, None, CATEGORY_MAP.get(key, key), key, source)
+        self._children[_ROOT_ID].insert(row, header_id)
+        self._renumber(_ROOT_ID, row)
+        self._category_ids[key] = header_id
+        if notify:
+            self.endInsertRows()
+        return header_id
+
+    def category_indexes(self):
+        return [self._index_for_id(header_id) for header_id in self._children[_ROOT_ID]]
+
+    # --- QAbstractItemModel ---
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        children = self._children[self._id_of(parent)]
+        if column != 0 or not children or not 0 <= row < len(children):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column, children[row])
+
+    def parent(self, index=None):
+        if index is None:
+            return super(SceneTreeModel, self).parent()
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        return self._index_for_id(self._parent[index.internalId()])
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        children = self._children[self._id_of(parent)]
+        return len(children) if children else 0
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        node_id = self._id_of(parent)
+        children = self._children[node_id]
+        if children is not None:
+            return bool(children)
+        return self._has_source_children(node_id)
+
+    def _has_source_children(self, node_id):
+        if not self._source[node_id]:
+            return False
+        if self._visible is None or self._parent[node_id] == _ROOT_ID:
+            return True
+        return self._path[node_id] in self._visible_parents
+
+    def canFetchMore(self, parent):
+        node_id = self._id_of(parent)
+        if node_id in self._pending:
+            return True
+        return self._children[node_id] is None and self._has_source_children(node_id)
+
+    def fetchMore(self, parent):
+        node_id = self._id_of(parent)
+        if node_id in self._pending:
+            # スクロールで末尾に達した場合などはタイマーを待たずに次を挿入する
+            self._fetch_pending_chunk(node_id)
+            self._emit_progress()
+            return
+        if self._children[node_id] is not None:
+            return
+        items = self._source[node_id].items()
+        if self._visible is not None:
+            items = [item for item in items if item[0] in self._visible]
+        items = sorted(items, key=_sort_key)
+        self._children[node_id] = []
+        if not items:
+            return
+        if len(items) <= INCREMENTAL_FETCH_THRESHOLD:
+            self._append_children(node_id, items)
+            return
+
+        self._pending[node_id] = [items, 0]
+        self._pending_total += len(items)
+        self._fetch_pending_chunk(node_id)
+        self._emit_progress()
+        self._fetch_timer.start()
+
+    def _append_children(self, node_id, items):
+        children = self._children[node_id]
+        start = len(children)
+        self.beginInsertRows(self._index_for_id(node_id), start, start + len(items) - 1)
+        children.extend(
+            self._alloc(node_id, start + offset, path, path.rpartition('|')[2], info['type'], info['children'])
+            for offset, (path, info) in enumerate(items))
+        self.endInsertRows()
+
+    # --- 分割挿入 ---
+
+    def _fetch_pending_chunk(self, node_id, count=FETCH_CHUNK_SIZE):
+        items, done = self._pending[node_id]
+        chunk = items[done:done + count]
+        if chunk:
+            self._append_children(node_id, chunk)
+        done += len(chunk)
+        self._pending_done += len(chunk)
+        if done >= len(items):
+            del self._pending[node_id]
+        else:
+            self._pending[node_id][1] = done
+
+    def _complete_pending(self, node_id=None):
+        """分割挿入中の残りをすぐに挿入します。node_id を省略した場合はすべてのノードが対象です。"""
+        node_ids = list(self._pending) if node_id is None else [node_id]
+        for pending_id in node_ids:
+            if pending_id in self._pending:
+                items, done = self._pending[pending_id]
+                self._fetch_pending_chunk(pending_id, len(items) - done)
+        self._emit_progress()
+
+    def _on_fetch_tick(self):
+        deadline = time.perf_counter() + FETCH_TIME_BUDGET
+        while self._pending and time.perf_counter() < deadline:
+            # 先に展開されたノード (カテゴリのルートなど上の階層) から順に挿入する
+            self._fetch_pending_chunk(next(iter(self._pending)))
+        self._emit_progress()
+        if self._pending:
+            self._fetch_timer.start()
+
+    def _emit_progress(self):
+        self.population_progress.emit(self._pending_done, self._pending_total)
+        if not self._pending:
+            self._pending_total = self._pending_done = 0
+
+    def is_populating(self) -> bool:
+        return bool(self._pending)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node_id = index.internalId()
+        if role == QtCore.Qt.DisplayRole:
+            return self._name[node_id]
+        if role == QtCore.Qt.UserRole:
+            return self._path[node_id]
+        is_header = self._parent[node_id] == _ROOT_ID
+        if role == QtCore.Qt.DecorationRole and not is_header:
+            icon = self._icons.get(self._type[node_id], self._icons['default'])
+            return icon if icon and not icon.isNull() else None
+        if role == QtCore.Qt.FontRole and is_header:
+            return self._header_font
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return QtCore.Qt.NoItemFlags
+        if self._parent[index.internalId()] == _ROOT_ID:
+            return QtCore.Qt.ItemIsEnabled # カテゴリヘッダーは選択不可
+        return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return "Name"
+        return None
+
+    # --- パス検索 ---
+
+    def _category_of_root(self, root_path):
+        for key, source in self._category_sources.items():
+            if root_path in source:
+                return key
+        return None
+
+    def index_for_path(self, path: str, fetch: bool = True):
+        """
+        フルDAGパスに対応するインデックスを返します。
+        fetch=True の場合、未取得の祖先ノードを展開元として取得します。
+        """
+        node_id = self._path_ids.get(path)
+        if node_id is not None:
+            return self._index_for_id(node_id)
+        if not fetch or not path:
+            return QtCore.QModelIndex()
+
+        parts = path.split('|')
+        root_path = '|' + parts[1]
+        parent_id = self._category_ids.get(self._category_of_root(root_path))
+        if parent_id is None:
+            return QtCore.QModelIndex()
+
+        prefix = ''
+        for part in parts[1:]:
+            if self._children[parent_id] is None:
+                self.fetchMore(self._index_for_id(parent_id))
+            prefix = f"{prefix}|{part}"
+            node_id = self._path_ids.get(prefix)
+            if node_id is None and parent_id in self._pending:
+                # 分割挿入でまだ挿入されていない行は、選択の同期のためにその場で挿入する
+                self._complete_pending(parent_id)
+                node_id = self._path_ids.get(prefix)
+            if node_id is None:
+                return QtCore.QModelIndex()
+            parent_id = node_id
+        return self._index_for_id(parent_id)
+
+    # --- 差分反映 ---
+
+    def apply_delta(self, ops):
+        """RenderLayerModel.apply_dag_changes の差分操作を反映します。"""
+        if ops and self._pending:
+            # 行番号と挿入待ちの一覧がずれないよう、分割挿入を先に終わらせる
+            self._complete_pending()
+        for op in ops:
+            kind = op[0]
+            if kind == 'insert':
+                _, parent_path, path, node_info, category = op
+                self._insert_node(parent_path, path, node_info, category)
+            elif kind == 'remove':
+                self._remove_node(op[1])
+            elif kind == 'update':
+                _, path, node_info, category = op
+                self._update_node(path, node_info, category)
+            elif kind == 'rename':
+                self._rename_node(op[1], op[2])
+
+    def _insert_node(self, parent_path, path, node_info, category):
+        if path in self._path_ids:
+            return
+        if not parent_path:
+            source = self._category_sources.setdefault(category, {})
+            source[path] = node_info
+            if not self._passes_filter(path):
+                return
+            header_id = self._category_ids.get(category)
+            if header_id is None:
+                self._create_category(category, source)
+                return
+            parent_id = header_id
+        else:
+            parent_id = self._path_ids.get(parent_path)
+            if parent_id is None or not self._passes_filter(path):
+                return # 親が未取得の場合は展開時に取得される
+
+        if self._children[parent_id] is None:
+            return
+        name = path.rpartition('|')[2]
+        row = self._sorted_row(parent_id, name)
+        self.beginInsertRows(self._index_for_id(parent_id), row, row)
+        node_id = self._alloc(parent_id, row, path, name, node_info['type'], node_info['children'])
+        self._children[parent_id].insert(row, node_id)
+        self._renumber(parent_id, row)
+        self.endInsertRows()
+
+    def _remove_node(self, path):
+        if '|' not in path[1:]:
+            category = self._category_of_root(path)
+            if category is not None:
+                source = self._category_sources[category]
+                source.pop(path, None)
+                if not source:
+                    del self._category_sources[category]
+
+        node_id = self._path_ids.get(path)
+        if node_id is None:
+            return
+        parent_id = self._parent[node_id]
+        row = self._row[node_id]
+        self.beginRemoveRows(self._index_for_id(parent_id), row, row)
+        del self._children[parent_id][row]
+        self._renumber(parent_id, row)
+        self._release_subtree(node_id)
+        self.endRemoveRows()
+
+        # 空になったカテゴリヘッダーは取り除く
+        if self._parent[parent_id] == _ROOT_ID and not self._children[parent_id]:
+            header_row = self._row[parent_id]
+            self.beginRemoveRows(QtCore.QModelIndex(), header_row, header_row)
+            del self._children[_ROOT_ID][header_row]
+            self._renumber(_ROOT_ID, header_row)
+            del self._category_ids[self._type[parent_id]]
+            self._release_subtree(parent_id)
+            self.endRemoveRows()
+
+    def _update_node(self, path, node_info, category):
+        # ルートノードはタイプが変わるとカテゴリを移動する
+        if '|' not in path[1:]:
+            current_category = self._category_of_root(path)
+            if current_category is not None and current_category != category:
+                self._remove_node(path)
+                self._insert_node('', path, node_info, category)
+                return
+
+        node_id = self._path_ids.get(path)
+        if node_id is None:
+            return
+        self._type[node_id] = node_info['type']
+        index = self._index_for_id(node_id)
+        self.dataChanged.emit(index, index, [QtCore.Qt.DecorationRole])
+
+    def _rename_node(self, old_path, new_path):
+        if '|' not in old_path[1:]:
+            category = self._category_of_root(old_path)
+            if category is not None:
+                source = self._category_sources[category]
+                source[new_path] = source.pop(old_path)
+
+        node_id = self._path_ids.get(old_path)
+        if node_id is None:
+            return
+
+        # 取得済みの子孫のパスを書き換える
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            current_path = self._path[current]
+            renamed = new_path + current_path[len(old_path):]
+            del self._path_ids[current_path]
+            self._path_ids[renamed] = current
+            self._path[current] = renamed
+            if self._children[current]:
+                stack.extend(self._children[current])
+
+        name = new_path.rpartition('|')[2]
+        self._name[node_id] = name
+
+        # 名前順の位置に並べ直す
+        parent_id = self._parent[node_id]
+        row = self._row[node_id]
+        new_row = self._sorted_row(parent_id, name, exclude_id=node_id)
+        if new_row != row:
+            parent_index = self._index_for_id(parent_id)
+            destination = new_row if new_row < row else new_row + 1
+            self.beginMoveRows(parent_index, row, row, parent_index, destination)
+            children = self._children[parent_id]
+            del children[row]
+            children.insert(new_row, node_id)
+            self._renumber(parent_id, min(row, new_row))
+            self.endMoveRows()
+        index = self._index_for_id(node_id)
+        self.dataChanged.emit(index, index, [QtCore.Qt.DisplayRole, QtCore.Qt.UserRole])
@@ -0,0 +1,205 @@
+# render_layer_tool/selector_optimizer.py
+# -*- coding: utf-8 -*-
+"""
+コレクションのセレクターに渡すノード集合を、同じメンバーを表す最小限のエントリへ圧縮するモジュール。
+静的選択は子階層を含むため、対象を完全に含むグループやネームスペースはまとめて1エントリにできる。
+メンバーの同値判定はノードタイプを問わずシェイプを持つすべてのノードで行い、
+スタンドイン・カーブなど分類上 'group' になるノードも対象外のノードとして数えます。
+シェイプを持たないトランスフォームはレンダリングされないため、メンバーに加わっても結果は変わりません。
+"""
+import re
+
+
+def _namespace_of(path: str) -> str:
+    return path.rpartition('|')[2].rpartition(':')[0]
+
+
+def _parent_of(path: str) -> str:
+    return path.rpartition('|')[0]
+
+
+def _set_end(pattern: str, start: int) -> int:
+    """start から始まる "[...]" の閉じ括弧の位置 (なければ -1)。先頭の "!" の直後の "]" は集合の文字として扱う (fnmatch と同じ)。"""
+    i = start
+    if pattern[i:i + 1] == '!':
+        i += 1
+    if pattern[i:i + 1] == ']':
+        i += 1
+    return pattern.find(']', i)
+
+
+def compile_name_pattern(pattern: str):
+    """
+    Maya の名前パターンを正規表現にします。ls と同様に "*" / "?" はネームスペースの区切り ":" をまたがないため、
+    "ns:*" は "ns:sub:x" のような入れ子のネームスペースのノードに一致しません。
+    パスの区切り "|" もまたがず、"[abc]" / "[!abc]" は1文字の集合として扱います (閉じていない "[" は文字そのもの)。
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        i += 1
+        if char == '*':
+            parts.append('[^:|]*')
+        elif char == '?':
+            parts.append('[^:|]')
+        elif char == '[':
+            end = _set_end(pattern, i)
+            if end < 0:
+                parts.append(re.escape(char))
+                continue
+            chars = pattern[i:end]
+            i = end + 1
+            negate = chars.startswith('!')
+            if negate:
+                chars = chars[1:]
+            chars = chars.replace('\\', '\\\\').replace('^', '\\^').replace(']', '\\]')
+            parts.append(f"[^:|{chars}]" if negate else f"[{chars}]")
+        else:
+            parts.append(re.escape(char))
+    return re.compile(''.join(parts) + r'\Z')
+
+
+class SelectorOptimizer:
+    """
+    階層スナップショットから構築し、optimize() で対象パスのリストを圧縮します。
+    スナップショットが変わった場合は作り直してください。
+    """
+    def __init__(self, hierarchy: dict):
+        self._types = {}
+        self._has_shape = {}
+        self._children = {}
+        self._pattern_cache = {}
+
+        stack = list(hierarchy.items())
+        while stack:
+            path, node_info = stack.pop()
+            self._types[path] = node_info['type']
+            # 'group' でもスタンドインやカーブはシェイプを持つ (hasShape のない辞書はタイプから判断する)
+            self._has_shape[path] = node_info.get('hasShape', node_info['type'] != 'group')
+            self._children[path] = list(node_info['children'])
+            stack.extend(node_info['children'].items())
+
+    # --- メンバー解決 ---
+
+    def resolve(self, static_paths, patterns=()) -> set:
+        """静的選択とパターンが選ぶノード (各ノード自身とすべての子孫、タイプを問わない) の集合を返します。"""
+        roots = [p for p in static_paths if p in self._types]
+        for pattern in patterns:
+            roots.extend(self._pattern_roots(pattern))
+
+        members = set()
+        stack = roots
+        while stack:
+            path = stack.pop()
+            if path in members:
+                continue
+            members.add(path)
+            stack.extend(self._children[path])
+        return members
+
+    def _pattern_roots(self, pattern: str) -> list:
+        cached = self._pattern_cache.get(pattern)
+        if cached is None:
+            # 名前がパターンに一致するノードのうち、祖先が一致していない最上位のもの
+            regex = compile_name_pattern(pattern)
+            matched = {p for p in self._types if regex.match(p.rpartition('|')[2])}
+            cached = [p for p in matched if not self._has_ancestor_in(p, matched)]
+            self._pattern_cache[pattern] = cached
+        return cached
+
+    def _with_shapes(self, members: set) -> set:
+        """レンダリングに関わる (シェイプを持つ) ノードだけを返します。"""
+        return {p for p in members if self._has_shape[p]}
+
+    @staticmethod
+    def _has_ancestor_in(path: str, paths: set) -> bool:
+        parent = _parent_of(path)
+        while parent:
+            if parent in paths:
+                return True
+            parent = _parent_of(parent)
+        return False
+
+    # --- 圧縮 ---
+
+    def optimize(self, targets: list) -> dict:
+        """
+        targets と同じノードを選ぶ、より少ないセレクターエントリを返します。
+        グループへの繰り上げで加わるのは、子孫がすべて対象に含まれるシェイプを持たないグループ自身だけです。
+        戻り値: {'static': [パス], 'patterns': [パターン], 'original_count': int,
+                 'entry_count': int, 'verified': bool}
+        """
+        unique = list(dict.fromkeys(targets))
+        unknown = [p for p in unique if p not in self._types]
+        known = set(unique) - set(unknown)
+
+        # 1. 祖先が対象に含まれるノードは冗長
+        minimal = {p for p in known if not self._has_ancestor_in(p, known)}
+
+        # 2. 子孫がすべて対象に含まれるグループへ繰り上げる
+        static = self._promote_to_parents(minimal)
+
+        # 3. ネームスペースのノードがすべて対象に含まれる場合は "ns:*" パターンにまとめる
+        static, patterns = self._collapse_namespaces(static)
+
+        expected = self._with_shapes(self.resolve(known))
+        plan_static = sorted(static) + unknown
+        verified = self._with_shapes(self.resolve(plan_static, patterns)) == expected
+        if not verified:
+            # 同値でない場合は冗長なエントリを除いただけの結果を返す
+            plan_static = sorted(minimal) + unknown
+            patterns = []
+
+        return {
+            'static': plan_static,
+            'patterns': patterns,
+            'original_count': len(targets),
+            'entry_count': len(plan_static) + len(patterns),
+            'verified': verified,
+        }
+
+    def _promote_to_parents(self, static: set):
+        """
+        子がすべて (子孫を含めて) 選ばれているグループを、深い階層から順に1エントリへ繰り上げます。
+        繰り上げるのはシェイプを持たないトランスフォームだけです。
+        """
+        full = set(static)
+        candidates = set()
+        for path in static:
+            parent = _parent_of(path)
+            while parent and parent not in candidates:
+                candidates.add(parent)
+                parent = _parent_of(parent)
+
+        for parent in sorted(candidates, key=lambda p: p.count('|'), reverse=True):
+            children = self._children[parent]
+            # 親自身がシェイプを持つ場合 (スタンドイン・カーブを含む) は、対象外のシェイプが加わるので繰り上げない
+            if not self._has_shape[parent] and children and all(child in full for child in children):
+                full.add(parent)
+        return {p for p in full if not self._has_ancestor_in(p, full)}
+
+    def _collapse_namespaces(self, static: set):
+        by_namespace = {}
+        for path in static:
+            namespace = _namespace_of(path)
+            if namespace:
+                by_namespace.setdefault(namespace, []).append(path)
+
+        patterns = []
+        if not by_namespace:
+            return static, patterns
+
+        wanted = self.resolve(static)
+        for namespace, paths in by_namespace.items():
+            if len(paths) < 2:
+                continue # 1エントリをパターンにしても小さくならない
+            pattern = f"{namespace}:*"
+            pattern_members = self.resolve((), [pattern])
+            # ネームスペース内に対象外のノード (タイプを問わない) が1つでもある場合は使えない
+            if not pattern_members or not pattern_members <= wanted:
+                continue
+            # pattern_members は子孫を含むので、エントリ自身が含まれていればサブツリー全体が含まれる
+            static = {p for p in static if p not in pattern_members}
+            patterns.append(pattern)
+        return static, patterns
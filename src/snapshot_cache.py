@@ -0,0 +1,189 @@
+# render_layer_tool/snapshot_cache.py
+# -*- coding: utf-8 -*-
+"""
+シーン階層スナップショットのディスクキャッシュ。
+SceneSnapshot の配列をそのままの並びでバイナリに保存し、ツール起動時の全走査を省略します。
+読み込みはファイルをメモリマップし、各配列をバッファから一括でコピーするだけなので、ノードごとの処理はありません
+(Pythonで処理するのは重複を除いた短縮名の表だけ)。
+キャッシュはシーンパスごとに1ファイルで、シーンファイルの更新時刻とDAGのフィンガープリントで検証し、
+合計サイズの上限を超えた場合は最も古く使われたものから削除します (LRU)。
+
+ファイル形式 (ネイティブバイトオーダー、N はノード数、B = (N + 7) // 8):
+    ヘッダー  : magic(4s) byte_order(H) version(H) mtime(d) fingerprint_len(I) node_count(I)
+                name_count(I) names_len(I) first_root(i) last_root(i)
+    fingerprint (4バイト境界までパディング)
+    parents / first_child / next_sibling / prev_sibling / last_child / name_ids   int32[N] ずつ
+    types        int8[N]    ノードタイプコード
+    pv_known / pv_value / shape_bits   uint8[B] ずつ  primaryVisibility とシェイプの有無のビット列
+    names        UTF-8      重複を除いた短縮名を NUL 区切りで連結したもの (name_ids はこの順序の番号)
+"""
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+
+from scene_snapshot import SceneSnapshot
+
+MAGIC = b'RLTS'
+VERSION = 3
+_BYTE_ORDER_MARK = 0x0102
+_HEADER = struct.Struct('=4sHHdIIIIii')
+# int32 の列 (SceneSnapshot.columns() のキー)。この順序でファイルに並ぶ
+_INT_COLUMNS = ('parents', 'first_child', 'next_sibling', 'prev_sibling', 'last_child', 'name_ids')
+_BIT_COLUMNS = ('pv_known', 'pv_value', 'shape_bits')
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    return os.path.join(os.path.expanduser("~"), ".render_layer_tool", "snapshot_cache")
+
+
+def _pad4(size: int) -> int:
+    return (4 - size % 4) % 4
+
+
+def encode_snapshot(snapshot: SceneSnapshot, mtime: float, fingerprint: str) -> bytes:
+    """スナップショットをバイナリにします。削除済みのノードがある場合は番号を詰め直してから保存します。"""
+    columns = snapshot.compacted().columns()
+    count = len(columns['parents'])
+    bit_len = (count + 7) // 8
+    names = '\0'.join(columns['names']).encode('utf-8')
+
+    fingerprint_bytes = fingerprint.encode('utf-8')
+    header = _HEADER.pack(MAGIC, _BYTE_ORDER_MARK, VERSION, mtime, len(fingerprint_bytes), count,
+                          len(columns['names']), len(names), columns['first_root'], columns['last_root'])
+    parts = [header, fingerprint_bytes, b'\0' * _pad4(len(fingerprint_bytes))]
+    parts.extend(columns[key].tobytes() for key in _INT_COLUMNS)
+    parts.append(columns['types'].tobytes())
+    parts.extend(bytes(columns[key][:bit_len]) for key in _BIT_COLUMNS)
+    parts.append(names)
+    return b''.join(parts)
+
+
+def read_header(buffer):
+    """
+    ヘッダーを読み、(mtime, fingerprint, node_count, name_count, names_len, first_root, last_root, データ開始位置)
+    を返します。不正なら None。
+    """
+    if len(buffer) < _HEADER.size:
+        return None
+    (magic, byte_order, version, mtime, fingerprint_len, node_count, name_count, names_len,
+     first_root, last_root) = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or byte_order != _BYTE_ORDER_MARK or version != VERSION:
+        return None
+    start = _HEADER.size
+    fingerprint = bytes(buffer[start:start + fingerprint_len]).decode('utf-8')
+    start += fingerprint_len + _pad4(fingerprint_len)
+    expected = start + node_count * (4 * len(_INT_COLUMNS) + 1) + (node_count + 7) // 8 * len(_BIT_COLUMNS) + names_len
+    if len(buffer) < expected:
+        return None
+    return mtime, fingerprint, node_count, name_count, names_len, first_root, last_root, start
+
+
+def decode_snapshot(buffer):
+    """
+    encode_snapshot のバイナリ (bytes または mmap) から (SceneSnapshot, mtime, fingerprint) を返します。
+    配列はバッファから一括でコピーします。不正なデータの場合は None を返します。
+    """
+    header = read_header(buffer)
+    if header is None:
+        return None
+    mtime, fingerprint, count, name_count, names_len, first_root, last_root, offset = header
+
+    columns = {'first_root': first_root, 'last_root': last_root}
+    view = memoryview(buffer)
+    try:
+        for key in _INT_COLUMNS:
+            column = array('i')
+            column.frombytes(view[offset:offset + count * 4])
+            columns[key] = column
+            offset += count * 4
+        columns['types'] = array('b')
+        columns['types'].frombytes(view[offset:offset + count])
+        offset += count
+        bit_len = (count + 7) // 8
+        for key in _BIT_COLUMNS:
+            columns[key] = bytearray(view[offset:offset + bit_len])
+            offset += bit_len
+        names = bytes(view[offset:offset + names_len]).decode('utf-8')
+    finally:
+        # mmap を閉じられるよう、ビューを解放する
+        view.release()
+
+    columns['names'] = names.split('\0') if name_count else []
+    if len(columns['names']) != name_count:
+        return None
+    return SceneSnapshot.from_columns(columns), mtime, fingerprint
+
+
+class SnapshotCache:
+    """シーンパスをキーとするスナップショットのLRUディスクキャッシュ。"""
+    def __init__(self, cache_dir: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _path_for(self, scene_path: str) -> str:
+        digest = hashlib.sha1(os.path.normcase(os.path.abspath(scene_path)).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest + '.rlts')
+
+    def load(self, scene_path: str, mtime: float):
+        """
+        シーンファイルの更新時刻が一致するキャッシュを読み込み、(SceneSnapshot, fingerprint) を返します。
+        キャッシュがない/古い/壊れている場合は None を返します。
+        """
+        cache_path = self._path_for(scene_path)
+        try:
+            with open(cache_path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    header = read_header(mapped)
+                    if header is None or header[0] != mtime:
+                        return None
+                    decoded = decode_snapshot(mapped)
+        except (OSError, ValueError):
+            return None
+        if decoded is None:
+            return None
+        # LRU 用に最終使用時刻を更新する
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+        snapshot, _, fingerprint = decoded
+        return snapshot, fingerprint
+
+    def save(self, scene_path: str, mtime: float, fingerprint: str, snapshot: SceneSnapshot):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_path = self._path_for(scene_path)
+        temp_path = cache_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(encode_snapshot(snapshot, mtime, fingerprint))
+        os.replace(temp_path, cache_path)
+        self.evict(keep=cache_path)
+
+    def evict(self, keep: str = None):
+        """合計サイズが上限を超えている間、最終使用時刻の古いキャッシュから削除します。"""
+        try:
+            entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                       if name.endswith('.rlts')]
+        except OSError:
+            return
+        stats = []
+        for path in entries:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stats.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in sorted(stats):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,44 @@
+# render_layer_tool/tests/conftest.py
+# -*- coding: utf-8 -*-
+"""
+テスト共通の設定。src をインポートパスに追加し、maya パッケージを benchmarks.fake_maya の
+メモリ上のシーンに置き換えます (ツールのモジュールより先に install する必要がある)。
+"""
+import os
+import sys
+
+import pytest
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from benchmarks import fake_maya  # noqa: E402
+from benchmarks.synthetic import generate_scene  # noqa: E402
+
+fake_maya.install()
+
+
+@pytest.fixture
+def fake_scene():
+    """
+    偽のシーンを作成して現在のシーンにするビルダーを返します。テストのシーンはすべてこれで作成します。
+
+    fake_scene(layout=(), node_count=0, mix=None, seed=0, path=None)
+      layout:     (親のパス, 名前, シェイプのタイプ) の並び。シェイプのタイプが None ならトランスフォームのみ、
+                  それ以外は "<名前>Shape" を primaryVisibility=True で追加する
+      node_count: 0 以外なら synthetic.generate_scene(node_count, mix=mix, seed=seed) の合成シーンから始める
+      path:       指定するとシーンファイルとして登録する (cmds.file(path, open=True) で開ける)
+    戻り値の FakeScene に scene.add() で個別のノードを追加することもできます。
+    """
+    def build(layout=(), node_count=0, mix=None, seed=0, path=None):
+        scene = generate_scene(node_count, mix=mix, seed=seed) if node_count else fake_maya.FakeScene()
+        for parent, name, shape in layout:
+            node = scene.add(parent, name)
+            if shape:
+                scene.add(node.path, f"{name}Shape", shape, primaryVisibility=True)
+        fake_maya.set_scene(scene)
+        if path:
+            fake_maya.register_scene_file(path, scene)
+        return scene
+    return build
@@ -0,0 +1,52 @@
+# render_layer_tool/tests/test_batch_runner.py
+# -*- coding: utf-8 -*-
+"""BatchRunner を模擬ワーカー (偽の maya パッケージ上の headless ワーカー) で実行するテスト。"""
+import json
+import os
+import sys
+
+import batch_runner
+
+RECIPE = {
+    "version": 1,
+    "layers": [
+        {"name": "RL_Asset", "targets": ["|ns0:asset0_grp|ns0:grp1_0"], "mattes": ["|ns0:asset0_grp|ns0:grp1_1"]},
+        {"name": "RL_", "targets": ["ns0:grp1_[2-4]"], "each": True},
+    ],
+}
+
+
+def _fake_worker_command(scene_nodes=300):
+    return [sys.executable, os.path.abspath(batch_runner.__file__), '--serve-fake-worker',
+            '--fake-duration', '0', '--fake-scene-nodes', str(scene_nodes)]
+
+
+def test_fake_workers_open_apply_and_save_scenes(tmp_path):
+    recipe_path = tmp_path / "layers.json"
+    recipe_path.write_text(json.dumps(RECIPE), encoding="utf-8")
+    scenes = [str(tmp_path / f"shot{i:03d}.ma") for i in range(3)]
+
+    runner = batch_runner.BatchRunner(_fake_worker_command(), workers=2, timeout=60, retries=0)
+    report = runner.run(scenes, str(recipe_path), output_dir=str(tmp_path / "out"))
+
+    assert report['failed'] == 0, report['failures']
+    assert report['failures'] == []
+    for job in report['jobs']:
+        assert job['ok']
+        assert sorted(job['layers']) == ["RL_Asset", "RL_ns0_grp1_2", "RL_ns0_grp1_3", "RL_ns0_grp1_4"]
+        assert set(job['timings']) == {'open', 'apply', 'save'}
+        assert job['saved_to'] == os.path.join(str(tmp_path / "out"), os.path.basename(job['scene']))
+
+
+def test_worker_stderr_is_included_in_failures(tmp_path):
+    recipe_path = tmp_path / "layers.json"
+    recipe_path.write_text(json.dumps(RECIPE), encoding="utf-8")
+    command = [sys.executable, '-c', 'import sys; sys.stderr.write("boom: license error\\n"); sys.exit(3)']
+
+    runner = batch_runner.BatchRunner(command, workers=1, timeout=30, retries=0)
+    report = runner.run([str(tmp_path / "shot.ma")], str(recipe_path))
+
+    assert report['failed'] == 1
+    [failure] = report['failures']
+    assert "exit code 3" in failure['error']
+    assert "boom: license error" in failure['stderr']
@@ -0,0 +1,83 @@
+# render_layer_tool/tests/test_headless.py
+# -*- coding: utf-8 -*-
+"""headless エントリーポイントを偽の maya パッケージ上で実行するテスト。"""
+import json
+import os
+
+from benchmarks import fake_maya
+
+import headless
+
+SAMPLE_RECIPE = {
+    "version": 1,
+    "layers": [
+        {"name": "RL_Hero", "targets": ["|chr|body"], "mattes": ["|env|ground"]},
+        {"name": "RL_", "targets": ["prop_*"], "each": True},
+    ],
+}
+
+
+_SHOT_LAYOUT = (
+    (None, "chr", None), ("|chr", "body", "mesh"), ("|chr", "hair", "mesh"),
+    (None, "env", None), ("|env", "ground", "mesh"), ("|env", "sky", "mesh"),
+    (None, "prop_a", "mesh"), (None, "prop_b", "mesh"),
+)
+
+
+def test_main_compiles_and_applies_sample_recipe(fake_scene, tmp_path, capsys):
+    recipe_path = tmp_path / "layers.json"
+    recipe_path.write_text(json.dumps(SAMPLE_RECIPE), encoding="utf-8")
+    scene_path = str(tmp_path / "shot010.ma")
+    fake_scene(_SHOT_LAYOUT, path=scene_path)
+    output_dir = tmp_path / "out"
+
+    code = headless.main(["--recipe", str(recipe_path), scene_path, "--output-dir", str(output_dir)])
+
+    report = json.loads(capsys.readouterr().out)
+    assert code == 0, report
+    assert report["ok"]
+    [scene_report] = report["scenes"]
+    assert sorted(scene_report["layers"]) == ["RL_Hero", "RL_prop_a", "RL_prop_b"]
+
+    saved = fake_maya.scene_file(os.path.join(str(output_dir), "shot010.ma"))
+    assert saved is not None
+    layers = {layer.name(): layer for layer in saved.render_setup.getRenderLayers()}
+    assert sorted(layers) == ["RL_Hero", "RL_prop_a", "RL_prop_b"]
+    collections = {col.name(): col for col in layers["RL_Hero"].getCollections()}
+    assert collections["RL_Hero_TARGETS"].getSelector().getStaticSelection() == "|chr|body"
+    assert collections["RL_Hero_MATTES"].getSelector().getStaticSelection() == "|env|ground"
+
+
+def test_reapplying_recipe_reports_layers_as_reused(fake_scene, tmp_path, capsys):
+    recipe_path = tmp_path / "layers.json"
+    recipe_path.write_text(json.dumps(SAMPLE_RECIPE), encoding="utf-8")
+    scene_path = str(tmp_path / "shot010.ma")
+    scene = fake_scene(_SHOT_LAYOUT, path=scene_path)
+
+    assert headless.main(["--recipe", str(recipe_path), scene_path, "--save"]) == 0
+    [first] = json.loads(capsys.readouterr().out)["scenes"]
+    assert sorted(first["created"]) == ["RL_Hero", "RL_prop_a", "RL_prop_b"]
+    assert first["reused"] == []
+
+    assert headless.main(["--recipe", str(recipe_path), scene_path, "--save"]) == 0
+    [second] = json.loads(capsys.readouterr().out)["scenes"]
+    assert second["created"] == []
+    assert sorted(second["reused"]) == ["RL_Hero", "RL_prop_a", "RL_prop_b"]
+    assert sorted(second["layers"]) == ["RL_Hero", "RL_prop_a", "RL_prop_b"]
+    # 再適用でレイヤーもコレクションも増えない
+    layers = scene.render_setup.getRenderLayers()
+    assert len(layers) == 3
+    assert sorted(col.name() for col in next(l for l in layers if l.name() == "RL_Hero").getCollections()) == [
+        "RL_Hero_MATTES", "RL_Hero_TARGETS"]
+
+
+def test_main_reports_missing_scene(tmp_path, capsys):
+    recipe_path = tmp_path / "layers.json"
+    recipe_path.write_text(json.dumps(SAMPLE_RECIPE), encoding="utf-8")
+
+    code = headless.main(["--recipe", str(recipe_path), str(tmp_path / "missing.ma")])
+
+    report = json.loads(capsys.readouterr().out)
+    assert code == 1
+    assert not report["scenes"][0]["ok"]
+    assert "missing.ma" in report["scenes"][0]["error"]
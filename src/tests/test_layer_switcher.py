@@ -0,0 +1,64 @@
+# render_layer_tool/tests/test_layer_switcher.py
+# -*- coding: utf-8 -*-
+"""LayerSwitcher の省略・まとめ・失敗の検出を偽の Render Setup で確認するテスト。"""
+import layer_switcher
+import model
+
+
+def _switcher(fake_scene):
+    rs = fake_scene().render_setup
+    layers = [rs.createRenderLayer(name) for name in ("RL_A", "RL_B", "RL_C")]
+    return layer_switcher.LayerSwitcher(rs), rs, layers
+
+
+def test_switch_to_visible_layer_is_skipped(fake_scene):
+    switcher, rs, layers = _switcher(fake_scene)
+    assert switcher.switch_to_master()
+    assert switcher.switch_to(layers[0])
+    assert switcher.switch_to(layers[0])
+    assert rs.getVisibleRenderLayer() is layers[0]
+    assert switcher.stats['skipped'] == 2 and switcher.stats['switched'] == 1
+    assert [entry[0] for entry in switcher.history] == ["RL_A"]
+    assert switcher.history[0][2] # オブザーバー通知で確認できた
+
+
+def test_batch_coalesces_consecutive_switches(fake_scene):
+    switcher, rs, layers = _switcher(fake_scene)
+    with switcher.batch():
+        for layer in layers:
+            switcher.switch_to(layer)
+        with switcher.batch():
+            switcher.switch_to(layers[1])
+        # ブロックを抜けるまで切り替えない
+        assert rs.getVisibleRenderLayer() is rs.getDefaultRenderLayer()
+    assert rs.getVisibleRenderLayer() is layers[1]
+    assert switcher.stats['requested'] == 4
+    assert switcher.stats['coalesced'] == 3
+    assert switcher.stats['switched'] == 1
+
+
+def test_failed_switch_is_detected_without_notification(fake_scene, monkeypatch):
+    switcher, rs, layers = _switcher(fake_scene)
+    monkeypatch.setattr(rs, 'switchToLayer', lambda layer: None)
+    assert not switcher.switch_to(layers[0])
+    assert switcher.stats['failed'] == 1
+    assert switcher.history[0][0] == "RL_A" and not switcher.history[0][2]
+
+
+def test_model_bulk_edits_switch_once(fake_scene):
+    fake_scene(node_count=50, mix={'mesh': 1.0})
+    layer_model = model.RenderLayerModel()
+    rs, switcher = layer_model.rs, layer_model.layer_switcher
+    layers = [rs.createRenderLayer(name) for name in ("RL_A", "RL_B")]
+    switched = switcher.stats['switched']
+    with layer_model._batch_edit("Test"):
+        switcher.switch_to(layers[0])
+        switcher.switch_to(layers[1])
+    assert rs.getVisibleRenderLayer() is layers[1]
+    assert switcher.stats['switched'] == switched + 1
+
+    # 表示中のレイヤーを削除する場合は、削除の前にマスターへ切り替える
+    result = layer_model.delete_layers(["RL_B"])
+    assert result['deleted'] == ["RL_B"]
+    assert rs.getVisibleRenderLayer() is rs.getDefaultRenderLayer()
+    assert switcher.history[0][0] == rs.getDefaultRenderLayer().name()
@@ -0,0 +1,51 @@
+# render_layer_tool/tests/test_model_layers.py
+# -*- coding: utf-8 -*-
+"""RenderLayerModel のレイヤー作成を偽の maya 上で確認するテスト。"""
+from benchmarks import fake_maya
+from benchmarks.synthetic import geometry_paths
+
+import model
+
+
+def _model_with_scene(fake_scene, node_count=200):
+    scene = fake_scene(node_count=node_count, mix={'mesh': 1.0})
+    return model.RenderLayerModel(), geometry_paths(scene)
+
+
+def test_create_layers_each_reports_reused_layers_separately(fake_scene):
+    layer_model, paths = _model_with_scene(fake_scene)
+    first = layer_model.create_layers_each(paths[:2], [])
+    assert len(first['created']) == 2 and first['reused'] == []
+
+    second = layer_model.create_layers_each(paths[:3], [])
+    assert second['reused'] == first['created']
+    assert second['created'] == [layer_model.layer_name_for_target(paths[2])]
+    assert len(layer_model.get_all_layers()) == 3
+
+
+def test_set_selector_resets_custom_filter_when_spec_has_none(fake_scene):
+    layer_model, paths = _model_with_scene(fake_scene)
+    spec = layer_model._collection_spec("RL_A_TARGETS", paths[0], 'primaryVisibility', True, members=paths[:1])
+    col = fake_maya.FakeCollection("RL_A_TARGETS")
+    col_selector = col.getSelector()
+    col_selector.setFilterType(model.selector.Filters.kCustom)
+    col_selector.setCustomFilterValue("mesh")
+
+    state = {'static': set(spec['static']), 'pattern': spec['pattern'], 'custom_filter': "mesh", 'overrides': []}
+    ops = layer_model.diff_layer_contents("RL_A", [spec], {"RL_A_TARGETS": dict(state, collection=col)})
+    assert ('set_selector', "RL_A_TARGETS", spec) in ops
+
+    layer_model._configure_selector(col, spec)
+    assert col_selector.getFilterType() == model.selector.Filters.kAll
+
+
+def test_create_layer_reuses_layer_after_unobserved_rename(fake_scene):
+    layer_model, paths = _model_with_scene(fake_scene)
+    layer_model.create_layer("RL_Old", paths[:1], [])
+    layer = layer_model.layer_registry.get("RL_Old")
+    layer._name = "RL_New" # オブザーバーに通知されない名前変更
+
+    assert layer_model.layer_registry.get("RL_New") is layer
+    assert layer_model.layer_registry.get("RL_Missing") is None
+    layer_model.create_layer("RL_New", paths[:1], [])
+    assert layer_model.get_all_layers() == ["RL_New"]
@@ -0,0 +1,35 @@
+# render_layer_tool/tests/test_render_cost.py
+# -*- coding: utf-8 -*-
+"""render_cost のメッシュ統計とレイヤーのバウンディングボックス集計のテスト。"""
+import render_cost
+
+
+def _scene(fake_scene):
+    scene = fake_scene()
+    # 2つのメッシュシェイプを持つトランスフォーム (大きいシェイプが先)
+    multi = scene.add(None, "multi")
+    scene.add(multi.path, "bigShape", 'mesh', center=(10.0, 0.0, 0.0), size=2.0, faces=10)
+    scene.add(multi.path, "smallShape", 'mesh', center=(20.0, 0.0, 0.0), size=1.0, faces=5)
+    # メッシュを持たないトランスフォーム
+    empty = scene.add(None, "empty")
+    scene.add(empty.path, "emptyLightShape", 'pointLight')
+    return scene
+
+
+def test_bounds_cover_every_mesh_shape_of_a_transform(fake_scene):
+    _scene(fake_scene)
+    stats = render_cost.gather_mesh_stats(["|multi", "|empty"])
+    assert list(stats.triangles) == [30, 0]
+    assert list(stats.has_mesh) == [True, False]
+    assert tuple(stats.bounds[0]) == (8.0, -2.0, -2.0, 21.0, 2.0, 2.0)
+
+
+def test_layer_bounds_skip_transforms_without_mesh(fake_scene):
+    _scene(fake_scene)
+    stats = render_cost.gather_mesh_stats(["|multi", "|empty"])
+    result = render_cost.estimate_layers(
+        [{'name': "RL_A", 'meshes': ["|multi", "|empty"], 'matte_meshes': []},
+         {'name': "RL_B", 'meshes': ["|empty"], 'matte_meshes': []}], stats)
+    rows = {row['name']: row for row in result['layers']}
+    assert rows["RL_A"]['bounds'] == (8.0, -2.0, -2.0, 21.0, 2.0, 2.0)
+    assert rows["RL_B"]['bounds'] is None
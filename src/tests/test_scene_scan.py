@@ -0,0 +1,85 @@
+# render_layer_tool/tests/test_scene_scan.py
+# -*- coding: utf-8 -*-
+"""scene_scan の cmds 呼び出し回数がシーンの規模に依存しないことを、呼び出しを数える偽の maya で確認するテスト。"""
+import pytest
+
+from benchmarks.synthetic import geometry_paths
+
+import scene_scan
+
+# スタートアップカメラの判定も走査中に行うので、カメラを含む構成でも呼び出し回数は規模に依存しない
+_MIX = {'mesh': 0.85, 'light': 0.1, 'camera': 0.05}
+
+
+def _scan_calls(fake_scene, node_count: int):
+    scene = fake_scene(node_count=node_count, mix=_MIX)
+    scene_scan._TYPE_CATEGORY_CACHE.clear()
+    scene.command_calls = 0
+    hierarchy = scene_scan.scan_scene()
+    return scene, hierarchy, scene.command_calls
+
+
+def _flatten(hierarchy):
+    nodes, stack = {}, list(hierarchy.items())
+    while stack:
+        path, info = stack.pop()
+        nodes[path] = info
+        stack.extend(info['children'].items())
+    return nodes
+
+
+@pytest.mark.parametrize('node_count', [100, 1_000, 10_000])
+def test_scan_classifies_every_transform(fake_scene, node_count):
+    scene, hierarchy, _ = _scan_calls(fake_scene, node_count)
+    nodes = _flatten(hierarchy)
+    assert len(nodes) == node_count # スタートアップカメラは含まない
+    geometry = {path for path, info in nodes.items() if info['type'] == 'geometry'}
+    assert geometry == set(geometry_paths(scene))
+
+
+def test_scan_call_count_is_independent_of_scene_size(fake_scene):
+    counts = [_scan_calls(fake_scene, node_count)[2] for node_count in (100, 1_000, 10_000)]
+    assert counts[0] == counts[1] == counts[2]
+    # ライトとカメラのシェイプのタイプ判定が1回ずつ (スタートアップカメラの判定に cmds は使わない)
+    assert counts[0] == 2
+
+
+def test_shape_type_lookup_is_cached_across_scans(fake_scene):
+    _scan_calls(fake_scene, 1_000)
+    scene = fake_scene(node_count=1_000, mix=_MIX, seed=1)
+    before = scene.command_calls
+    scene_scan.scan_scene()
+    # 2回目の走査ではシェイプのタイプ判定に cmds.nodeType を呼ばない
+    assert scene.command_calls - before == 0
+
+
+def test_scan_skips_startup_cameras_by_default_node_and_name(fake_scene):
+    scene = fake_scene()
+    for name, is_default in (("persp", True), ("renamedTop", True), ("shotCam", False)):
+        camera = scene.add(None, name, startupCamera=is_default)
+        scene.add(camera.path, f"{name}Shape", 'camera')
+    # 既定の名前でもカメラでないトランスフォームは残す
+    scene.add(None, "front")
+    nodes = _flatten(scene_scan.scan_scene())
+    assert sorted(nodes) == ["|front", "|shotCam"]
+    assert nodes["|shotCam"]['type'] == 'camera'
+
+
+def test_scan_records_shapes_of_group_classified_transforms(fake_scene):
+    scene = fake_scene()
+    scene.add(None, "grp")
+    scene.add("|grp", "proxy")
+    scene.add("|grp|proxy", "proxyShape", 'aiStandIn')
+    scene.add("|grp|proxy", "inner")
+    scene.add("|grp|proxy|inner", "innerShape", 'mesh', primaryVisibility=True)
+    nodes = _flatten(scene_scan.scan_scene())
+    assert nodes["|grp"]['type'] == 'group' and not nodes["|grp"]['hasShape']
+    assert nodes["|grp|proxy"]['type'] == 'group' and nodes["|grp|proxy"]['hasShape']
+    assert nodes["|grp|proxy|inner"]['hasShape']
+
+
+def test_sliced_scan_yields_between_slices_and_matches_the_full_scan(fake_scene):
+    fake_scene(node_count=1_000, mix=_MIX)
+    steps = list(scene_scan.iter_scan_snapshot(slice_nodes=100))
+    assert len(steps) > 10 and all(step is None for step in steps[:-1])
+    assert steps[-1].to_hierarchy() == scene_scan.scan_scene()
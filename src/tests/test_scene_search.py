@@ -0,0 +1,29 @@
+# render_layer_tool/tests/test_scene_search.py
+# -*- coding: utf-8 -*-
+"""SceneSearchIndex のグロブが Maya の ls と同じくネームスペースとパスの区切りをまたがないことを確認するテスト。"""
+from scene_search import SceneSearchIndex
+from scene_snapshot import SceneSnapshot
+
+
+def _index():
+    return SceneSearchIndex.from_snapshot(SceneSnapshot.from_hierarchy({
+        "|chr:body": {'type': 'geometry', 'primaryVisibility': True, 'children': {
+            "|chr:body|chr:sub:eye": {'type': 'geometry', 'primaryVisibility': True, 'children': {}},
+        }},
+        "|body": {'type': 'geometry', 'primaryVisibility': True, 'children': {}},
+    }))
+
+
+def test_glob_does_not_cross_namespaces_or_paths():
+    index = _index()
+    assert index.match("*body") == ["|body"]
+    assert index.match("*:body") == ["|chr:body"]
+    assert index.match("chr:*") == ["|chr:body"]
+    assert index.match("chr:*:*") == ["|chr:body|chr:sub:eye"]
+    assert index.match("|chr:body|*") == []
+    assert index.match("|chr:body|*:*:*") == ["|chr:body|chr:sub:eye"]
+    assert index.match("[bc]ody") == ["|body"]
+
+
+def test_substring_search_still_ignores_namespaces():
+    assert sorted(_index().match("body")) == ["|body", "|chr:body"]
@@ -0,0 +1,137 @@
+# render_layer_tool/tests/test_scene_snapshot.py
+# -*- coding: utf-8 -*-
+"""RenderLayerModel がシーン階層を SceneSnapshot で保持し、DAGの変更をその場で反映することを確認するテスト。"""
+import model
+import scene_scan
+import snapshot_cache
+from scene_snapshot import HierarchyView, SceneSnapshot
+
+
+_LAYOUT = (
+    (None, "chr", None), ("|chr", "body", "mesh"), ("|chr", "hair", "mesh"),
+    (None, "env", None), ("|env", "ground", "mesh"),
+    (None, "key", "pointLight"),
+)
+
+
+def _model(fake_scene):
+    scene = fake_scene(_LAYOUT)
+    layer_model = model.RenderLayerModel()
+    hierarchy = layer_model.get_scene_hierarchy()
+    return scene, layer_model, hierarchy
+
+
+def test_model_holds_the_snapshot_behind_a_read_only_view(fake_scene):
+    _, layer_model, hierarchy = _model(fake_scene)
+    assert isinstance(layer_model._snapshot, SceneSnapshot)
+    assert isinstance(hierarchy, HierarchyView)
+    assert list(hierarchy) == ["|chr", "|env", "|key"]
+    assert list(hierarchy["|chr"]["children"]) == ["|chr|body", "|chr|hair"]
+    assert hierarchy["|chr"]["children"]["|chr|body"]["type"] == 'geometry'
+    assert layer_model.has_node("|chr|hair") and not layer_model.has_node("|chr|missing")
+    assert layer_model.node_count() == 6
+
+
+def test_dag_changes_edit_the_snapshot_in_place(fake_scene):
+    scene, layer_model, hierarchy = _model(fake_scene)
+    chr_children = hierarchy["|chr"]["children"]
+
+    prop = scene.add("|chr", "prop")
+    scene.add(prop.path, "propShape", 'mesh', primaryVisibility=False)
+    scene.remove("|env|ground")
+    ops = layer_model.apply_dag_changes([('dirty', "|chr"), ('dirty', "|env")])
+    kinds = sorted(op[0] for op in ops)
+    assert kinds == ['insert', 'remove']
+    inserted = next(op for op in ops if op[0] == 'insert')
+    assert inserted[1:3] == ("|chr", "|chr|prop") and inserted[3]['primaryVisibility'] is False
+    # ツリーモデルが保持している子のビューにも反映される
+    assert "|chr|prop" in chr_children
+    assert not hierarchy["|env"]["children"]
+
+    scene.rename("|chr", "hero")
+    ops = layer_model.apply_dag_changes([('rename', "|chr", "|hero")])
+    assert ops == [('rename', "|chr", "|hero")]
+    assert list(chr_children) == ["|hero|body", "|hero|hair", "|hero|prop"]
+    assert layer_model.has_node("|hero|prop") and not layer_model.has_node("|chr|prop")
+
+
+def test_reconcile_updates_a_cached_snapshot(fake_scene, tmp_path):
+    scene, layer_model, _ = _model(fake_scene)
+    cache = snapshot_cache.SnapshotCache(str(tmp_path))
+    cache.save("shot.ma", 1.0, "fp", layer_model._snapshot)
+    cached, fingerprint = cache.load("shot.ma", 1.0)
+    assert fingerprint == "fp"
+    assert cached.to_hierarchy() == layer_model._snapshot.to_hierarchy()
+
+    layer_model._set_snapshot(cached)
+    scene.add("|env", "sky")
+    scene.remove("|key")
+    ops = layer_model.reconcile_hierarchy()
+    assert sorted((op[0], op[2] if op[0] == 'insert' else op[1]) for op in ops) == [
+        ('insert', "|env|sky"), ('remove', "|key")]
+    assert layer_model._snapshot.to_hierarchy() == SceneSnapshot.from_hierarchy(
+        scene_scan.scan_scene()).to_hierarchy()
+
+
+def test_reconcile_plan_reads_the_snapshot_and_is_dropped_once_replaced(fake_scene):
+    scene, layer_model, _ = _model(fake_scene)
+    scene.add("|env", "sky")
+    snapshot = layer_model._snapshot
+    before = snapshot.to_hierarchy()
+    result = layer_model.plan_reconcile(layer_model.begin_reconcile())
+    # 比較 (ワーカースレッド側) ではスナップショットを書き換えない
+    assert snapshot.to_hierarchy() == before
+    assert [step[0] for step in result['plan']] == ['insert']
+
+    layer_model.get_scene_hierarchy()
+    assert layer_model.apply_reconcile_plan(result) is None
+
+
+def test_hierarchy_cache_is_not_saved_with_unsaved_edits(fake_scene, tmp_path):
+    scene, layer_model, _ = _model(fake_scene)
+    scene_file = tmp_path / "shot.ma"
+    scene_file.write_text("")
+    scene.scene_name = str(scene_file)
+    cache = snapshot_cache.SnapshotCache(str(tmp_path / "cache"))
+
+    scene.modified = True
+    assert not layer_model.save_hierarchy_cache(cache)
+    assert layer_model.load_cached_hierarchy(cache) is None
+
+    scene.modified = False
+    assert layer_model.save_hierarchy_cache(cache)
+    assert layer_model.load_cached_hierarchy(cache) is not None
+
+
+def test_cached_snapshot_is_rebuilt_from_columns(fake_scene, tmp_path, monkeypatch):
+    scene, layer_model, _ = _model(fake_scene)
+    snapshot = layer_model._snapshot
+    snapshot.set_has_shape(snapshot.index_of("|chr"), True)
+    snapshot.set_primary_visibility(snapshot.index_of("|chr|hair"), False)
+    snapshot.remove_subtree(snapshot.index_of("|env|ground"))
+    snapshot.sort_children(key=lambda name: -ord(name[0]))
+    cache = snapshot_cache.SnapshotCache(str(tmp_path))
+    cache.save("shot.ma", 1.0, "fp", snapshot)
+
+    # 読み込みではノードごとに追加しない
+    monkeypatch.setattr(SceneSnapshot, 'add_node', None)
+    cached, _ = cache.load("shot.ma", 1.0)
+    assert len(cached) == len(snapshot) == 5
+    assert cached.to_hierarchy() == snapshot.to_hierarchy()
+    assert list(cached.as_hierarchy()) == ["|key", "|env", "|chr"]
+    assert cached.index_of("|chr|hair") != -1 and cached.has_shape(cached.index_of("|chr"))
+
+
+def test_cached_hierarchy_is_not_used_when_the_fingerprint_differs(fake_scene, tmp_path):
+    scene, layer_model, _ = _model(fake_scene)
+    scene_file = tmp_path / "shot.ma"
+    scene_file.write_text("")
+    scene.scene_name = str(scene_file)
+    cache = snapshot_cache.SnapshotCache(str(tmp_path / "cache"))
+    assert layer_model.save_hierarchy_cache(cache)
+
+    # ファイルの外で変わる部分 (参照のロード状態) が違えば、ファイルの更新時刻が同じでも使わない
+    scene.references[str(tmp_path / "ref.ma")] = False
+    assert layer_model.load_cached_hierarchy(cache) is None
+    del scene.references[str(tmp_path / "ref.ma")]
+    assert list(layer_model.load_cached_hierarchy(cache)) == ["|chr", "|env", "|key"]
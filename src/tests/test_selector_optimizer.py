@@ -0,0 +1,101 @@
+# render_layer_tool/tests/test_selector_optimizer.py
+# -*- coding: utf-8 -*-
+"""SelectorOptimizer の圧縮が対象と同じノードだけを選ぶことを確認するテスト。"""
+from selector_optimizer import SelectorOptimizer
+
+
+def _node(node_type='group', children=None, has_shape=None):
+    if has_shape is None:
+        has_shape = node_type != 'group'
+    return {'type': node_type, 'primaryVisibility': None, 'hasShape': has_shape, 'children': children or {}}
+
+
+def _hierarchy():
+    # scene_scan はスタンドイン (aiStandIn)・gpuCache・NURBS・カーブを 'group' に分類する
+    return {
+        '|grp': _node(children={
+            '|grp|meshA': _node('geometry'),
+            '|grp|meshB': _node('geometry'),
+            '|grp|standIn': _node(has_shape=True),
+        }),
+        '|set': _node(children={
+            '|set|wall': _node('geometry'),
+            '|set|floor': _node('geometry', children={'|set|floor|tile': _node('geometry')}),
+        }),
+        '|ns:a': _node('geometry'),
+        '|ns:b': _node('geometry'),
+        '|ns:crv': _node(has_shape=True),
+        '|chr:body': _node('geometry'),
+        '|chr:hair': _node('geometry'),
+        '|chr:sub:eye': _node('geometry'),
+        '|light': _node('light', children={'|light|meshC': _node('geometry')}),
+        # 子トランスフォームを持つスタンドイン (自身のシェイプは対象外)
+        '|proxy': _node(has_shape=True, children={
+            '|proxy|meshD': _node('geometry'),
+            '|proxy|meshE': _node('geometry'),
+        }),
+    }
+
+
+def test_does_not_promote_over_standin_sibling():
+    optimizer = SelectorOptimizer(_hierarchy())
+    plan = optimizer.optimize(['|grp|meshA', '|grp|meshB'])
+    assert plan['static'] == ['|grp|meshA', '|grp|meshB']
+    assert plan['verified']
+    assert '|grp|standIn' not in optimizer.resolve(plan['static'], plan['patterns'])
+
+
+def test_promotes_when_group_children_are_all_targets():
+    optimizer = SelectorOptimizer(_hierarchy())
+    plan = optimizer.optimize(['|grp|meshA', '|grp|meshB', '|grp|standIn', '|set|wall', '|set|floor'])
+    assert plan['static'] == ['|grp', '|set']
+    assert plan['verified']
+
+
+def test_does_not_promote_into_renderable_parent():
+    optimizer = SelectorOptimizer(_hierarchy())
+    plan = optimizer.optimize(['|light|meshC'])
+    assert plan['static'] == ['|light|meshC']
+
+
+def test_does_not_promote_into_standin_parent():
+    optimizer = SelectorOptimizer(_hierarchy())
+    plan = optimizer.optimize(['|proxy|meshD', '|proxy|meshE'])
+    assert plan['static'] == ['|proxy|meshD', '|proxy|meshE']
+    assert plan['verified']
+    assert '|proxy' not in optimizer.resolve(plan['static'], plan['patterns'])
+
+
+def test_does_not_collapse_namespace_containing_nurbs_curve():
+    optimizer = SelectorOptimizer(_hierarchy())
+    plan = optimizer.optimize(['|ns:a', '|ns:b'])
+    assert plan['patterns'] == []
+    assert plan['static'] == ['|ns:a', '|ns:b']
+    assert '|ns:crv' not in optimizer.resolve(plan['static'], plan['patterns'])
+
+
+def test_collapses_namespace_when_every_node_is_a_target():
+    optimizer = SelectorOptimizer(_hierarchy())
+    plan = optimizer.optimize(['|ns:a', '|ns:b', '|ns:crv'])
+    assert plan['patterns'] == ['ns:*']
+    assert plan['static'] == []
+    assert plan['verified']
+
+
+def test_namespace_pattern_does_not_match_nested_namespace():
+    optimizer = SelectorOptimizer(_hierarchy())
+    assert optimizer.resolve((), ['chr:*']) == {'|chr:body', '|chr:hair'}
+
+    plan = optimizer.optimize(['|chr:body', '|chr:hair'])
+    assert plan['patterns'] == ['chr:*']
+    assert '|chr:sub:eye' not in optimizer.resolve(plan['static'], plan['patterns'])
+
+    plan = optimizer.optimize(['|chr:body', '|chr:hair', '|chr:sub:eye'])
+    assert optimizer.resolve(plan['static'], plan['patterns']) == {'|chr:body', '|chr:hair', '|chr:sub:eye'}
+    assert plan['verified']
+
+
+def test_unknown_paths_are_kept_as_static_entries():
+    optimizer = SelectorOptimizer(_hierarchy())
+    plan = optimizer.optimize(['|grp|meshA', '|missing'])
+    assert plan['static'] == ['|grp|meshA', '|missing']
@@ -27,9 +27,28 @@ def unload_tool_modules():
     # 依存関係の末端から順に（子が先、親が後）指定するのが安全です。
     modules_to_unload = [
         'render_layer_tool.run',
+        'render_layer_tool.batch_runner',
+        'render_layer_tool.headless',
+        'render_layer_tool.recipe',
         'render_layer_tool.controller',
+        'render_layer_tool.refresh_scheduler',
+        'render_layer_tool.scene_pipeline',
+        'render_layer_tool.profiler',
+        'render_layer_tool.aov_manager',
+        'render_layer_tool.arnold_utils',
+        'render_layer_tool.snapshot_cache',
         'render_layer_tool.model',
+        'render_layer_tool.layer_registry',
+        'render_layer_tool.layer_switcher',
+        'render_layer_tool.layer_templates',
+        'render_layer_tool.render_cost',
+        'render_layer_tool.scene_scan',
+        'render_layer_tool.scene_snapshot',
+        'render_layer_tool.scene_search',
+        'render_layer_tool.selector_optimizer',
         'render_layer_tool.view',
+        'render_layer_tool.scene_tree_model',
+        'render_layer_tool.layer_list_model',
         'render_layer_tool' # パッケージ本体
     ]
 
@@ -3,6 +3,10 @@
 
 from PySide6 import QtWidgets, QtCore, QtGui
 
+import profiler
+from layer_list_model import LayerListModel
+from scene_tree_model import SceneTreeModel
+
 class RenderLayerToolView(QtWidgets.QWidget):
     """
     UIを構築し、ウィジェット群を公開するView。
@@ -12,18 +16,29 @@ class RenderLayerToolView(QtWidgets.QWidget):
     request_add_to_target = QtCore.Signal(str) 
     request_remove_from_target = QtCore.Signal(str)
     request_create_layer = QtCore.Signal()
+    request_estimate_cost = QtCore.Signal()
     request_layer_list_refresh = QtCore.Signal()
     request_delete_selected_layers = QtCore.Signal()
     request_delete_all_layers = QtCore.Signal()
     widget_closed = QtCore.Signal()
+    scene_selection_changed = QtCore.Signal()
     search_text_changed = QtCore.Signal(str)
     request_apply_aov_preset = QtCore.Signal(str)
+    request_profiling_toggled = QtCore.Signal(bool)
+    request_profiler_reset = QtCore.Signal()
+    request_profiler_dump = QtCore.Signal(str) # 'json' / 'chrome'
+
+    # 検索結果がこの件数以下ならツリーをすべて展開する
+    FILTER_EXPAND_ALL_LIMIT = 2000
 
     def __init__(self, parent=None):
         super(RenderLayerToolView, self).__init__(parent)
         self.setWindowTitle("Render Layer Tool")
         self.setWindowFlags(QtCore.Qt.Window)
         self.resize(1150, 850)
+
+        # ツリーで現在選択されているフルDAGパス (選択差分から維持する)
+        self._selected_paths = set()
         
         self._load_icons()
         self._build_ui()
@@ -63,6 +78,7 @@ class RenderLayerToolView(QtWidgets.QWidget):
         aov_box = self._create_aov_group()
         create_box = self._create_layer_creation_group()
         manage_box = self._create_layer_management_group()
+        profiler_box = self._create_profiler_group()
 
         self.status_lbl = QtWidgets.QLabel("Ready.")
         self.status_lbl.setStyleSheet("color:#E0E0E0; padding:4px;")
@@ -70,6 +86,7 @@ class RenderLayerToolView(QtWidgets.QWidget):
         root.addWidget(aov_box)
         root.addWidget(create_box)
         root.addWidget(manage_box)
+        root.addWidget(profiler_box)
         root.addWidget(self.status_lbl)
 
         self._connect_signals()
@@ -91,10 +108,13 @@ class RenderLayerToolView(QtWidgets.QWidget):
         search_layout.addWidget(self.clear_search_btn)
         left_box_layout.addLayout(search_layout)
 
-        self.scene_objects_tree = QtWidgets.QTreeWidget()
-        self.scene_objects_tree.setHeaderLabels(["Name"])
+        # ノードは展開時にのみ生成される遅延取得モデルで表示する
+        self.scene_tree_model = SceneTreeModel(self.icons, self)
+        self.scene_objects_tree = QtWidgets.QTreeView()
+        self.scene_objects_tree.setModel(self.scene_tree_model)
         self.scene_objects_tree.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
         self.scene_objects_tree.setAlternatingRowColors(True)
+        self.scene_objects_tree.setUniformRowHeights(True)
 
         selection_mode_box = QtWidgets.QGroupBox("リスト追加時の階層展開")
         selection_mode_layout = QtWidgets.QHBoxLayout(selection_mode_box)
@@ -166,6 +186,7 @@ class RenderLayerToolView(QtWidgets.QWidget):
         self.remove_pvoff_btn.clicked.connect(lambda: self.request_remove_from_target.emit('pvoff'))
 
         self.create_btn.clicked.connect(self.request_create_layer.emit)
+        self.estimate_cost_btn.clicked.connect(self.request_estimate_cost.emit)
         self.create_each_checkbox.stateChanged.connect(
             lambda state: self.layer_name_le.setEnabled(state == 0)
         )
@@ -173,123 +194,158 @@ class RenderLayerToolView(QtWidgets.QWidget):
         self.delete_selected_btn.clicked.connect(self.request_delete_selected_layers.emit)
         self.delete_all_btn.clicked.connect(self.request_delete_all_layers.emit)
         
-        self.scene_objects_tree.itemDoubleClicked.connect(lambda item, col: self._on_tree_double_clicked(item, 'target'))
+        self.scene_objects_tree.selectionModel().selectionChanged.connect(self._on_tree_selection_delta)
+        self.scene_tree_model.population_progress.connect(self._on_tree_population_progress)
+        self.scene_objects_tree.doubleClicked.connect(lambda index: self._on_tree_double_clicked(index, 'target'))
         self.target_list_widget.itemDoubleClicked.connect(lambda item: self.request_remove_from_target.emit('target'))
         self.pvoff_list_widget.itemDoubleClicked.connect(lambda item: self.request_remove_from_target.emit('pvoff'))
 
-        self.search_le.textChanged.connect(self.search_text_changed.emit)
+        # キー入力ごとに検索せず、入力が止まってから1回だけ通知する
+        self._search_timer = QtCore.QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(200)
+        self._search_timer.timeout.connect(lambda: self.search_text_changed.emit(self.search_le.text()))
+        self.search_le.textChanged.connect(lambda *args: self._search_timer.start())
         self.clear_search_btn.clicked.connect(lambda: self.search_le.clear())
         
         self.clear_target_btn.clicked.connect(self.target_list_widget.clear)
         self.clear_pvoff_btn.clicked.connect(self.pvoff_list_widget.clear)
 
-    def _on_tree_double_clicked(self, item, target_list_name):
+    def _on_tree_double_clicked(self, index, target_list_name):
         # カテゴリヘッダーは無視
-        if item.data(0, QtCore.Qt.UserRole):
-            self.scene_objects_tree.clearSelection()
-            item.setSelected(True)
+        if index.data(QtCore.Qt.UserRole):
+            self.scene_objects_tree.selectionModel().select(
+                index, QtCore.QItemSelectionModel.ClearAndSelect | QtCore.QItemSelectionModel.Rows)
             self.request_add_to_target.emit(target_list_name)
 
+    def _on_tree_population_progress(self, done, total):
+        if not total:
+            return
+        if done < total:
+            self.set_status(f"ツリーを構築中... {done:,} / {total:,}", color="#FFC107")
+        else:
+            self.set_status(f"ツリーの構築が完了しました ({total:,} 行)。")
+
+    def get_selected_tree_paths(self):
+        """ツリーで選択されているノードのフルDAGパスを返します。"""
+        paths = [index.data(QtCore.Qt.UserRole) for index in self.scene_objects_tree.selectionModel().selectedRows()]
+        return [path for path in paths if path]
+
+    def selected_tree_path_set(self):
+        """ツリーの選択 (差分で追跡している集合) のコピーを返します。selectedRows() の走査は行いません。"""
+        return set(self._selected_paths)
+
+    def _on_tree_selection_delta(self, selected, deselected):
+        for index in deselected.indexes():
+            self._selected_paths.discard(index.data(QtCore.Qt.UserRole))
+        for index in selected.indexes():
+            path = index.data(QtCore.Qt.UserRole)
+            if path:
+                self._selected_paths.add(path)
+        self.scene_selection_changed.emit()
+
+    @profiler.instrument()
     def populate_scene_tree_hierarchy(self, categorized_data):
-        self.scene_objects_tree.blockSignals(True)
-        self.scene_objects_tree.clear()
-
-        # カテゴリの表示名と順番を定義
-        category_map = {
-            "geometry": "オブジェクト",
-            "lights": "ライト",
-            "cameras": "カメラ",
-            "groups": "グループ",
-            "other": "その他"
-        }
-
-        # カテゴリヘッダーを作成
-        category_items = {}
-        for key, display_name in category_map.items():
-            if categorized_data.get(key): # データがあるカテゴリのみ表示
-                header = QtWidgets.QTreeWidgetItem(self.scene_objects_tree)
-                header.setText(0, display_name)
-                font = header.font(0)
-                font.setBold(True)
-                header.setFont(0, font)
-                header.setFlags(header.flags() & ~QtCore.Qt.ItemIsSelectable) # 選択不可にする
-                category_items[key] = header
-
-        def create_item_recursive(parent_widget, node_path, node_data):
-            short_name = node_path.split('|')[-1]
-            item = QtWidgets.QTreeWidgetItem(parent_widget)
-            item.setText(0, short_name)
-            item.setData(0, QtCore.Qt.UserRole, node_path)
-            
-            node_type = node_data.get('type', 'default')
-            icon = self.icons.get(node_type, self.icons['default'])
-            if icon and not icon.isNull():
-                item.setIcon(0, icon)
-
-            children_data = node_data.get('children', {})
-            sorted_children = sorted(children_data.items(), key=lambda x: x[0].split('|')[-1].lower())
-            
-            for child_path, child_data in sorted_children:
-                create_item_recursive(item, child_path, child_data)
-
-        # 各カテゴリにノードを追加
-        for category_key, root_nodes in categorized_data.items():
-            parent_item = category_items.get(category_key)
-            if parent_item:
-                sorted_nodes = sorted(root_nodes.items(), key=lambda x: x[0].split('|')[-1].lower())
-                for node_path, node_data in sorted_nodes:
-                    create_item_recursive(parent_item, node_path, node_data)
-
-        # すべてのカテゴリヘッダーを展開
-        self.scene_objects_tree.expandAll()
-        self.scene_objects_tree.blockSignals(False)
-
-    def filter_scene_tree(self, text):
-        # ... (変更なし) ...
-        text = text.strip().lower()
-        iterator = QtWidgets.QTreeWidgetItemIterator(self.scene_objects_tree)
-        
-        # フィルタリングのロジックはカテゴリ表示でもほぼ同じ
-        root = self.scene_objects_tree.invisibleRootItem()
-        for i in range(root.childCount()):
-            category_item = root.child(i)
-            has_visible_child = False
-            for j in range(category_item.childCount()):
-                child_item = category_item.child(j)
-                is_match = text in child_item.text(0).lower()
-                child_item.setHidden(not is_match)
-                if is_match:
-                    has_visible_child = True
-            category_item.setHidden(not has_visible_child)
-            if has_visible_child:
-                category_item.setExpanded(True)
-            else:
-                category_item.setExpanded(False)
-
+        self.scene_tree_model.reset_hierarchy(categorized_data)
+        # モデルのリセットでは selectionChanged が発行されない
+        self._selected_paths = set()
+        # カテゴリヘッダーのみ展開する (子ノードは展開時に取得される)
+        for index in self.scene_tree_model.category_indexes():
+            self.scene_objects_tree.expand(index)
+
+    @profiler.instrument()
+    def apply_scene_tree_delta(self, ops):
+        """Modelの apply_dag_changes が返した差分操作だけをツリーに反映します。"""
+        if not ops:
+            return
+        self.scene_tree_model.apply_delta(ops)
+
+        # 削除・リネームされたノードの選択状態を追従させる
+        for op in ops:
+            if op[0] == 'remove':
+                prefix = op[1] + '|'
+                self._selected_paths = {
+                    p for p in self._selected_paths if p != op[1] and not p.startswith(prefix)}
+            elif op[0] == 'rename':
+                old_path, new_path = op[1], op[2]
+                self._selected_paths = {
+                    new_path + p[len(old_path):] if p == old_path or p.startswith(old_path + '|') else p
+                    for p in self._selected_paths}
+
+    @profiler.instrument()
+    def filter_scene_tree(self, visible_paths):
+        """
+        検索結果でツリーを絞り込みます。visible_paths は表示するノードと祖先のパス集合で、None で解除します。
+        """
+        self.scene_tree_model.set_visible_paths(visible_paths)
+        self._selected_paths = set()
+        if visible_paths is not None and len(visible_paths) <= self.FILTER_EXPAND_ALL_LIMIT:
+            # 結果が少なければネストした一致ノードまで展開する
+            self.scene_objects_tree.expandAll()
+        else:
+            for index in self.scene_tree_model.category_indexes():
+                self.scene_objects_tree.expand(index)
+
+    @staticmethod
+    def _build_item_selection(indexes):
+        """インデックス群を親ごとの連続行レンジにまとめた1つの QItemSelection にします。"""
+        rows_by_parent = {}
+        for index in indexes:
+            parent = index.parent()
+            rows_by_parent.setdefault(parent.internalId() if parent.isValid() else None, (parent, []))[1].append(index)
+
+        selection = QtCore.QItemSelection()
+        for parent, children in rows_by_parent.values():
+            children.sort(key=lambda i: i.row())
+            start = end = children[0]
+            for index in children[1:]:
+                if index.row() == end.row() + 1:
+                    end = index
+                    continue
+                selection.select(start, end)
+                start = end = index
+            selection.select(start, end)
+        return selection
+
+    @profiler.instrument()
     def sync_tree_selection(self, paths_to_select):
-        # ... (変更なし) ...
-        self.scene_objects_tree.clearSelection()
-        if not paths_to_select: return
-
-        selection_set = set(paths_to_select)
-        first_selected_item = None
-
-        iterator = QtWidgets.QTreeWidgetItemIterator(self.scene_objects_tree, QtWidgets.QTreeWidgetItemIterator.Selectable)
-        while iterator.value():
-            item = iterator.value()
-            item_path = item.data(0, QtCore.Qt.UserRole)
-            if item_path in selection_set:
-                item.setSelected(True)
-                if not first_selected_item: first_selected_item = item
-                
-                parent = item.parent()
-                while parent:
-                    parent.setExpanded(True)
-                    parent = parent.parent()
-            iterator += 1
-
-        if first_selected_item:
-             self.scene_objects_tree.scrollToItem(first_selected_item, QtWidgets.QAbstractItemView.PositionAtCenter)
+        """
+        Mayaの選択をツリーに反映します。現在の選択との差分 (追加/解除) のみを処理するため、
+        コストはシーン規模ではなく選択数に比例します。
+        """
+        target_paths = set(paths_to_select or ())
+        added = [path for path in (paths_to_select or ()) if path not in self._selected_paths]
+        removed = self._selected_paths - target_paths
+        if not added and not removed:
+            return
+
+        model = self.scene_tree_model
+        selection_model = self.scene_objects_tree.selectionModel()
+        flags = QtCore.QItemSelectionModel.Rows
+
+        if removed:
+            indexes = [model.index_for_path(path, fetch=False) for path in removed]
+            indexes = [index for index in indexes if index.isValid()]
+            self._selected_paths -= removed
+            if indexes:
+                selection_model.select(self._build_item_selection(indexes), QtCore.QItemSelectionModel.Deselect | flags)
+
+        indexes = [model.index_for_path(path) for path in added]
+        indexes = [index for index in indexes if index.isValid()]
+        if not indexes:
+            return
+
+        # 祖先の展開は1ノードにつき1回だけ行う
+        expanded = set()
+        for index in indexes:
+            parent = index.parent()
+            while parent.isValid() and parent.internalId() not in expanded:
+                expanded.add(parent.internalId())
+                self.scene_objects_tree.expand(parent)
+                parent = parent.parent()
+
+        selection_model.select(self._build_item_selection(indexes), QtCore.QItemSelectionModel.Select | flags)
+        self.scene_objects_tree.scrollTo(indexes[0], QtWidgets.QAbstractItemView.PositionAtCenter)
 
     def _create_aov_group(self):
         aov_box = QtWidgets.QGroupBox("AOV 設定（Arnold）")
@@ -358,15 +414,26 @@ class RenderLayerToolView(QtWidgets.QWidget):
         self.create_btn = QtWidgets.QPushButton("レンダーレイヤー作成")
         self.create_btn.setStyleSheet("font-weight: bold; padding: 5px;")
 
+        self.estimate_cost_btn = QtWidgets.QPushButton("コスト見積り")
+        self.estimate_cost_btn.setToolTip("作成予定のレイヤーと既存レイヤーのレンダーコストを見積もり、偏りを確認します。")
+
+        button_l = QtWidgets.QHBoxLayout()
+        button_l.addWidget(self.create_btn, 1)
+        button_l.addWidget(self.estimate_cost_btn)
+
         main_layout.addLayout(settings_l)
-        main_layout.addWidget(self.create_btn)
+        main_layout.addLayout(button_l)
         return create_box
 
     def _create_layer_management_group(self):
         manage_box = QtWidgets.QGroupBox("既存レンダーレイヤーの管理 (自動更新)")
         layout = QtWidgets.QHBoxLayout(manage_box)
-        self.layer_list_widget = QtWidgets.QListWidget()
-        self.layer_list_widget.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        # レイヤー一覧は LayerRegistry の差分をモデルに反映する (コントローラーが stats_provider を設定する)
+        self.layer_list_model = LayerListModel(parent=self)
+        self.layer_list_view = QtWidgets.QListView()
+        self.layer_list_view.setModel(self.layer_list_model)
+        self.layer_list_view.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.layer_list_view.setUniformItemSizes(True)
         button_layout = QtWidgets.QVBoxLayout()
         self.refresh_layers_btn = QtWidgets.QPushButton("手動更新")
         self.delete_selected_btn = QtWidgets.QPushButton("選択を削除")
@@ -376,14 +443,65 @@ class RenderLayerToolView(QtWidgets.QWidget):
         button_layout.addWidget(self.delete_selected_btn)
         button_layout.addStretch()
         button_layout.addWidget(self.delete_all_btn)
-        layout.addWidget(self.layer_list_widget, 1)
+        layout.addWidget(self.layer_list_view, 1)
         layout.addLayout(button_layout)
         return manage_box
 
+    def _create_profiler_group(self):
+        profiler_box = QtWidgets.QGroupBox("パフォーマンス計測")
+        layout = QtWidgets.QVBoxLayout(profiler_box)
+        button_layout = QtWidgets.QHBoxLayout()
+        self.profiling_checkbox = QtWidgets.QCheckBox("計測を有効化")
+        self.profiling_checkbox.setToolTip("操作ごとの処理時間と maya.cmds / Render Setup の呼び出し回数を記録します。")
+        self.profiler_reset_btn = QtWidgets.QPushButton("リセット")
+        self.profiler_json_btn = QtWidgets.QPushButton("JSON保存")
+        self.profiler_trace_btn = QtWidgets.QPushButton("Chrome Trace保存")
+        button_layout.addWidget(self.profiling_checkbox)
+        button_layout.addStretch()
+        button_layout.addWidget(self.profiler_reset_btn)
+        button_layout.addWidget(self.profiler_json_btn)
+        button_layout.addWidget(self.profiler_trace_btn)
+
+        headers = ["操作", "回数", "合計 (ms)", "平均 (ms)", "p95 (ms)", "最大 (ms)", "cmds", "renderSetup"]
+        self.profiler_table = QtWidgets.QTableWidget(0, len(headers))
+        self.profiler_table.setHorizontalHeaderLabels(headers)
+        self.profiler_table.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        self.profiler_table.verticalHeader().setVisible(False)
+        self.profiler_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.profiler_table.setMaximumHeight(150)
+        self.profiler_table.setVisible(False)
+
+        self.profiling_checkbox.toggled.connect(self.profiler_table.setVisible)
+        self.profiling_checkbox.toggled.connect(self.request_profiling_toggled.emit)
+        self.profiler_reset_btn.clicked.connect(self.request_profiler_reset.emit)
+        self.profiler_json_btn.clicked.connect(lambda: self.request_profiler_dump.emit('json'))
+        self.profiler_trace_btn.clicked.connect(lambda: self.request_profiler_dump.emit('chrome'))
+
+        layout.addLayout(button_layout)
+        layout.addWidget(self.profiler_table)
+        return profiler_box
+
+    def show_profiler_summary(self, rows):
+        """profiler.summary() の結果を統計テーブルに表示します。"""
+        self.profiler_table.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            values = [row['name'], str(row['count']), f"{row['total_ms']:.1f}", f"{row['mean_ms']:.2f}",
+                      f"{row['p95_ms']:.2f}", f"{row['max_ms']:.2f}", str(row['cmds_calls']),
+                      str(row['render_setup_calls'])]
+            for column, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem(value)
+                if column:
+                    item.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+                self.profiler_table.setItem(row_index, column, item)
+
     def set_status(self, text, color="#7EE081"):
         self.status_lbl.setText(f"<span style='color:{color}'>{text}</span>")
         
-    def populate_render_layer_list(self, layer_names):
-        self.layer_list_widget.clear()
-        self.layer_list_widget.addItems(layer_names)
+    def get_selected_layer_names(self):
+        indexes = self.layer_list_view.selectionModel().selectedRows()
+        return [index.data(QtCore.Qt.UserRole) for index in sorted(indexes, key=lambda index: index.row())]
+
+    def apply_layer_list_op(self, op):
+        """LayerRegistry の差分 (insert / remove / rename / update / reset) をレイヤー一覧に反映します。"""
+        self.layer_list_model.apply_op(op)
 